@@ -25,10 +25,14 @@ class TableResult(BaseModel):
     id: str = Field(description="Table identifier")
     title: str = Field(description="Table title")
     headers: List[str] = Field(description="Table headers")
-    rows: List[List[str]] = Field(description="Table rows")
+    rows: List[List[str]] = Field(default_factory=list, description="Table rows (empty when compact is set)")
     rowCount: int = Field(description="Number of rows")
     columnCount: int = Field(description="Number of columns")
     confidence: float = Field(description="Detection confidence")
+    page: Optional[int] = Field(default=None, description="Page index (0-based), if known")
+    compact: Optional[Dict[str, Any]] = Field(
+        default=None, description="Column-major encoding of rows with a shared string table (table_encoding=columnar)"
+    )
 
 class FormulaResult(BaseModel):
     """Formula analysis result"""
@@ -45,6 +49,7 @@ class ImageResult(BaseModel):
     type: str = Field(description="Image type")
     path: str = Field(description="Image path")
     base64: Optional[str] = Field(default=None, description="Base64 encoded image data")
+    thumbnail: Optional[str] = Field(default=None, description="Base64 encoded thumbnail (IMAGE_THUMBNAIL_SIZE)")
     altText: str = Field(description="Alternative text")
     description: str = Field(description="Image description")
     confidence: float = Field(description="Detection confidence")
@@ -5,20 +5,26 @@ Handles OCR using DeepSeek-OCR API
 """
 
 import os
+import asyncio
 import logging
 import re
-import requests
+import httpx
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from dotenv import load_dotenv
 
 from app.models.ocr_models import (
     OCRResults, TextResult, TableResult, FormulaResult,
     ImageResult, HandwrittenResult, PerformanceResult, OCRMetadata
 )
 
+from app.services.keyword_engine import extract_keywords
+from app.utils.config import load_environment
+from app.utils.debug_capture import DebugCapture
+from app.utils.image_encoding import get_image_encoder, EncodingSummary
+from app.utils.image_preprocess import is_image_file, prepare_image
+
 # Load environment variables
-load_dotenv()
+load_environment()
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +44,14 @@ class DeepSeekOCRService:
         self.image_size = int(os.getenv("DEEPSEEK_OCR_IMAGE_SIZE", "640"))
         self.crop_mode = True  # 裁切模式，用于提取图像
         self.verbose = False
+        # 图片输入发送前缩小到模型实际使用的分辨率（裁切模式下最多 3x3 个 image_size 切片）
+        self.input_max_dimension = int(os.getenv(
+            "DEEPSEEK_INPUT_MAX_DIMENSION",
+            str(self.image_size * 3 if self.crop_mode else self.base_size)
+        ))
+
+        # 原始响应调试转储（默认关闭，见 DEBUG_CAPTURE*）
+        self.debug_capture = DebugCapture("deepseek")
 
         logger.info(f"DeepSeek OCR Service initialized: {self.api_url}")
 
@@ -60,24 +74,32 @@ class DeepSeekOCRService:
 
             # 1. Call DeepSeek OCR API
             # 参考 api_server_optimize.py 的参数设置
-            with open(file_path, 'rb') as f:
-                files = {'file': (file_path.name, f, 'application/pdf')}
-                data = {
-                    'dpi': str(self.dpi),
-                    'base_size': str(self.base_size),
-                    'image_size': str(self.image_size),
-                    'crop_mode': 'true' if self.crop_mode else 'false',
-                    'verbose': 'true' if self.verbose else 'false',
-                    'enable_image_description': 'true' if enable_desc else 'false',
-                }
+            # 使用异步请求：任务被取消时连接随之关闭，vLLM 会中止该请求并释放 GPU
+            if is_image_file(file_path):
+                # 图片输入：修正 EXIF 方向并缩小后再上传
+                prepared = await asyncio.to_thread(prepare_image, file_path, self.input_max_dimension)
+                files = {'file': (prepared.filename, prepared.content, prepared.mime)}
+                input_stats = prepared.stats
+            else:
+                file_bytes = await asyncio.to_thread(file_path.read_bytes)
+                files = {'file': (file_path.name, file_bytes, 'application/pdf')}
+                input_stats = None
+            data = {
+                'dpi': str(self.dpi),
+                'base_size': str(self.base_size),
+                'image_size': str(self.image_size),
+                'crop_mode': 'true' if self.crop_mode else 'false',
+                'verbose': 'true' if self.verbose else 'false',
+                'enable_image_description': 'true' if enable_desc else 'false',
+            }
 
-                logger.info(f"Sending DeepSeek OCR request with params: {data}")
+            logger.info(f"Sending DeepSeek OCR request with params: {data}")
 
-                response = requests.post(
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.post(
                     self.api_url,
                     files=files,
-                    data=data,
-                    timeout=self.timeout
+                    data=data
                 )
 
             if response.status_code != 200:
@@ -115,23 +137,23 @@ class DeepSeekOCRService:
             logger.info(f"DeepSeek OCR completed: {page_count} pages")
             logger.info(f"Markdown length: {len(markdown_content)} characters")
 
-            # Debug: Save complete response for analysis
-            import json
-            debug_response_file = Path("debug_deepseek_response.json")
-            with open(debug_response_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
-            logger.info(f"Complete API response saved to: {debug_response_file.absolute()}")
-
-            debug_markdown_file = Path("debug_deepseek_markdown.md")
-            with open(debug_markdown_file, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
-            logger.info(f"Markdown content saved to: {debug_markdown_file.absolute()}")
+            # Debug: Save complete response for analysis (sampled, written in background)
+            capture_id = self.debug_capture.capture(file_path.name, {
+                "response.json": result,
+                "markdown.md": markdown_content
+            })
+            if capture_id:
+                logger.info(f"DeepSeek response captured: {self.debug_capture.directory}/{capture_id}_*")
 
             # 3. Convert to frontend-compatible format (MinerU-style)
-            ocr_results = self._convert_to_mineru_format(
+            # 图片编码（IMAGE_REENCODE_PASSTHROUGH=true 时逐张重新编码）和表格解析都是 CPU 密集操作，不在事件循环中执行
+            encoding_summary = EncodingSummary()
+            ocr_results = await asyncio.to_thread(
+                self._convert_to_mineru_format,
                 markdown_content=markdown_content,
                 images_data=images_data,
-                file_path=file_path
+                file_path=file_path,
+                encoding_summary=encoding_summary
             )
 
             return {
@@ -143,7 +165,9 @@ class DeepSeekOCRService:
                 "metadata": {
                     "page_count": page_count,
                     "enable_description": enable_desc,
-                    "images": images_data
+                    "images": images_data,
+                    "image_encoding": encoding_summary.to_dict(),
+                    "input_image": input_stats
                 }
             }
 
@@ -157,7 +181,8 @@ class DeepSeekOCRService:
         self,
         markdown_content: str,
         images_data: dict,
-        file_path: Path
+        file_path: Path,
+        encoding_summary: Optional[EncodingSummary] = None
     ) -> dict:
         """
         Convert DeepSeek OCR response to MinerU-compatible format
@@ -166,6 +191,7 @@ class DeepSeekOCRService:
             markdown_content: Markdown content from DeepSeek
             images_data: Images data from DeepSeek API response
             file_path: Original file path
+            encoding_summary: Collects encoding time and bytes of the images
 
         Returns:
             MinerU-style OCR results dict
@@ -179,7 +205,7 @@ class DeepSeekOCRService:
         results = {
             "text": {
                 "fullText": markdown_content,
-                "keywords": ["DeepSeek-OCR", "文档分析", "智能识别"],
+                "keywords": extract_keywords(markdown_content),
                 "confidence": 95.0
             },
             "tables": tables,
@@ -203,15 +229,17 @@ class DeepSeekOCRService:
             }
         }
 
-        # 处理图像数据 - 直接使用DeepSeek API返回的图像信息
+        # 处理图像数据 - 直接使用DeepSeek API返回的图像信息（经统一编码环节，默认原样透传）
         if images_data and isinstance(images_data, dict):
             logger.info(f"🖼️  Processing {len(images_data)} images from DeepSeek API...")
+            encoder = get_image_encoder()
+            summary = encoding_summary if encoding_summary is not None else EncodingSummary()
 
             for image_key, image_base64 in images_data.items():
                 # image_base64 是纯base64字符串（不带 data:image 前缀）
                 if isinstance(image_base64, str):
-                    # 构建完整的 data URI
-                    data_uri = f"data:image/png;base64,{image_base64}"
+                    encoded = summary.add(encoder.encode_base64(image_base64, "image/png"))
+                    data_uri = encoded.data_uri
 
                     image_result = {
                         "id": image_key.replace('.png', ''),
@@ -220,6 +248,7 @@ class DeepSeekOCRService:
                         "altText": f"图像 {image_key}",  # 添加必需的 altText 字段
                         "confidence": 95.0,
                         "base64": data_uri,  # 使用 base64 字段存储 data URI（前端优先读取这个）
+                        "thumbnail": encoded.thumbnail_uri,
                         "path": image_key  # 保留原始文件名作为 path
                     }
                     results["images"].append(image_result)
@@ -388,7 +417,6 @@ class DeepSeekOCRService:
 
     def _extract_tables(self, markdown: str) -> List[TableResult]:
         """Extract tables from markdown"""
-        import re
         tables = []
 
         logger.info(f"🔍 Extracting tables from markdown (length: {len(markdown)})")
@@ -464,7 +492,6 @@ class DeepSeekOCRService:
 
     def _extract_html_tables(self, markdown: str) -> List[TableResult]:
         """Extract HTML tables"""
-        import re
         tables = []
 
         # Find HTML table tags
@@ -593,7 +620,6 @@ class DeepSeekOCRService:
 
     def _extract_formulas(self, markdown: str) -> List[FormulaResult]:
         """Extract formulas from markdown"""
-        import re
         formulas = []
 
         # Find inline formulas: $...$
@@ -624,7 +650,6 @@ class DeepSeekOCRService:
 
     def _extract_images(self, markdown: str) -> List[ImageResult]:
         """Extract image references from markdown"""
-        import re
         images = []
 
         logger.info(f"🔍 Extracting images from markdown (length: {len(markdown)})")
@@ -659,7 +684,6 @@ class DeepSeekOCRService:
 
     def _extract_markdown_images(self, markdown: str) -> List[ImageResult]:
         """Extract standard markdown images"""
-        import re
         images = []
 
         # Pattern: ![alt text](image path)
@@ -685,7 +709,6 @@ class DeepSeekOCRService:
 
     def _extract_html_images(self, markdown: str) -> List[ImageResult]:
         """Extract HTML images"""
-        import re
         images = []
 
         # Pattern: <img src="path" alt="text" ...>
@@ -711,7 +734,6 @@ class DeepSeekOCRService:
 
     def _extract_chinese_image_refs(self, markdown: str) -> List[ImageResult]:
         """Extract Chinese image references"""
-        import re
         images = []
 
         # Pattern: [图片: description]
@@ -736,7 +758,6 @@ class DeepSeekOCRService:
 
     def _extract_english_image_refs(self, markdown: str) -> List[ImageResult]:
         """Extract English image references"""
-        import re
         images = []
 
         # Pattern: [Image: description] or [Figure: description]
@@ -761,7 +782,6 @@ class DeepSeekOCRService:
 
     def _extract_deepseek_images(self, markdown: str) -> List[ImageResult]:
         """Extract DeepSeek special image markers"""
-        import re
         images = []
 
         # Pattern: <|ref|>image<|/ref|><|det|>[[bbox]]<|/det|>
@@ -785,20 +805,8 @@ class DeepSeekOCRService:
         return images
 
     def _extract_keywords(self, markdown: str) -> List[str]:
-        """Extract keywords from markdown"""
-        import re
-
-        # Simple keyword extraction: find words longer than 4 characters
-        # that appear multiple times
-        words = re.findall(r'\b\w{4,}\b', markdown.lower())
-        word_freq = {}
-
-        for word in words:
-            word_freq[word] = word_freq.get(word, 0) + 1
-
-        # Get top 10 most frequent words
-        keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-        return [word for word, freq in keywords if freq > 1]
+        """Extract keywords from markdown (corpus TF-IDF)"""
+        return extract_keywords(markdown)
 
     def _get_content_types(
         self,
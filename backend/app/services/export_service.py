@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Export Service
+把已完成任务的结果导出为 JSON / Markdown 压缩包 / CSV 压缩包 / XLSX：
+- 在线程池中生成，边生成边写入磁盘（ijson 可用时流式读取结果，图片和表格逐个处理），内存占用有界
+- 以结果文件内容的哈希 + 格式作为缓存键，相同导出只生成一次
+- 同一导出的并发请求共享同一次生成
+"""
+
+import asyncio
+import base64
+import binascii
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.json_stream import iter_items, load_ijson
+from app.utils.table_codec import table_rows
+
+logger = logging.getLogger(__name__)
+
+# 格式 -> (扩展名, MIME 类型)
+EXPORT_FORMATS = {
+    "json": (".json", "application/json"),
+    "markdown": (".zip", "application/zip"),
+    "csv": (".zip", "application/zip"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+_UNSAFE_NAME = re.compile(r"[^\w.\-]+", re.UNICODE)
+
+_openpyxl = None
+
+
+def load_openpyxl():
+    """按需导入 openpyxl（XLSX 导出的可选依赖），不可用时返回 None"""
+    global _openpyxl
+    if _openpyxl is None:
+        try:
+            import openpyxl
+            _openpyxl = openpyxl
+        except ImportError:
+            _openpyxl = False
+            logger.warning("openpyxl not available - XLSX export will be disabled")
+    return _openpyxl or None
+
+
+class ExportError(Exception):
+    """导出失败（如格式不支持或缺少可选依赖）"""
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """分块计算文件 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def safe_name(name: str, default: str = "document") -> str:
+    stem = _UNSAFE_NAME.sub("_", Path(name or "").stem).strip("._")
+    return stem[:80] or default
+
+
+def _zip_member(path: str, default: str) -> str:
+    """压缩包内的相对路径（去掉绝对路径和 ..）"""
+    parts = [part for part in PurePosixPath(path.replace("\\", "/")).parts if part not in ("", "/", "..", ".")]
+    return "/".join(parts) or default
+
+
+def _decode_data_uri(value: str) -> Optional[bytes]:
+    payload = value.split(",", 1)[1] if value.startswith("data:") and "," in value else value
+    try:
+        return base64.b64decode(payload, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _table_rows(table: Dict[str, Any]) -> Iterator[List[str]]:
+    headers = table.get("headers") or []
+    if headers:
+        yield [str(cell) for cell in headers]
+    for row in table_rows(table):
+        yield [str(cell) for cell in row]
+
+
+class ExportService:
+    """结果导出（线程池生成 + 按结果哈希缓存）"""
+
+    def __init__(self, export_dir: Optional[str] = None, max_workers: Optional[int] = None):
+        self.export_dir = Path(export_dir or os.getenv("EXPORT_DIR", "./exports"))
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or int(os.getenv("EXPORT_WORKERS", "2"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export")
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._hits = 0
+        self._generated = 0
+
+    @staticmethod
+    def formats() -> List[str]:
+        return [name for name in EXPORT_FORMATS if name != "xlsx" or load_openpyxl() is not None]
+
+    def export_name(self, digest: str, export_format: str, filename: str) -> str:
+        extension, _ = EXPORT_FORMATS[export_format]
+        suffix = f"_{export_format}" if extension == ".zip" else ""
+        return f"{safe_name(filename)}_{digest[:16]}{suffix}{extension}"
+
+    async def export(self, result_path: str, export_format: str, filename: str) -> Tuple[Path, str]:
+        """
+        生成（或复用已缓存的）导出文件
+
+        Args:
+            result_path: ResultStore 中的结果文件
+            export_format: json / markdown / csv / xlsx
+            filename: 原始文件名（用于命名导出文件）
+
+        Returns:
+            (导出文件路径, MIME 类型)
+
+        Raises:
+            ExportError: 格式不支持或缺少可选依赖
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(f"Unsupported export format '{export_format}'. Supported: {', '.join(EXPORT_FORMATS)}")
+        if export_format == "xlsx" and load_openpyxl() is None:
+            raise ExportError("XLSX export requires openpyxl")
+
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(self._executor, file_digest, Path(result_path))
+        target = self.export_dir / self.export_name(digest, export_format, filename)
+        _, mime = EXPORT_FORMATS[export_format]
+
+        if target.exists():
+            self._hits += 1
+            # 刷新访问时间，避免被存储清理按 LRU 淘汰
+            os.utime(target)
+            return target, mime
+
+        key = target.name
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self._executor, self._generate, Path(result_path), export_format, target)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        await asyncio.shield(future)
+        return target, mime
+
+    def _generate(self, result_path: Path, export_format: str, target: Path) -> Path:
+        """在线程池中生成导出文件（先写临时文件再原子重命名）"""
+        tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            if export_format == "json":
+                # 结果文件本身就是 JSON，直接分块复制
+                with open(result_path, "rb") as src, open(tmp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            else:
+                # ijson 不可用时整份加载一次，各部分从已解析的对象中读取
+                source = result_path if load_ijson() is not None else self._load(result_path)
+                writer = self._writers()[export_format]
+                writer(source, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self._generated += 1
+        logger.info(f"📦 Export generated: {target} ({target.stat().st_size} bytes)")
+        return target
+
+    def _writers(self) -> Dict[str, Callable[[Any, Path], None]]:
+        return {
+            "markdown": self._write_markdown_bundle,
+            "csv": self._write_csv_bundle,
+            "xlsx": self._write_xlsx,
+        }
+
+    @staticmethod
+    def _load(result_path: Path) -> Dict[str, Any]:
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _tables(source: Any) -> Iterator[Dict[str, Any]]:
+        return (table for table in iter_items(source, "results.tables.item") if isinstance(table, dict))
+
+    def _write_markdown_bundle(self, source: Any, path: Path) -> None:
+        """document.md + markdown 中引用的图片（按原路径存放）"""
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            with bundle.open("document.md", "w") as f:
+                f.write((next(iter_items(source, "fullMarkdown"), None) or "").encode("utf-8"))
+
+            written = set()
+            for index, image in enumerate(iter_items(source, "results.images.item")):
+                data_uri = image.get("base64") if isinstance(image, dict) else None
+                if not data_uri:
+                    continue
+                member = _zip_member(image.get("path") or "", f"images/image_{index + 1}.png")
+                if member in written or member == "document.md":
+                    continue
+                data = _decode_data_uri(data_uri)
+                if data is None:
+                    continue
+                with bundle.open(member, "w") as f:
+                    f.write(data)
+                written.add(member)
+
+    def _write_csv_bundle(self, source: Any, path: Path) -> None:
+        """每个表格一个 CSV（UTF-8 BOM，Excel 可直接打开中文）"""
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for index, table in enumerate(self._tables(source), start=1):
+                member = f"{index:03d}_{safe_name(str(table.get('id') or ''), 'table')}.csv"
+                with bundle.open(member, "w") as raw:
+                    with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as f:
+                        writer = csv.writer(f)
+                        for row in _table_rows(table):
+                            writer.writerow(row)
+
+    def _write_xlsx(self, source: Any, path: Path) -> None:
+        """所有表格写入一个工作簿，每个表格一个工作表（write_only 模式逐行写入）"""
+        openpyxl = load_openpyxl()
+        workbook = openpyxl.Workbook(write_only=True)
+        index = 0
+        for index, table in enumerate(self._tables(source), start=1):
+            # 工作表名最长 31 个字符且不能包含 []:*?/\
+            title = re.sub(r"[\[\]:*?/\\]", "_", str(table.get("title") or f"Table {index}"))
+            sheet = workbook.create_sheet(f"{index}_{title}"[:31])
+            for row in _table_rows(table):
+                sheet.append(row)
+        if not index:
+            workbook.create_sheet("Tables")
+        workbook.save(str(path))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "formats": self.formats(),
+            "workers": self.max_workers,
+            "cache_hits": self._hits,
+            "generated": self._generated,
+            "in_flight": len(self._inflight),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
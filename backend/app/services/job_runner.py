@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Job Runner
+在后台执行 OCR 任务，把状态、进度和结果位置写入任务存储
+
+任务存储的调用（SQLite 锁等待可能长达 busy_timeout）都在线程池中执行，不阻塞事件循环
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.services.job_store import (
+    JobStore, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED, FINAL_STATUSES
+)
+from app.services.job_scheduler import JobScheduler, DEFAULT_TENANT
+from app.services.ocr_pipeline import OCRPipeline
+from app.services.progress import ProgressBroker, ProgressTracker
+from app.services.result_store import ResultStore
+from app.services.search_index import SearchIndex
+from app.services.table_store import TableStore
+from app.services.upload_store import UploadStore
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelledError(Exception):
+    """任务在执行前或执行中被取消"""
+
+
+class JobRunner:
+    """后台任务执行器"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        pipeline: OCRPipeline,
+        result_store: ResultStore,
+        scheduler: JobScheduler,
+        broker: ProgressBroker,
+        upload_store: Optional[UploadStore] = None,
+        search_index: Optional[SearchIndex] = None,
+        table_store: Optional[TableStore] = None
+    ):
+        self.store = store
+        self.pipeline = pipeline
+        self.result_store = result_store
+        self.scheduler = scheduler
+        self.broker = broker
+        self.upload_store = upload_store
+        self.search_index = search_index
+        self.table_store = table_store
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_interval = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+        self.cancel_poll_interval = float(os.getenv("JOB_CANCEL_POLL_INTERVAL", "1"))
+        self.stale_after = float(os.getenv("JOB_STALE_AFTER", "60"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.wait_poll_interval = float(os.getenv("PROGRESS_POLL_INTERVAL", "2"))
+        # 定期把心跳超时的任务重新排队（其他 worker 崩溃，或本 worker 在超时前就已重启）
+        self.recovery_interval = float(os.getenv("JOB_RECOVERY_INTERVAL", str(self.stale_after / 2)))
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 进度写入按任务合并：每个任务同时只有一个写入任务，只写最新快照
+        self._pending_progress: Dict[str, Dict[str, Any]] = {}
+        self._progress_writers: Dict[str, asyncio.Task] = {}
+        self._recovery_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def new_task_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def fingerprint(upload_key: str, model: str, options: Dict[str, Any]) -> str:
+        """相同内容 + 模型 + 选项的请求共享同一个任务"""
+        payload = json.dumps([upload_key, model, options], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def create_job(
+        self,
+        file_path: Path,
+        filename: str,
+        model: str,
+        options: Dict[str, Any],
+        mode: str = "async",
+        task_id: Optional[str] = None,
+        priority: str = "normal",
+        tenant: str = DEFAULT_TENANT,
+        cost: float = 1.0,
+        upload_key: Optional[str] = None,
+        coalesce: bool = False
+    ) -> Dict[str, Any]:
+        """
+        在任务存储中登记任务（upload_key 为该任务在上传存储中持有引用的文件）
+
+        coalesce=True 时，如果已有相同文件、模型和选项的任务正在排队或运行，
+        则附加到该任务上并返回它（返回的 task_id 与传入的不同），不再重复处理
+        """
+        task_id = task_id or self.new_task_id()
+        fields = dict(
+            status=JOB_QUEUED,
+            mode=mode,
+            model=model,
+            filename=filename,
+            file_path=str(file_path),
+            options=options,
+            progress={"stage": "queued"},
+            priority=self.scheduler.normalize_priority(priority),
+            tenant=tenant,
+            cost=cost,
+            metadata={"upload_key": upload_key} if upload_key else None,
+            # 排队期间由本 worker 的恢复循环刷新心跳；本 worker 退出后任务会被其他 worker 接管或标记失败
+            worker_id=self.worker_id
+        )
+        if coalesce and upload_key:
+            job = await asyncio.to_thread(
+                self.store.create_or_attach, task_id, self.fingerprint(upload_key, model, options),
+                self.stale_after, **fields
+            )
+            if job["task_id"] != task_id:
+                logger.info(f"Coalesced request {task_id} into in-flight job {job['task_id']}")
+            return job
+        return await asyncio.to_thread(self.store.create_job, task_id, **fields)
+
+    def submit(self, task_id: str) -> None:
+        """在当前 worker 中调度执行已登记的任务"""
+        task = asyncio.create_task(self._execute(task_id))
+        self._tasks[task_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(task_id, None))
+
+    async def run_inline(self, task_id: str):
+        """
+        在当前请求中执行任务（同步接口使用），结果同样写入任务存储
+
+        Returns:
+            OCRResponse
+
+        Raises:
+            JobCancelledError: 任务在排队或处理期间被取消
+        """
+        self._tasks[task_id] = asyncio.current_task()
+        try:
+            job = await asyncio.to_thread(self.store.get_job, task_id)
+            async with self._slot(job) as waited:
+                if not await asyncio.to_thread(self.store.claim_job, task_id, self.worker_id):
+                    current = await asyncio.to_thread(self.store.get_job, task_id)
+                    if (current or {}).get("status") == JOB_CANCELLED:
+                        raise JobCancelledError(f"Task {task_id} was cancelled")
+                    raise RuntimeError(f"Task {task_id} could not be claimed")
+                await self._record_queue_wait(job, waited)
+                return await self._process(job)
+        except asyncio.CancelledError:
+            # cancel() 中断了本任务（等待槽位或处理中）；其他原因的中断（如进程退出）照常传播。
+            # 重复的 cancel() 调用不能打断这里的检查
+            if await asyncio.shield(asyncio.to_thread(self.store.is_cancel_requested, task_id)):
+                raise JobCancelledError(f"Task {task_id} was cancelled") from None
+            raise
+        finally:
+            self._tasks.pop(task_id, None)
+
+    async def _execute(self, task_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get_job, task_id)
+        if not job:
+            return
+        async with self._slot(job) as waited:
+            if not await asyncio.to_thread(self.store.claim_job, task_id, self.worker_id):
+                # 已被其他 worker 领取或已取消
+                return
+            await self._record_queue_wait(job, waited)
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                logger.info(f"Background job {task_id} cancelled")
+            except Exception as e:
+                logger.error(f"Background job {task_id} failed: {str(e)}")
+
+    async def cancel(self, task_id: str) -> Optional[str]:
+        """
+        取消任务：排队中的任务直接取消；运行中的任务在本 worker 上立即中断，
+        在其他 worker 上由其监视循环发现取消标记后中断
+
+        Returns:
+            取消后的任务状态，任务不存在时返回 None
+        """
+        job = await asyncio.to_thread(self.store.get_job, task_id)
+        if job is None or job["status"] in FINAL_STATUSES:
+            # 已结束（包括已取消）的任务：重复取消不再有任何副作用
+            return job["status"] if job else None
+
+        status = await asyncio.to_thread(self.store.request_cancel, task_id)
+        task = self._tasks.get(task_id)
+        if task is not None and not task.done():
+            task.cancel()
+        if status == JOB_CANCELLED:
+            await asyncio.to_thread(self.release_upload, job)
+            self.broker.publish(task_id, {"task_id": task_id, "status": JOB_CANCELLED, "progress": {}})
+        return status
+
+    async def detach(self, task_id: str, waiter_id: Optional[str] = None) -> bool:
+        """
+        某个等待者不再需要结果（客户端断开或请求取消）；
+        只有最后一个等待者离开时才真正取消任务。同一等待者重复脱离不会影响其他等待者
+
+        Args:
+            task_id: 任务 ID
+            waiter_id: 等待者自己的请求 ID，默认是创建任务的请求
+
+        Returns:
+            任务是否被取消
+        """
+        remaining = await asyncio.to_thread(self.store.detach, task_id, waiter_id)
+        if remaining is None or remaining > 0:
+            return False
+        return await self.cancel(task_id) is not None
+
+    async def wait_for(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """等待任务结束（附加到已有任务的请求使用），返回最终的任务记录"""
+        queue = self.broker.subscribe(task_id)
+        try:
+            while True:
+                job = await asyncio.to_thread(self.store.get_job, task_id)
+                if job is None or job["status"] in FINAL_STATUSES:
+                    return job
+                try:
+                    # 本 worker 发布的事件立即唤醒，其他 worker 上的任务靠轮询
+                    await asyncio.wait_for(queue.get(), timeout=self.wait_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.broker.unsubscribe(task_id, queue)
+
+    def _slot(self, job: Dict[str, Any]):
+        return self.scheduler.slot(
+            job.get("priority") or "normal",
+            job.get("tenant") or DEFAULT_TENANT,
+            job.get("cost") or 1.0
+        )
+
+    async def _record_queue_wait(self, job: Dict[str, Any], waited: float) -> None:
+        metadata = dict(job.get("metadata") or {})
+        metadata["queue_wait_seconds"] = round(waited, 3)
+        await asyncio.to_thread(self.store.update_job, job["task_id"], metadata=metadata)
+
+    async def _process(self, job: Dict[str, Any]):
+        task_id = job["task_id"]
+        watcher = asyncio.create_task(self._watch_loop(task_id, asyncio.current_task()))
+        progress = ProgressTracker(task_id, lambda snapshot: self._publish_progress(task_id, snapshot))
+        progress.set_stage("processing")
+        try:
+            result = await self.pipeline.run(
+                Path(job["file_path"]),
+                job["filename"],
+                job["model"],
+                job.get("options") or {},
+                progress=progress
+            )
+            result_data = result.model_dump()
+            result_path = await asyncio.to_thread(self.result_store.save, task_id, result_data)
+            await self._finish(job, progress, JOB_COMPLETED, result_path=result_path)
+            await self._index_result(job, result_data)
+            return result
+        except asyncio.CancelledError:
+            # 先停止监视循环：它发现取消标记后会再次取消本任务，打断下面的状态写入
+            watcher.cancel()
+            await asyncio.shield(self._record_cancel(job, progress))
+            raise
+        except Exception as e:
+            progress.stage = "failed"
+            await self._finish(job, progress, JOB_FAILED, error=str(e))
+            raise
+        finally:
+            watcher.cancel()
+
+    async def _record_cancel(self, job: Dict[str, Any], progress: ProgressTracker) -> None:
+        # 只有显式请求的取消才记为已取消；进程退出导致的中断留给重启后的恢复流程
+        if await asyncio.to_thread(self.store.is_cancel_requested, job["task_id"]):
+            progress.stage = "cancelled"
+            await self._finish(job, progress, JOB_CANCELLED, error="Cancelled")
+
+    def _publish_progress(self, task_id: str, snapshot: Dict[str, Any]) -> None:
+        """推送给本进程的订阅者，并在后台把最新进度写入任务存储（供其他 worker 查询）"""
+        self.broker.publish(task_id, {"task_id": task_id, "status": JOB_RUNNING, "progress": snapshot})
+        self._pending_progress[task_id] = snapshot
+        if task_id not in self._progress_writers:
+            self._progress_writers[task_id] = asyncio.create_task(self._write_progress(task_id))
+
+    async def _write_progress(self, task_id: str) -> None:
+        try:
+            while task_id in self._pending_progress:
+                snapshot = self._pending_progress.pop(task_id)
+                try:
+                    await asyncio.to_thread(self.store.update_job, task_id, progress=snapshot)
+                except Exception as e:
+                    logger.warning(f"Failed to store progress of {task_id}: {str(e)}")
+        finally:
+            self._progress_writers.pop(task_id, None)
+
+    async def _finish(self, job: Dict[str, Any], progress: ProgressTracker, status: str, **fields) -> None:
+        task_id = job["task_id"]
+        # 丢弃尚未写入的进度，并等待正在写入的一次完成，避免旧进度覆盖最终状态
+        self._pending_progress.pop(task_id, None)
+        writer = self._progress_writers.get(task_id)
+        if writer is not None:
+            await asyncio.gather(writer, return_exceptions=True)
+
+        snapshot = progress.snapshot()
+        await asyncio.to_thread(
+            self.store.update_job, task_id, status=status, progress=snapshot, finished_at=time.time(), **fields
+        )
+        self.broker.publish(task_id, {
+            "task_id": task_id, "status": status, "progress": snapshot, "error": fields.get("error")
+        })
+        await asyncio.to_thread(self.release_upload, job)
+
+    async def _index_result(self, job: Dict[str, Any], result_data: Dict[str, Any]) -> None:
+        """把完成的结果按页写入全文索引（同一文件内容只保留最新一次结果），表格追加到表格数据集"""
+        doc_id = (job.get("metadata") or {}).get("upload_key") or job["task_id"]
+        if self.search_index is not None:
+            try:
+                await asyncio.to_thread(self.search_index.index_result, doc_id, result_data, job["task_id"])
+            except Exception as e:
+                logger.warning(f"Failed to index result of {job['task_id']}: {str(e)}")
+        if self.table_store is not None:
+            try:
+                await asyncio.to_thread(self.table_store.append_result, doc_id, result_data, job["task_id"])
+            except Exception as e:
+                logger.warning(f"Failed to store tables of {job['task_id']}: {str(e)}")
+
+    def release_upload(self, job: Optional[Dict[str, Any]]) -> None:
+        """任务结束后释放其持有的上传文件引用（重复释放是安全的）"""
+        upload_key = ((job or {}).get("metadata") or {}).get("upload_key")
+        if not upload_key or self.upload_store is None:
+            return
+        try:
+            self.upload_store.release(upload_key, job["task_id"])
+        except Exception as e:
+            logger.warning(f"Failed to release upload {upload_key} for {job['task_id']}: {str(e)}")
+
+    async def _watch_loop(self, task_id: str, task: asyncio.Task) -> None:
+        """定期刷新心跳，并检查其他 worker 写入的取消标记"""
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.cancel_poll_interval)
+            if await asyncio.to_thread(self.store.is_cancel_requested, task_id):
+                logger.info(f"Cancel requested for {task_id}, aborting")
+                task.cancel()
+                return
+            if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                await asyncio.to_thread(self.store.heartbeat, task_id, self.worker_id)
+                last_heartbeat = time.monotonic()
+
+    async def resume_pending(self) -> int:
+        """
+        启动时恢复任务：心跳超时的任务以及本 worker ID 名下遗留的任务
+        （容器重启后主机名和 PID 可能与重启前相同）重新排队或标记失败（同步任务），
+        归本 worker 所有的排队中异步任务重新调度；仍在运行的其他 worker 的排队任务由其自己执行
+
+        Returns:
+            重新调度的任务数
+        """
+        await self.requeue_stale(orphaned_worker=self.worker_id)
+
+        count = 0
+        for job in await asyncio.to_thread(self.store.list_jobs, [JOB_QUEUED], 1000):
+            if job.get("mode") != "async" or job["task_id"] in self._tasks:
+                continue
+            if job.get("worker_id") not in (None, self.worker_id):
+                continue
+            if await self._resubmit(job):
+                count += 1
+
+        if count:
+            logger.info(f"Resumed {count} queued jobs")
+        return count
+
+    async def requeue_stale(self, orphaned_worker: Optional[str] = None) -> int:
+        """
+        把心跳超时的运行中 / 排队中任务重新排队（同步任务标记失败），并在本 worker 中调度其中的异步任务
+
+        同一个任务只会被一个 worker 重新排队（在同一事务中完成），因此只由该 worker 调度
+
+        Returns:
+            重新调度的任务数
+        """
+        # 定期检查时本 worker 仍在运行，它自己的任务不算超时
+        live_worker = None if orphaned_worker else self.worker_id
+        requeued, failed = await asyncio.to_thread(
+            self.store.requeue_stale, self.stale_after, self.max_attempts, orphaned_worker, live_worker
+        )
+        for job in failed:
+            # 与 _finish 一致：标记失败的任务释放其上传文件引用
+            await asyncio.to_thread(self.release_upload, job)
+        if failed:
+            logger.info(f"Failed {len(failed)} interrupted jobs")
+        if not requeued:
+            return 0
+        logger.info(f"Re-queued {len(requeued)} interrupted jobs")
+        count = 0
+        for task_id in requeued:
+            job = await asyncio.to_thread(self.store.get_job, task_id)
+            if job and job["task_id"] not in self._tasks and await self._resubmit(job):
+                count += 1
+        return count
+
+    async def _resubmit(self, job: Dict[str, Any]) -> bool:
+        if not Path(job.get("file_path") or "").exists():
+            await asyncio.to_thread(
+                self.store.update_job, job["task_id"], status=JOB_FAILED, error="Uploaded file no longer exists"
+            )
+            await asyncio.to_thread(self.release_upload, job)
+            return False
+        self.submit(job["task_id"])
+        return True
+
+    def start_recovery(self) -> None:
+        """
+        启动定期恢复循环：刷新本 worker 排队中任务的心跳，并接管心跳超时的任务
+        （其他 worker 崩溃后，其任务在 stale_after 秒左右被接管）
+        """
+        if self._recovery_task is None:
+            self._recovery_task = asyncio.create_task(self._recovery_loop())
+
+    async def stop_recovery(self) -> None:
+        if self._recovery_task is not None:
+            self._recovery_task.cancel()
+            await asyncio.gather(self._recovery_task, return_exceptions=True)
+            self._recovery_task = None
+
+    async def _recovery_loop(self) -> None:
+        tick = min((i for i in (self.heartbeat_interval, self.recovery_interval) if i > 0), default=1.0)
+        last_recovery = time.monotonic()
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await asyncio.to_thread(self.store.touch_queued, self.worker_id)
+                if self.recovery_interval > 0 and time.monotonic() - last_recovery >= self.recovery_interval:
+                    last_recovery = time.monotonic()
+                    await self.requeue_stale()
+            except Exception as e:
+                logger.error(f"Stale job recovery failed: {str(e)}")
+
+    @staticmethod
+    def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """对外暴露的任务状态（不包含服务器内部路径）"""
+        return {
+            "task_id": job["task_id"],
+            "status": job["status"],
+            "model": job.get("model"),
+            "filename": job.get("filename"),
+            "priority": job.get("priority"),
+            "queue_wait_seconds": (job.get("metadata") or {}).get("queue_wait_seconds"),
+            "progress": job.get("progress") or {},
+            "error": job.get("error"),
+            "cancel_requested": bool(job.get("cancel_requested")),
+            "waiters": job.get("waiters", 1),
+            "attempts": job.get("attempts", 0),
+            "created_at": job.get("created_at"),
+            "started_at": job.get("started_at"),
+            "finished_at": job.get("finished_at"),
+            "has_result": bool(job.get("result_path")) and job["status"] == JOB_COMPLETED,
+        }
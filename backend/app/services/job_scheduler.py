@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler
+OCR 任务的优先级队列与按租户加权公平调度
+
+- 优先级类别之间严格按优先级出队：interactive > normal > bulk
+- 同一类别内部按租户 (API Key) 做加权公平排队 (WFQ)，
+  每个任务的虚拟完成时间 = max(类别虚拟时间, 租户上次完成时间) + 代价 / 权重
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")
+DEFAULT_TENANT = "anonymous"
+
+
+def parse_tenant_weights(spec: str) -> Dict[str, float]:
+    """解析 "tenantA:4,tenantB:1" 格式的租户权重配置"""
+    weights = {}
+    for item in (spec or "").split(","):
+        if ":" not in item:
+            continue
+        tenant, weight = item.rsplit(":", 1)
+        try:
+            weights[tenant.strip()] = max(float(weight), 0.01)
+        except ValueError:
+            logger.warning(f"Invalid tenant weight: {item}")
+    return weights
+
+
+class _ClassQueue:
+    """单个优先级类别的 WFQ 队列"""
+
+    def __init__(self):
+        self.heap: List[Tuple[float, int, float, asyncio.Future]] = []
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+
+    def push(self, tenant: str, cost: float, weight: float, seq: int, waiter: asyncio.Future) -> None:
+        start = max(self.virtual_time, self.last_finish.get(tenant, 0.0))
+        finish = start + cost / weight
+        self.last_finish[tenant] = finish
+        heapq.heappush(self.heap, (finish, seq, start, waiter))
+
+    def pop(self) -> Optional[asyncio.Future]:
+        while self.heap:
+            _, _, start, waiter = heapq.heappop(self.heap)
+            if waiter.done():
+                # 已取消的等待者
+                continue
+            self.virtual_time = max(self.virtual_time, start)
+            return waiter
+        return None
+
+    def __len__(self) -> int:
+        return sum(1 for *_, waiter in self.heap if not waiter.done())
+
+
+class _WaitStats:
+    """按类别统计排队等待时间"""
+
+    def __init__(self, window: int = 500):
+        self.samples = deque(maxlen=window)
+        self.total_count = 0
+        self.total_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.samples.append(wait)
+        self.total_count += 1
+        self.total_wait += wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+        return {
+            "count": self.total_count,
+            "avg_wait_seconds": round(self.total_wait / self.total_count, 3) if self.total_count else 0.0,
+            "p50_wait_seconds": percentile(0.50),
+            "p95_wait_seconds": percentile(0.95),
+            "max_wait_seconds": round(ordered[-1], 3) if ordered else 0.0,
+        }
+
+
+class JobScheduler:
+    """限制并发 OCR 任务数，并按优先级和租户公平地分配执行槽位"""
+
+    def __init__(self, max_concurrent: Optional[int] = None, tenant_weights: Optional[Dict[str, float]] = None):
+        self.max_concurrent = max_concurrent or int(os.getenv("OCR_MAX_CONCURRENT_JOBS", "2"))
+        self.tenant_weights = tenant_weights if tenant_weights is not None else parse_tenant_weights(
+            os.getenv("TENANT_WEIGHTS", "")
+        )
+        self._queues = {name: _ClassQueue() for name in PRIORITY_CLASSES}
+        self._stats = {name: _WaitStats() for name in PRIORITY_CLASSES}
+        self._running = 0
+        self._seq = itertools.count()
+
+    @staticmethod
+    def normalize_priority(priority: Optional[str], default: str = "normal") -> str:
+        priority = (priority or default).lower()
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority '{priority}'. Available: {', '.join(PRIORITY_CLASSES)}")
+        return priority
+
+    def weight_for(self, tenant: str) -> float:
+        return self.tenant_weights.get(tenant, self.tenant_weights.get("*", 1.0))
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "normal", tenant: str = DEFAULT_TENANT, cost: float = 1.0):
+        """
+        获取一个执行槽位
+
+        Args:
+            priority: 优先级类别
+            tenant: 租户标识
+            cost: 任务代价（如页数或文件大小），用于公平分配
+
+        Yields:
+            排队等待的秒数
+        """
+        priority = self.normalize_priority(priority)
+        enqueued_at = time.monotonic()
+
+        if self._running < self.max_concurrent and not self._has_waiters():
+            self._running += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues[priority].push(
+                tenant, max(cost, 0.001), self.weight_for(tenant), next(self._seq), waiter
+            )
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # 槽位已分配但调用方被取消，归还槽位
+                    self._release()
+                raise
+
+        waited = time.monotonic() - enqueued_at
+        self._stats[priority].record(waited)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def _has_waiters(self) -> bool:
+        return any(len(queue) for queue in self._queues.values())
+
+    def _release(self) -> None:
+        for name in PRIORITY_CLASSES:
+            waiter = self._queues[name].pop()
+            if waiter is not None:
+                # 槽位直接转交给下一个等待者
+                waiter.set_result(True)
+                return
+        self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """各优先级类别的排队长度与等待时间"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "classes": {
+                name: {"queued": len(self._queues[name]), **self._stats[name].snapshot()}
+                for name in PRIORITY_CLASSES
+            }
+        }
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Job Store
+持久化的任务状态存储，供多个 uvicorn worker 共享，并在重启后保留任务
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+FINAL_STATUSES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+# 以 JSON 形式存储的字段
+_JSON_FIELDS = ("options", "progress", "metadata")
+
+
+class JobStore(ABC):
+    """任务存储抽象接口，后续可以实现基于网络的存储（如 Redis / PostgreSQL）"""
+
+    @abstractmethod
+    def create_job(self, task_id: str, **fields) -> Dict[str, Any]:
+        """创建任务记录"""
+
+    @abstractmethod
+    def create_or_attach(self, task_id: str, fingerprint: str, stale_after: float = 60.0, **fields) -> Dict[str, Any]:
+        """
+        单飞（single-flight）创建：已有相同指纹、且心跳在 stale_after 秒内的排队/运行中任务时不创建新任务，
+        而是把该任务的等待者数加一并返回它；否则创建新任务（所属 worker 已退出的任务不会被附加）
+
+        Returns:
+            新建的任务，或被附加的已有任务（task_id 与传入的不同）
+        """
+
+    @abstractmethod
+    def detach(self, task_id: str, waiter_id: Optional[str] = None) -> Optional[int]:
+        """
+        移除一个等待者（waiter_id 为该请求自己的任务 ID，默认是创建任务的请求）
+
+        Returns:
+            剩余等待者数；该等待者已经脱离或从未附加时返回 None（重复调用不会再次减少计数）
+        """
+
+    @abstractmethod
+    def get_job(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录，不存在时返回 None"""
+
+    @abstractmethod
+    def update_job(self, task_id: str, **fields) -> bool:
+        """更新任务字段，返回是否有记录被更新"""
+
+    @abstractmethod
+    def claim_job(self, task_id: str, worker_id: str) -> bool:
+        """原子地将排队中的任务标记为由 worker_id 执行"""
+
+    @abstractmethod
+    def heartbeat(self, task_id: str, worker_id: str) -> None:
+        """刷新运行中任务的心跳时间"""
+
+    @abstractmethod
+    def touch_queued(self, worker_id: str) -> int:
+        """刷新 worker_id 名下排队中任务的心跳时间，返回更新的任务数"""
+
+    @abstractmethod
+    def request_cancel(self, task_id: str) -> Optional[str]:
+        """
+        请求取消任务：排队中的任务直接标记为已取消，运行中的任务设置取消标记
+
+        Returns:
+            取消后的任务状态，任务不存在时返回 None
+        """
+
+    @abstractmethod
+    def is_cancel_requested(self, task_id: str) -> bool:
+        """运行中的任务是否被请求取消（供执行该任务的 worker 轮询）"""
+
+    @abstractmethod
+    def list_jobs(self, statuses: Optional[List[str]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """按状态列出任务（按创建时间升序）"""
+
+    @abstractmethod
+    def requeue_stale(
+        self,
+        stale_after: float,
+        max_attempts: int,
+        orphaned_worker: Optional[str] = None,
+        live_worker: Optional[str] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        将心跳超时的运行中 / 排队中任务重新排队；同步任务（请求已随进程中断）和超过尝试次数的任务标记为失败
+
+        Args:
+            stale_after: 心跳超时秒数
+            max_attempts: 最大尝试次数，超过后标记为失败
+            orphaned_worker: 该 worker 名下的任务不论心跳都视为已中断（worker 以相同 ID 重启时）
+            live_worker: 该 worker 仍在运行，其名下的任务不视为超时；重新排队的任务归其所有
+
+        Returns:
+            (被重新排队的任务 ID 列表, 被标记为失败的任务记录列表)
+        """
+
+    def close(self) -> None:
+        """释放存储资源"""
+
+
+class SQLiteJobStore(JobStore):
+    """基于嵌入式 SQLite (WAL 模式) 的任务存储"""
+
+    _COLUMNS = (
+        "task_id", "status", "mode", "model", "filename", "file_path", "options",
+        "progress", "result_path", "error", "metadata", "worker_id", "attempts",
+        "created_at", "updated_at", "started_at", "finished_at", "heartbeat_at",
+        "priority", "tenant", "cost", "cancel_requested", "fingerprint", "waiters",
+    )
+
+    # 新增列：(列名, 定义)，用于升级旧版本创建的数据库
+    _MIGRATIONS = (
+        ("priority", "TEXT NOT NULL DEFAULT 'normal'"),
+        ("tenant", "TEXT"),
+        ("cost", "REAL NOT NULL DEFAULT 1.0"),
+        ("cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+        ("fingerprint", "TEXT"),
+        ("waiters", "INTEGER NOT NULL DEFAULT 1"),
+    )
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # 所有线程（包括 asyncio.to_thread 的线程池）打开的连接，close() 时统一关闭
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._init_schema()
+        logger.info(f"SQLite job store initialized: {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接（close() 之后线程再次使用时重新打开）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn not in self._connections:
+            # 连接只在创建它的线程中使用；关闭可能发生在其他线程
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.add(conn)
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                mode TEXT NOT NULL DEFAULT 'async',
+                model TEXT,
+                filename TEXT,
+                file_path TEXT,
+                options TEXT,
+                progress TEXT,
+                result_path TEXT,
+                error TEXT,
+                metadata TEXT,
+                worker_id TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in self._MIGRATIONS:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_fingerprint ON jobs(fingerprint, status)")
+
+        # 每个等待者一行，脱离操作按等待者去重
+        has_waiters = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_waiters'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_waiters (
+                task_id TEXT NOT NULL,
+                waiter_id TEXT NOT NULL,
+                PRIMARY KEY (task_id, waiter_id)
+            )
+        """)
+        if not has_waiters:
+            # 旧版本创建的进行中任务：创建它的请求作为唯一等待者
+            placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+            conn.execute(
+                f"INSERT OR IGNORE INTO job_waiters SELECT task_id, task_id FROM jobs WHERE status IN ({placeholders})",
+                ACTIVE_STATUSES
+            )
+
+    @staticmethod
+    def _encode(fields: Dict[str, Any]) -> Dict[str, Any]:
+        encoded = dict(fields)
+        for key in _JSON_FIELDS:
+            if key in encoded and encoded[key] is not None and not isinstance(encoded[key], str):
+                encoded[key] = json.dumps(encoded[key], ensure_ascii=False)
+        return encoded
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in _JSON_FIELDS:
+            if job.get(key):
+                try:
+                    job[key] = json.loads(job[key])
+                except (TypeError, ValueError):
+                    pass
+        return job
+
+    def _check_columns(self, fields: Dict[str, Any]) -> None:
+        unknown = set(fields) - set(self._COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+
+    def create_job(self, task_id: str, **fields) -> Dict[str, Any]:
+        now = time.time()
+        fields.setdefault("status", JOB_QUEUED)
+        # 排队中的任务由其所属 worker（worker_id）定期刷新心跳，心跳超时说明该 worker 已退出
+        fields.setdefault("heartbeat_at", now)
+        fields.update(task_id=task_id, created_at=now, updated_at=now)
+        self._check_columns(fields)
+        encoded = self._encode(fields)
+
+        columns = ", ".join(encoded)
+        placeholders = ", ".join("?" for _ in encoded)
+        conn = self._connect()
+        conn.execute(
+            f"INSERT INTO jobs ({columns}) VALUES ({placeholders})",
+            tuple(encoded.values())
+        )
+        conn.execute("INSERT OR IGNORE INTO job_waiters (task_id, waiter_id) VALUES (?, ?)", (task_id, task_id))
+        return self.get_job(task_id)
+
+    def create_or_attach(self, task_id: str, fingerprint: str, stale_after: float = 60.0, **fields) -> Dict[str, Any]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+            row = conn.execute(
+                f"""
+                SELECT task_id FROM jobs
+                WHERE fingerprint = ? AND status IN ({placeholders}) AND cancel_requested = 0
+                  AND COALESCE(heartbeat_at, 0) >= ?
+                ORDER BY created_at LIMIT 1
+                """,
+                (fingerprint, *ACTIVE_STATUSES, time.time() - stale_after)
+            ).fetchone()
+            if row:
+                added = conn.execute(
+                    "INSERT OR IGNORE INTO job_waiters (task_id, waiter_id) VALUES (?, ?)",
+                    (row["task_id"], task_id)
+                ).rowcount
+                if added:
+                    conn.execute(
+                        "UPDATE jobs SET waiters = waiters + 1, updated_at = ? WHERE task_id = ?",
+                        (time.time(), row["task_id"])
+                    )
+                task_id = row["task_id"]
+            else:
+                self.create_job(task_id, fingerprint=fingerprint, **fields)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get_job(task_id)
+
+    def detach(self, task_id: str, waiter_id: Optional[str] = None) -> Optional[int]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = conn.execute(
+                "DELETE FROM job_waiters WHERE task_id = ? AND waiter_id = ?", (task_id, waiter_id or task_id)
+            ).rowcount
+            if removed:
+                conn.execute(
+                    "UPDATE jobs SET waiters = MAX(waiters - 1, 0), updated_at = ? WHERE task_id = ?",
+                    (time.time(), task_id)
+                )
+            row = conn.execute("SELECT waiters FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not removed or row is None:
+            return None
+        return row["waiters"]
+
+    def get_job(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return self._decode(row) if row else None
+
+    def update_job(self, task_id: str, **fields) -> bool:
+        if not fields:
+            return False
+        fields["updated_at"] = time.time()
+        self._check_columns(fields)
+        encoded = self._encode(fields)
+
+        assignments = ", ".join(f"{column} = ?" for column in encoded)
+        cursor = self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE task_id = ?",
+            (*encoded.values(), task_id)
+        )
+        return cursor.rowcount > 0
+
+    def claim_job(self, task_id: str, worker_id: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            """
+            UPDATE jobs
+            SET status = ?, worker_id = ?, attempts = attempts + 1,
+                started_at = ?, heartbeat_at = ?, updated_at = ?
+            WHERE task_id = ? AND status = ?
+            """,
+            (JOB_RUNNING, worker_id, now, now, now, task_id, JOB_QUEUED)
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, task_id: str, worker_id: str) -> None:
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ?, updated_at = ? WHERE task_id = ? AND worker_id = ?",
+            (now, now, task_id, worker_id)
+        )
+
+    def touch_queued(self, worker_id: str) -> int:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND worker_id = ?",
+            (now, JOB_QUEUED, worker_id)
+        )
+        return cursor.rowcount
+
+    def request_cancel(self, task_id: str) -> Optional[str]:
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.execute(
+            """
+            UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ?, updated_at = ?
+            WHERE task_id = ? AND status = ?
+            """,
+            (JOB_CANCELLED, now, now, task_id, JOB_QUEUED)
+        )
+        if cursor.rowcount == 0:
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE task_id = ? AND status = ?",
+                (now, task_id, JOB_RUNNING)
+            )
+
+        row = conn.execute("SELECT status FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return row["status"] if row else None
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        row = self._connect().execute(
+            "SELECT cancel_requested FROM jobs WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def list_jobs(self, statuses: Optional[List[str]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        if statuses:
+            placeholders = ", ".join("?" for _ in statuses)
+            rows = self._connect().execute(
+                f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY created_at LIMIT ?",
+                (*statuses, limit)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def requeue_stale(
+        self,
+        stale_after: float,
+        max_attempts: int,
+        orphaned_worker: Optional[str] = None,
+        live_worker: Optional[str] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        now = time.time()
+        cutoff = now - stale_after
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                """
+                SELECT * FROM jobs
+                WHERE status IN (?, ?)
+                  AND (COALESCE(heartbeat_at, 0) < ? OR worker_id = ?)
+                  AND (? IS NULL OR COALESCE(worker_id, '') != ?)
+                """,
+                (JOB_RUNNING, JOB_QUEUED, cutoff, orphaned_worker, live_worker, live_worker)
+            ).fetchall()
+
+            requeued, failed = [], []
+            for row in rows:
+                # 同步请求的客户端已经断开，没有人等待结果，直接标记失败
+                if row["mode"] != "async" or row["attempts"] >= max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE task_id = ?",
+                        (JOB_FAILED, "Interrupted by worker restart", now, now, row["task_id"])
+                    )
+                    failed.append(self._decode(row))
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = ?, heartbeat_at = ?, updated_at = ? WHERE task_id = ?",
+                        (JOB_QUEUED, live_worker or orphaned_worker, now, now, row["task_id"])
+                    )
+                    requeued.append(row["task_id"])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return requeued, failed
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+
+def create_job_store(url: Optional[str] = None) -> JobStore:
+    """
+    根据 JOB_STORE_URL 创建任务存储
+
+    目前支持 sqlite:///path/to/jobs.db，其他协议预留给网络存储实现
+    """
+    url = url or os.getenv("JOB_STORE_URL", "sqlite:///./data/jobs.db")
+
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+
+    raise ValueError(f"Unsupported job store URL: {url}")
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Keyword Engine
+基于全语料文档频率的 TF-IDF 关键词提取，三个模型共用：
+- 中日韩文字切分为 2/3 字 n-gram，其他文字按单词切分（去掉 HTML 标签、链接和停用词）
+- 文档频率表持久化在 SQLite 中，每个文档（按文本哈希去重）处理完成后增量更新
+- 高分 n-gram 在原文中相互重叠的出现合并为更长的短语（「合同金」+「同金额」→「合同金额」）
+- 打分线性遍历词表，用堆选出 top-k；得分相近时优先较长的短语，互相重叠的候选只保留一个
+"""
+
+import contextvars
+import hashlib
+import heapq
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 假名、CJK 统一汉字（含扩展 A / 兼容区）、韩文音节
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_RUN = re.compile(f"[{CJK_CHARS}]+")
+# 中日韩文字连续段，或以字母开头、不含中日韩文字的单词
+_TOKEN = re.compile(f"[{CJK_CHARS}]+|[^\\W\\d_{CJK_CHARS}][^\\W{CJK_CHARS}]*")
+# HTML 标签、markdown 链接/图片地址、URL、LaTeX 命令
+_NOISE = re.compile(r"<[^>]+>|\]\([^)]*\)|https?://\S+|\\[a-zA-Z]+")
+
+# n-gram 以这些字开头或结尾时不作为候选词
+CJK_STOP_CHARS = set("的了是在和与及或等为对将把被之其这那也就都而于以个中上下不有我你他她它们")
+LATIN_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were", "been", "have", "has",
+    "had", "not", "but", "you", "your", "our", "its", "their", "they", "them", "can", "will", "would",
+    "should", "could", "may", "into", "than", "then", "there", "these", "those", "which", "who", "what",
+    "when", "where", "how", "all", "any", "each", "other", "such", "only", "also", "more", "most", "some",
+    "page", "table", "figure", "image", "images", "jpg", "png", "nbsp",
+}
+
+
+def tokenize(text: str, ngram_sizes: Tuple[int, ...] = (2, 3), min_word_length: int = 3) -> List[str]:
+    """切分为候选词：中日韩 n-gram + 小写单词（已去除停用词）"""
+    terms = []
+    for token in _TOKEN.findall(_NOISE.sub(" ", text)):
+        if _CJK_RUN.fullmatch(token):
+            for size in ngram_sizes:
+                for i in range(len(token) - size + 1):
+                    if token[i] in CJK_STOP_CHARS or token[i + size - 1] in CJK_STOP_CHARS:
+                        continue
+                    terms.append(token[i:i + size])
+        else:
+            word = token.lower()
+            if len(word) >= min_word_length and word not in LATIN_STOPWORDS:
+                terms.append(word)
+    return terms
+
+
+def cjk_runs(text: str) -> List[str]:
+    """去除噪声后的中日韩文字连续段（与 tokenize 的切分一致）"""
+    return _CJK_RUN.findall(_NOISE.sub(" ", text))
+
+
+def merge_phrases(
+    text: str,
+    pool: set,
+    idf: Dict[str, float],
+    ngram_sizes: Tuple[int, ...] = (2, 3),
+    max_length: int = 8
+) -> Dict[str, float]:
+    """
+    把高分 n-gram 在原文中相互重叠的出现合并为短语（线性扫描一遍原文）
+
+    Args:
+        text: 文档全文
+        pool: 参与合并的高分中日韩 n-gram
+        idf: n-gram 的 IDF
+        max_length: 短语最大长度，超过时不合并（保留各 n-gram 本身）
+
+    Returns:
+        短语 -> 得分；短语的文档频率不会高于其中任何一个 n-gram，
+        因此以其中最大的 IDF 作为短语 IDF 的下界
+    """
+    sizes = sorted(ngram_sizes, reverse=True)
+    counts: Counter = Counter()
+
+    def add(run: str, start: int, end: int) -> None:
+        if max(sizes) < end - start <= max_length:
+            counts[run[start:end]] += 1
+
+    for run in cjk_runs(text):
+        start = end = -1
+        for i in range(len(run)):
+            for size in sizes:
+                gram = run[i:i + size]
+                if len(gram) == size and gram in pool:
+                    if i < end:
+                        end = max(end, i + size)
+                    else:
+                        if start >= 0:
+                            add(run, start, end)
+                        start, end = i, i + size
+                    break
+        if start >= 0:
+            add(run, start, end)
+
+    phrases = {}
+    for phrase, tf in counts.items():
+        parts = [
+            phrase[i:i + size] for size in sizes for i in range(len(phrase) - size + 1)
+            if phrase[i:i + size] in idf
+        ]
+        phrases[phrase] = (1 + math.log(tf)) * max(idf[part] for part in parts)
+    return phrases
+
+
+def _overlaps(term: str, kept: str) -> bool:
+    """互相包含，或为同一文字段中相邻的 n-gram（如「发票号」与「票号码」）"""
+    if term in kept or kept in term:
+        return True
+    size = min(len(term), len(kept)) - 1
+    return size > 0 and (term[:size] == kept[-size:] or kept[:size] == term[-size:])
+
+
+def select_top_k(scores: Dict[str, float], top_k: int, tolerance: float = 0.8) -> List[str]:
+    """
+    堆选择 top-k（O(n log k)）
+
+    中日韩候选词有包含它、且得分不低于其 tolerance 倍的更长候选时改选更长的
+    （「合同」→「合同金额」）；相互重叠的中日韩候选词只保留一个
+    """
+    if top_k <= 0:
+        return []
+    candidates = heapq.nlargest(top_k * 4, scores.items(), key=lambda item: (item[1], len(item[0])))
+    selected: List[str] = []
+    for term, score in candidates:
+        if _CJK_RUN.search(term):
+            longer = [
+                (len(other), other_score, other) for other, other_score in candidates
+                if len(other) > len(term) and term in other and other_score >= score * tolerance
+            ]
+            if longer:
+                term = max(longer)[2]
+            if term in selected or any(_overlaps(term, kept) for kept in selected if _CJK_RUN.search(kept)):
+                continue
+        selected.append(term)
+        if len(selected) == top_k:
+            break
+    return selected
+
+
+class KeywordEngine:
+    """TF-IDF 关键词提取（文档频率表由多 worker 共享）"""
+
+    def __init__(self, db_path: Optional[str] = None, top_k: Optional[int] = None):
+        self.db_path = Path(db_path or os.getenv("KEYWORD_DB", "./data/keywords.db"))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.top_k = top_k or int(os.getenv("KEYWORD_TOP_K", "10"))
+        self.ngram_sizes = tuple(
+            int(size) for size in os.getenv("KEYWORD_CJK_NGRAMS", "2,3").split(",") if size.strip()
+        )
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (term TEXT PRIMARY KEY)")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS term_df (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                digest TEXT PRIMARY KEY,
+                terms INTEGER NOT NULL,
+                added_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def extract(self, text: str, top_k: Optional[int] = None, update: bool = False) -> List[str]:
+        """
+        提取文档的 top-k TF-IDF 关键词
+
+        Args:
+            text: 文档全文（markdown）
+            top_k: 关键词数量，默认 KEYWORD_TOP_K
+            update: 是否把该文档计入文档频率表（同一文本只计一次）
+        """
+        counts = Counter(tokenize(text or "", self.ngram_sizes))
+        if not counts:
+            return []
+        conn = self._connect()
+        # 先填充连接私有的 TEMP 查找表：只写临时库，不占用共享数据库的写锁
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DELETE FROM lookup")
+            conn.executemany("INSERT INTO lookup (term) VALUES (?)", ((term,) for term in counts))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        # 写事务内只有文档频率的 upsert 和两次读取，其他 worker 等待写锁的时间尽量短
+        conn.execute("BEGIN IMMEDIATE" if update else "BEGIN")
+        try:
+            if update:
+                self._add_document(conn, text, counts)
+            total_docs = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            df = dict(conn.execute("SELECT l.term, d.df FROM lookup l JOIN term_df d ON d.term = l.term"))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.execute("DELETE FROM lookup")
+
+        # 平滑 IDF：log((1 + N) / (1 + df)) + 1，新词不会得到无穷大权重
+        idf = {term: math.log((1 + total_docs) / (1 + df.get(term, 0))) + 1 for term in counts}
+        scores = {term: (1 + math.log(tf)) * idf[term] for term, tf in counts.items()}
+
+        top_k = top_k or self.top_k
+        pool = {
+            term for term, _ in heapq.nlargest(top_k * 4, scores.items(), key=lambda item: item[1])
+            if _CJK_RUN.fullmatch(term)
+        }
+        if pool:
+            for phrase, score in merge_phrases(text, pool, idf, self.ngram_sizes).items():
+                scores[phrase] = max(score, scores.get(phrase, 0.0))
+        return select_top_k(scores, top_k)
+
+    @staticmethod
+    def _add_document(conn: sqlite3.Connection, text: str, counts: Counter) -> None:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        added = conn.execute(
+            "INSERT OR IGNORE INTO documents (digest, terms, added_at) VALUES (?, ?, ?)",
+            (digest, len(counts), time.time())
+        ).rowcount
+        if added:
+            conn.executemany(
+                "INSERT INTO term_df (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                ((term,) for term in counts)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        return {
+            "documents": conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+            "terms": conn.execute("SELECT COUNT(*) FROM term_df").fetchone()[0],
+            "top_k": self.top_k,
+            "db_bytes": self.db_path.stat().st_size if self.db_path.exists() else 0,
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_engine: Optional[KeywordEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_keyword_engine() -> KeywordEngine:
+    """进程内共享的关键词引擎"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = KeywordEngine()
+    return _engine
+
+
+# OCRPipeline 在合并后的全文上统一提取一次关键词，期间各模型内部的提取直接跳过
+_deferred = contextvars.ContextVar("keywords_deferred", default=False)
+
+
+@contextmanager
+def deferred_keywords():
+    """在此上下文中（包括其中创建的任务和 to_thread 线程）extract_keywords 返回空列表"""
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+
+
+def extract_keywords(text: str, update: bool = False) -> List[str]:
+    """各模型共用的关键词入口，关键词提取失败不影响 OCR 结果"""
+    if _deferred.get():
+        return []
+    try:
+        return get_keyword_engine().extract(text, update=update)
+    except Exception as e:
+        logger.warning(f"Keyword extraction failed: {str(e)}")
+        return []
@@ -6,6 +6,7 @@ Markdown Parser Service
 """
 
 import re
+import html
 import logging
 import base64
 from pathlib import Path
@@ -13,6 +14,8 @@ from typing import Dict, List, Any, Optional, Tuple
 import json
 import os
 
+from app.services.keyword_engine import extract_keywords
+
 logger = logging.getLogger(__name__)
 
 class MarkdownParser:
@@ -257,12 +260,16 @@ class MarkdownParser:
             img_path = item.get("img_path", "")
             text = item.get("text", "").strip()
 
-            # 检查是否有对应的base64图片数据
+            # 检查是否有对应的base64图片数据（启用缩略图时为 {"base64", "thumbnail"}）
             img_base64 = None
+            thumbnail = None
             if images_data:
                 logger.info(f"🖼️  图片 {idx}: img_path={img_path}, images_data有{len(images_data)}个图片")
                 if img_path in images_data:
                     img_base64 = images_data[img_path]
+                    if isinstance(img_base64, dict):
+                        thumbnail = img_base64.get("thumbnail")
+                        img_base64 = img_base64.get("base64")
                     logger.info(f"   ✅ 找到base64数据，长度: {len(img_base64) if img_base64 else 0}")
                 else:
                     logger.warning(f"   ⚠️  未找到base64数据，可用的key: {list(images_data.keys())[:3]}")
@@ -274,6 +281,7 @@ class MarkdownParser:
                 'type': '图像',
                 'path': img_path,
                 'base64': img_base64,
+                'thumbnail': thumbnail,
                 'altText': text,
                 'description': text if text else f"图片 {idx + 1}",
                 'confidence': 88.0,
@@ -341,22 +349,8 @@ class MarkdownParser:
             return None
 
     def _extract_keywords_from_markdown(self, content: str) -> List[str]:
-        """从markdown内容中提取���键词"""
-        # 简单的关键词提取逻辑
-        # 可以使用更复杂的NLP方法
-        common_words = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'}
-
-        # 提取中文词汇（简单实现）
-        words = re.findall(r'[\u4e00-\u9fff]+', content)
-        word_freq = {}
-
-        for word in words:
-            if len(word) >= 2 and word not in common_words:
-                word_freq[word] = word_freq.get(word, 0) + 1
-
-        # 返回频率最高的10个词
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        return [word for word, freq in sorted_words[:10]]
+        """从markdown内容中提取关键词（全语料 TF-IDF）"""
+        return extract_keywords(content)
 
     def parse(self, content: str) -> Dict[str, Any]:
         """
@@ -573,7 +567,6 @@ class MarkdownParser:
                         # 移除HTML标签和多余空格，解码HTML实体
                         clean_text = re.sub(r'<[^>]+>', '', cell).strip()
                         # 解码HTML实体如 &#x27;
-                        import html
                         clean_text = html.unescape(clean_text)
                         cleaned_cells.append(clean_text)
 
@@ -4,31 +4,40 @@ MinerU Service
 """
 
 import asyncio
-import json
 import logging
 import os
-import requests
+import httpx
 import tempfile
-import base64
-from io import BytesIO
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from dotenv import load_dotenv
+from typing import Dict, Any, Optional, List, Set
 
-logger = logging.getLogger(__name__)
+from app.utils.config import load_environment
+from app.utils.json_stream import load_json, LazyJSONFields
+from app.utils.image_encoding import get_image_encoder, EncodingSummary
+from app.utils.page_render import PageRenderCache
 
-# PDF和图像处理库
-try:
-    import pypdfium2
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    logger.warning("pypdfium2 or PIL not available - image extraction will be disabled")
+logger = logging.getLogger(__name__)
 
 # 加载环境变量
-env_path = Path(__file__).parent.parent.parent / '.env'
-load_dotenv(dotenv_path=env_path, override=True)
+load_environment()
+
+# PDF和图像处理库（按需导入，只有从PDF提取图片时才需要）
+_image_libs = None
+
+
+def _load_image_libs():
+    """导入 pypdfium2 / PIL / NumPy，不可用时返回 None"""
+    global _image_libs
+    if _image_libs is None:
+        try:
+            import numpy
+            import pypdfium2
+            from PIL import Image  # noqa: F401  pypdfium2 的 to_pil() 依赖 PIL
+            _image_libs = (pypdfium2, numpy)
+        except ImportError:
+            _image_libs = False
+            logger.warning("pypdfium2, PIL or numpy not available - image extraction will be disabled")
+    return _image_libs or None
 
 class MinerUService:
     """MinerU 服务类"""
@@ -39,13 +48,13 @@ class MinerUService:
         self.vllm_url = os.getenv("VLLM_SERVER_URL", "http://192.168.110.131:30000")
         self.backend = os.getenv("MINERU_BACKEND", "pipeline")
         self.timeout = int(os.getenv("MINERU_TIMEOUT", "600"))
+        # model_output 体积大且后续流程不使用，默认不请求
+        self.return_model_output = os.getenv("MINERU_RETURN_MODEL_OUTPUT", "false").lower() == "true"
+        # 响应体超过该大小时从内存转存到临时文件
+        self.spool_max_bytes = int(os.getenv("MINERU_RESPONSE_SPOOL_BYTES", str(16 * 1024 * 1024)))
 
-        # 可视化输出目录
-        self.viz_base_dir = Path(os.getenv(
-            "MINERU_VIZ_DIR",
-            "/home/MuyuWorkSpace/05_OcrProject/backend/mineru_visualizations"
-        ))
-        self.viz_base_dir.mkdir(parents=True, exist_ok=True)
+        # 可视化输出目录（按需创建）
+        self.viz_base_dir = Path(os.getenv("MINERU_VIZ_DIR", "./mineru_visualizations"))
 
     async def parse_pdf(
         self,
@@ -53,7 +62,10 @@ class MinerUService:
         backend: str = "pipeline",
         enable_ocr: bool = True,
         language: str = "ch",
-        device: str = "cuda:3"
+        device: str = "cuda:3",
+        fields: Optional[Set[str]] = None,
+        return_model_output: Optional[bool] = None,
+        save_markdown: bool = True
     ) -> Dict[str, Any]:
         """
         解析PDF文件 - 使用 ocr_v2_extractors.py 中的 MinerUExtractor 逻辑
@@ -64,10 +76,20 @@ class MinerUService:
             enable_ocr: 是否启用OCR
             language: 文档语言
             device: 设备
+            fields: 需要的输出（content_list / middle_json / images），None 表示全部；
+                未请求的字段不会向 MinerU 请求，也不做后续处理
+            return_model_output: 是否请求并返回 model_output（默认取 MINERU_RETURN_MODEL_OUTPUT）
+            save_markdown: 是否另存为 TEMP_DIR/{stem}_parsed.md（供独立脚本查看）。路径只取决于 PDF 文件名，
+                并发任务会互相覆盖，OCRPipeline 直接使用返回的 content，不写文件
 
         Returns:
             解析结果字典，包含markdown和结构化数据
         """
+        if return_model_output is None:
+            return_model_output = self.return_model_output
+        if fields is None:
+            fields = {"markdown", "content_list", "middle_json", "images"}
+
         try:
             logger.info(f"[MinerU] 开始解析PDF: {Path(pdf_path).name}")
 
@@ -85,37 +107,38 @@ class MinerUService:
             # 调用 MinerU API
             logger.info(f"调用 MinerU API: {self.api_url}")
 
-            # 1. 调用MinerU API
-            with open(pdf_file, 'rb') as f:
-                files = [('files', (pdf_file.name, f, 'application/pdf'))]
-                data = {
-                    'backend': backend,
-                    'server_url': self.vllm_url,
-                    'parse_method': 'auto',
-                    'lang_list': language,
-                    'return_md': 'true',
-                    'return_middle_json': 'true',
-                    'return_model_output': 'true',
-                    'return_content_list': 'true',
-                    'start_page_id': '0',
-                    'end_page_id': '99999',
-                }
-
-                response = requests.post(
-                    self.api_url,
-                    files=files,
-                    data=data,
-                    timeout=self.timeout
-                )
+            # 1. 调用MinerU API（异步请求，任务被取消时连接随之关闭，上游随即中止处理）
+            pdf_bytes = await asyncio.to_thread(pdf_file.read_bytes)
+            files = [('files', (pdf_file.name, pdf_bytes, 'application/pdf'))]
+            data = {
+                'backend': backend,
+                'server_url': self.vllm_url,
+                'parse_method': 'auto',
+                'lang_list': language,
+                'return_md': 'true',
+                'return_middle_json': 'true' if "middle_json" in fields else 'false',
+                'return_model_output': 'true' if return_model_output else 'false',
+                'return_content_list': 'true' if "content_list" in fields else 'false',
+                'start_page_id': '0',
+                'end_page_id': '99999',
+            }
 
-            if response.status_code != 200:
-                raise Exception(f"MinerU API返回错误: {response.status_code}")
-
-            # 2. 解析返回结果（参考 ocr_v2_extractors.py:105-125）
-            if response.headers.get("content-type", "").startswith("application/json"):
-                file_json = response.json()
-            else:
-                file_json = json.loads(response.text)
+            # 响应体流式写入（小响应留在内存，大响应转存磁盘），不同时持有原始文本和解析结果
+            body = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    async with client.stream("POST", self.api_url, files=files, data=data) as response:
+                        if response.status_code != 200:
+                            raise Exception(f"MinerU API返回错误: {response.status_code}")
+                        async for chunk in response.aiter_bytes():
+                            body.write(chunk)
+
+                # 2. 解析返回结果（参考 ocr_v2_extractors.py:105-125），一次流式解析
+                body.seek(0)
+                skip_keys = () if return_model_output else ("model_output",)
+                file_json = await asyncio.to_thread(load_json, body, skip_keys)
+            finally:
+                body.close()
 
             # 提取顶层信息
             backend = file_json.get("backend", self.backend)
@@ -131,46 +154,41 @@ class MinerUService:
             if not file_key:
                 raise Exception("MinerU返回结果为空")
 
-            res = results[file_key]
+            # 内嵌的 JSON 字符串在首次访问时才解码
+            res = LazyJSONFields(
+                results[file_key],
+                lazy_keys=("middle_json", "model_output", "content_list", "images", "page_images")
+            )
+            del file_json, results
 
             # 解析各个部分（
             md_content = res.get("md_content", "")
 
-            # 解析JSON字符串
-            def safe_json_loads(text):
-                if not isinstance(text, str):
-                    return text
-                try:
-                    return json.loads(text.strip())
-                except:
-                    return None
-
-            middle_json = safe_json_loads(res.get("middle_json"))
-            model_output = safe_json_loads(res.get("model_output"))
-            content_list = safe_json_loads(res.get("content_list"))
+            middle_json = res.get("middle_json") if "middle_json" in fields else None
+            content_list = res.get("content_list") if "content_list" in fields else None
 
             # 调试 images 数据
-            images_raw = res.get("images")
-            logger.info(f"images_raw type: {type(images_raw)}")
-            if images_raw:
-                logger.info(f"images_raw preview: {str(images_raw)[:200]}...")
-            else:
-                logger.warning("API返回的images_raw为None或空 - 这是正常的,50000端口API不返回images")
-
-            images = safe_json_loads(images_raw)
-            logger.info(f"images after safe_json_loads type: {type(images)}")
-            if images:
+            images = res.get("images") if "images" in fields else None
+            encoding_summary = EncodingSummary()
+            render_stats: Dict[str, Any] = {}
+            logger.info(f"images type: {type(images)}")
+            if "images" not in fields:
+                logger.info("未请求 images，跳过图片提取")
+            elif images:
                 if isinstance(images, dict):
                     logger.info(f"images keys: {list(images.keys())[:3]}")
+                    # API 返回的图片同样经过统一的编码环节（默认原样透传）
+                    images = await asyncio.to_thread(self._encode_returned_images, images, encoding_summary)
                 else:
                     logger.info(f"images is not dict: {type(images)}")
             else:
                 # 50000端口API不返回images,需要从PDF中提取图片
-                logger.info("从PDF提取图片数据")
-                images = self._extract_images_from_pdf(pdf_file, content_list, middle_json)
-                logger.info(f"提取了 {len(images)} 个图片")
-
-            page_images = safe_json_loads(res.get("page_images"))
+                logger.info("API未返回images（50000端口API不返回images），从PDF提取图片数据")
+                images = await asyncio.to_thread(
+                    self._extract_images_from_pdf,
+                    pdf_file, content_list, middle_json, encoding_summary, render_stats
+                )
+                logger.info(f"提取了 {len(images)} 个图片, 编码统计: {encoding_summary.to_dict()}")
 
             # 统计信息
             total_pages = len(middle_json.get("pdf_info", [])) if middle_json else 0
@@ -183,42 +201,48 @@ class MinerUService:
             logger.info(f"   - Content_list 条目: {len(content_list) if content_list else 0}")
 
             # 3. 保存结果到本地（保持与原来相同的逻辑）
-            output_dir = Path(os.getenv("TEMP_DIR", "./temp"))
-            output_dir.mkdir(parents=True, exist_ok=True)
+            output_file = None
+            if save_markdown:
+                output_dir = Path(os.getenv("TEMP_DIR", "./temp"))
+                output_dir.mkdir(parents=True, exist_ok=True)
 
-            output_file = output_dir / f"{pdf_file.stem}_parsed.md"
-            output_file.write_text(md_content, encoding='utf-8')
+                output_file = output_dir / f"{pdf_file.stem}_parsed.md"
+                output_file.write_text(md_content, encoding='utf-8')
 
-            logger.info(f"Markdown已保存到: {output_file.absolute()}")
+                logger.info(f"Markdown已保存到: {output_file.absolute()}")
 
             # 4. 返回完整结果（包含结构化数据）
             return {
                 "success": True,
                 "content": md_content,
-                "markdown_file": str(output_file),
-                "raw_data": {
-                    # 保留原始 API 返回的所有字段（参考 ocr_v2_extractors.py:180-202）
+                "markdown_file": str(output_file) if output_file else None,
+                "raw_data": LazyJSONFields({
+                    # 保留原始 API 返回的字段（参考 ocr_v2_extractors.py:180-202）
                     'md_content': md_content,
                     'middle_json': middle_json,  # 已解析的对象（不是字符串）
-                    'model_output': model_output,  # 已解析的对象
                     'content_list': content_list,  # 已解析的对象
                     'images': images,  # 图片数据
-                    'page_images': page_images,  # 页面图片数据
+                    # 以下字段在访问时才解码；model_output 只在请求时返回
+                    'page_images': res.get_encoded("page_images"),
+                    **({'model_output': res.get_encoded("model_output")} if return_model_output else {}),
                     # 添加顶层信息
                     'backend': backend,
                     'version': version,
-                },
+                }, lazy_keys=("page_images", "model_output")),
                 "metadata": {
                     "backend": backend,
                     "version": version,
                     "total_pages": total_pages,
                     "total_images": total_images,
-                    "content_list_count": len(content_list) if content_list else 0
+                    "content_list_count": len(content_list) if content_list else 0,
+                    "fields": sorted(fields),
+                    "image_encoding": encoding_summary.to_dict(),
+                    "page_render": render_stats
                 },
                 "stats": {
                     "totalCharacters": len(md_content),
                     "totalLines": md_content.count(chr(10)) + 1,
-                    "fileSizeKB": output_file.stat().st_size / 1024
+                    "fileSizeKB": len(md_content.encode('utf-8')) / 1024
                 }
             }
 
@@ -244,214 +268,234 @@ class MinerUService:
                     count += 1
         return count
 
-    def _calculate_transform_params(
-        self,
-        page_idx: int,
-        middle_json: dict,
-        content_list: list
-    ) -> tuple:
-        """计算坐标转换参数（来自参考代码）"""
-        SCALE_X = SCALE_Y = 1.0
-        OFFSET_X = OFFSET_Y = 0.0
-
-        if not middle_json:
-            return (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+    @staticmethod
+    def _encode_returned_images(images: dict, summary: EncodingSummary) -> dict:
+        """处理 MinerU API 返回的 base64 图片"""
+        encoder = get_image_encoder()
+        return {
+            name: summary.add(encoder.encode_base64(data, "image/jpeg")).as_value() if isinstance(data, str) else data
+            for name, data in images.items()
+        }
+
+    @staticmethod
+    def _page_transform_params(middle_json: dict, content_list: list) -> Dict[int, tuple]:
+        """
+        一次遍历计算每页的坐标转换参数（来自参考代码）
 
-        pdf_info = middle_json.get("pdf_info", [])
-        if page_idx >= len(pdf_info):
-            return (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+        以每页第一个 middle_json 块与第一个 content_list 条目的 bbox 对齐：
+        content_list 坐标 = middle_json 坐标 * SCALE + OFFSET
 
-        middle_blocks = pdf_info[page_idx].get("preproc_blocks", [])
-        content_items = [
-            item for item in content_list
-            if isinstance(item, dict) and item.get("page_idx") == page_idx
-        ]
+        Returns:
+            page_idx -> (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)，缺少对齐数据的页不在其中
+        """
+        pdf_info = (middle_json or {}).get("pdf_info", [])
+
+        # 每页第一个 content_list 条目
+        first_items = {}
+        for item in content_list or []:
+            if isinstance(item, dict):
+                first_items.setdefault(item.get("page_idx"), item)
+
+        params = {}
+        for page_idx, item in first_items.items():
+            if not isinstance(page_idx, int) or not 0 <= page_idx < len(pdf_info):
+                continue
+            middle_blocks = pdf_info[page_idx].get("preproc_blocks", [])
+            if not middle_blocks:
+                continue
 
-        if middle_blocks and content_items:
             m_bbox = middle_blocks[0].get("bbox", [])
-            c_bbox = content_items[0].get("bbox", [])
-
-            if len(m_bbox) >= 4 and len(c_bbox) >= 4:
-                SCALE_X = (c_bbox[2] - c_bbox[0]) / (m_bbox[2] - m_bbox[0]) if (m_bbox[2] - m_bbox[0]) > 0 else 1.0
-                SCALE_Y = (c_bbox[3] - c_bbox[1]) / (m_bbox[3] - m_bbox[1]) if (m_bbox[3] - m_bbox[1]) > 0 else 1.0
-                OFFSET_X = c_bbox[0] - m_bbox[0] * SCALE_X
-                OFFSET_Y = c_bbox[1] - m_bbox[1] * SCALE_Y
-
-        return (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
-
-    def _transform_bbox(
-        self,
-        bbox: list,
-        page_idx: int,
-        middle_json: dict,
-        content_list: list,
+            c_bbox = item.get("bbox", [])
+            if len(m_bbox) < 4 or len(c_bbox) < 4:
+                continue
+
+            SCALE_X = (c_bbox[2] - c_bbox[0]) / (m_bbox[2] - m_bbox[0]) if (m_bbox[2] - m_bbox[0]) > 0 else 1.0
+            SCALE_Y = (c_bbox[3] - c_bbox[1]) / (m_bbox[3] - m_bbox[1]) if (m_bbox[3] - m_bbox[1]) > 0 else 1.0
+            OFFSET_X = c_bbox[0] - m_bbox[0] * SCALE_X
+            OFFSET_Y = c_bbox[1] - m_bbox[1] * SCALE_Y
+            params[page_idx] = (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+
+        return params
+
+    @staticmethod
+    def _transform_bboxes(
+        np,
+        bboxes: list,
+        params: tuple,
         W_img: int,
         H_img: int,
         W_pdf: float,
         H_pdf: float
-    ) -> list:
-        """转换 bbox 坐标（来自参考代码）"""
-        # 获取转换参数
-        SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y = self._calculate_transform_params(
-            page_idx, middle_json, content_list
-        )
-
-        # 1. 去除偏移
-        bbox_no_offset = [
-            bbox[0] - OFFSET_X,
-            bbox[1] - OFFSET_Y,
-            bbox[2] - OFFSET_X,
-            bbox[3] - OFFSET_Y
-        ]
-
-        # 2. 反缩放到 PDF 坐标系
-        bbox_in_pdf = [
-            bbox_no_offset[0] / SCALE_X if SCALE_X != 0 else bbox_no_offset[0],
-            bbox_no_offset[1] / SCALE_Y if SCALE_Y != 0 else bbox_no_offset[1],
-            bbox_no_offset[2] / SCALE_X if SCALE_X != 0 else bbox_no_offset[2],
-            bbox_no_offset[3] / SCALE_Y if SCALE_Y != 0 else bbox_no_offset[3]
-        ]
-
-        # 3. 缩放到图片坐标系
+    ):
+        """
+        批量转换同一页的 bbox 坐标（来自参考代码），取整并限制在页面图片范围内
+
+        Args:
+            np: NumPy 模块
+            bboxes: content_list 坐标系下的 [x1, y1, x2, y2] 列表
+            params: 该页的 (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+
+        Returns:
+            (N, 4) 整数数组，页面图片像素坐标
+        """
+        SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y = params
+        offset = np.array([OFFSET_X, OFFSET_Y, OFFSET_X, OFFSET_Y], dtype=np.float64)
+        # 缩放为 0 时不做反缩放
+        scale = np.array([SCALE_X or 1.0, SCALE_Y or 1.0, SCALE_X or 1.0, SCALE_Y or 1.0], dtype=np.float64)
         sx = W_img / W_pdf if W_pdf > 0 else 1.0
         sy = H_img / H_pdf if H_pdf > 0 else 1.0
-        final_bbox = [
-            bbox_in_pdf[0] * sx,
-            bbox_in_pdf[1] * sy,
-            bbox_in_pdf[2] * sx,
-            bbox_in_pdf[3] * sy
-        ]
-
-        return final_bbox
+        to_image = np.array([sx, sy, sx, sy], dtype=np.float64)
+
+        # 1. 去除偏移  2. 反缩放到 PDF 坐标系  3. 缩放到图片坐标系
+        final = (np.asarray(bboxes, dtype=np.float64).reshape(-1, 4) - offset) / scale * to_image
+        final = np.rint(final).astype(np.int64)
+        final[:, :2] = np.maximum(final[:, :2], 0)
+        final[:, 2] = np.minimum(final[:, 2], W_img)
+        final[:, 3] = np.minimum(final[:, 3], H_img)
+        return final
+
+    @staticmethod
+    def _trim_white_border(np, cropped):
+        """自动裁剪白边（亮度 >= 240 视为白色），保留 2 像素边距"""
+        # 转换为RGB模式以便处理
+        if cropped.mode != 'RGB':
+            cropped = cropped.convert('RGB')
+
+        # 计算每个像素的亮度，找到非白色区域
+        gray = np.mean(np.array(cropped), axis=2)
+        mask = gray < 240
+
+        rows = np.any(mask, axis=1)
+        cols = np.any(mask, axis=0)
+        if not (rows.any() and cols.any()):
+            return cropped
+
+        rmin, rmax = np.where(rows)[0][[0, -1]]
+        cmin, cmax = np.where(cols)[0][[0, -1]]
+
+        margin = 2
+        rmin = max(0, rmin - margin)
+        cmin = max(0, cmin - margin)
+        rmax = min(cropped.height - 1, rmax + margin)
+        cmax = min(cropped.width - 1, cmax + margin)
+        return cropped.crop((cmin, rmin, cmax + 1, rmax + 1))
 
     def _extract_images_from_pdf(
         self,
         pdf_path: Path,
         content_list: list,
-        middle_json: dict
+        middle_json: dict,
+        summary: Optional[EncodingSummary] = None,
+        render_stats: Optional[Dict[str, Any]] = None
     ) -> dict:
-        """从PDF中提取图片并编码为base64"""
-        if not PIL_AVAILABLE or not content_list:
+        """
+        从PDF中提取图片并编码（按页序渲染，同页的 bbox 批量转换，每页裁剪完即释放）
+
+        Args:
+            summary: 记录本次请求的编码耗时与字节数
+            render_stats: 写入页面渲染统计（渲染页数、内存峰值等）
+        """
+        if not content_list:
+            return {}
+        libs = _load_image_libs()
+        if libs is None:
             logger.warning("PIL or pypdfium2 not available, cannot extract images")
             return {}
+        pypdfium2, np = libs
+
+        # 按页分组图片条目
+        page_items: Dict[int, list] = {}
+        for item in content_list:
+            if not isinstance(item, dict) or item.get("type", "") != "image":
+                continue
+            img_path = item.get("img_path", "")
+            bbox = item.get("bbox", [])
+            page_idx = item.get("page_idx", 0)
+            if not img_path or len(bbox) < 4 or not isinstance(page_idx, int):
+                continue
+            if not all(isinstance(value, (int, float)) for value in bbox[:4]):
+                logger.warning(f"⚠️  无效的bbox: {bbox}")
+                continue
+            page_items.setdefault(page_idx, []).append((img_path, bbox[:4]))
+
+        if not page_items:
+            return {}
+
+        encoder = get_image_encoder()
+        summary = summary if summary is not None else EncodingSummary()
 
         try:
             images_dict = {}
+            transform_params = self._page_transform_params(middle_json, content_list)
+            pdf_info = (middle_json or {}).get("pdf_info", [])
 
             # 打开PDF文档
             doc = pypdfium2.PdfDocument(str(pdf_path))
-            logger.info(f"📖 打开PDF文档，共 {len(doc)} 页")
-
-            # 创建页面图片缓存
-            page_images_cache = {}
-
-            # 遍历content_list中的图片
-            for item in content_list:
-                if not isinstance(item, dict):
-                    continue
-
-                item_type = item.get("type", "")
-                if item_type != "image":
-                    continue
-
-                img_path = item.get("img_path", "")
-                bbox = item.get("bbox", [])
-                page_idx = item.get("page_idx", 0)
-
-                if not img_path or len(bbox) < 4:
-                    continue
-
-                try:
-                    # 渲染页面图片（如果还没渲染）
-                    if page_idx not in page_images_cache:
-                        if page_idx >= len(doc):
-                            logger.warning(f"⚠️  页面索引 {page_idx} 超出范围")
-                            continue
+            render_cache = PageRenderCache(doc)
+            try:
+                logger.info(f"📖 打开PDF文档，共 {len(doc)} 页，{len(page_items)} 页包含图片")
+
+                for page_idx in sorted(page_items):
+                    items = page_items[page_idx]
+                    if page_idx >= len(doc):
+                        logger.warning(f"⚠️  页面索引 {page_idx} 超出范围")
+                        continue
 
-                        page = doc.get_page(page_idx)
-                        pil_img = page.render(scale=2.0).to_pil()  # 使用2.0缩放以获得更好质量
-                        page_images_cache[page_idx] = pil_img
-                        logger.info(f"📄 渲染页面 {page_idx}, 尺寸: {pil_img.size}")
+                    try:
+                        page_img = render_cache.get(page_idx)
+                        logger.info(f"📄 渲染页面 {page_idx}, 尺寸: {page_img.size}")
+                    except Exception as e:
+                        logger.error(f"❌ 渲染页面失败 {page_idx}: {str(e)}")
+                        continue
 
-                    page_img = page_images_cache[page_idx]
                     W_img, H_img = page_img.size
 
                     # 获取PDF页面尺寸
-                    pdf_info = middle_json.get("pdf_info", [])
                     if page_idx < len(pdf_info):
-                        page_info = pdf_info[page_idx]
-                        W_pdf = page_info.get("width", 595)
-                        H_pdf = page_info.get("height", 841)
+                        W_pdf = pdf_info[page_idx].get("width", 595)
+                        H_pdf = pdf_info[page_idx].get("height", 841)
                     else:
                         W_pdf, H_pdf = 595, 841
 
-                    # 使用参考代码的坐标转换逻辑
-                    final_bbox = self._transform_bbox(
-                        bbox, page_idx, middle_json, content_list, W_img, H_img, W_pdf, H_pdf
+                    boxes = self._transform_bboxes(
+                        np,
+                        [bbox for _, bbox in items],
+                        transform_params.get(page_idx, (1.0, 1.0, 0.0, 0.0)),
+                        W_img, H_img, W_pdf, H_pdf
                     )
 
-                    # 转换为整数坐标并裁切
-                    x1 = max(0, int(round(final_bbox[0])))
-                    y1 = max(0, int(round(final_bbox[1])))
-                    x2 = min(W_img, int(round(final_bbox[2])))
-                    y2 = min(H_img, int(round(final_bbox[3])))
-
-                    if x2 <= x1 or y2 <= y1:
-                        logger.warning(f"⚠️  无效的bbox: {bbox}")
-                        continue
-
-                    # 裁剪图片
-                    cropped = page_img.crop((x1, y1, x2, y2))
-
-                    # 自动裁剪白边
-                    try:
-                        # 转换为RGB模式以便处理
-                        if cropped.mode != 'RGB':
-                            cropped = cropped.convert('RGB')
-
-                        # 使用getbbox()自动检测非白色区域
-                        # 先转换为灰度图，然后反转（让白色变成黑色）
-                        import numpy as np
-                        img_array = np.array(cropped)
-
-                        # 计算每个像素的亮度
-                        gray = np.mean(img_array, axis=2)
-
-                        # 找到非白色区域（阈值240，接近白色的也算白色）
-                        mask = gray < 240
-
-                        # 获取非白色区域的边界
-                        rows = np.any(mask, axis=1)
-                        cols = np.any(mask, axis=0)
-
-                        if rows.any() and cols.any():
-                            rmin, rmax = np.where(rows)[0][[0, -1]]
-                            cmin, cmax = np.where(cols)[0][[0, -1]]
-
-                            # 裁剪掉白边，保留2像素的边距
-                            margin = 2
-                            rmin = max(0, rmin - margin)
-                            cmin = max(0, cmin - margin)
-                            rmax = min(cropped.height - 1, rmax + margin)
-                            cmax = min(cropped.width - 1, cmax + margin)
-
-                            cropped = cropped.crop((cmin, rmin, cmax + 1, rmax + 1))
-                    except Exception as e:
-                        logger.warning(f"⚠️  自动裁剪白边失败: {str(e)}")
-                        # 如果失败，继续使用原始裁剪的图片
-
-                    # 转换为base64
-                    buffered = BytesIO()
-                    cropped.save(buffered, format="PNG")
-                    img_base64 = f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
-
-                    images_dict[img_path] = img_base64
-                    logger.info(f"✅ 提取图片: {img_path}, 尺寸: {x2-x1}x{y2-y1}")
+                    for (img_path, bbox), (x1, y1, x2, y2) in zip(items, boxes.tolist()):
+                        if x2 <= x1 or y2 <= y1:
+                            logger.warning(f"⚠️  无效的bbox: {bbox}")
+                            continue
 
-                except Exception as e:
-                    logger.error(f"❌ 提取图片失败 {img_path}: {str(e)}")
+                        try:
+                            # 裁剪图片并自动裁剪白边
+                            cropped = page_img.crop((x1, y1, x2, y2))
+                            try:
+                                cropped = self._trim_white_border(np, cropped)
+                            except Exception as e:
+                                logger.warning(f"⚠️  自动裁剪白边失败: {str(e)}")
+
+                            # 按配置的格式编码（可选缩略图）
+                            encoded = summary.add(encoder.encode(cropped))
+                            images_dict[img_path] = encoded.as_value()
+                            logger.info(
+                                f"✅ 提取图片: {img_path}, 尺寸: {x2-x1}x{y2-y1}, "
+                                f"{encoded.bytes} bytes, {encoded.cpu_seconds * 1000:.1f} ms"
+                            )
+                        except Exception as e:
+                            logger.error(f"❌ 提取图片失败 {img_path}: {str(e)}")
+
+                    # 当前页的最后一次裁剪完成后即释放渲染结果
+                    render_cache.release(page_idx)
+            finally:
+                render_cache.close()
+                doc.close()
+                if render_stats is not None:
+                    render_stats.update(render_cache.stats())
+                logger.info(f"📊 页面渲染统计: {render_cache.stats()}")
 
-            doc.close()
             return images_dict
 
         except Exception as e:
@@ -463,7 +507,8 @@ class MinerUService:
     async def check_health(self) -> Dict[str, Any]:
         """检查MinerU API服务是否可用"""
         try:
-            response = requests.get(f"{self.api_url.replace('/file_parse', '/health')}", timeout=5)
+            async with httpx.AsyncClient(timeout=5) as client:
+                response = await client.get(f"{self.api_url.replace('/file_parse', '/health')}")
             if response.status_code == 200:
                 return {
                     "available": True,
@@ -491,7 +536,8 @@ class MinerUService:
             logger.info(f"🔌 检查 MinerU API: {self.api_url}")
 
             # 尝试简单的健康检查
-            response = requests.get(f"{self.api_url.replace('/file_parse', '/health')}", timeout=5)
+            async with httpx.AsyncClient(timeout=5) as client:
+                response = await client.get(f"{self.api_url.replace('/file_parse', '/health')}")
 
             if response.status_code == 200:
                 logger.info("✅ MinerU API 服务可用")
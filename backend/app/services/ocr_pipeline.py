@@ -0,0 +1,785 @@
+#!/usr/bin/env python3
+"""
+OCR Pipeline
+根据所选模型调度 MinerU / DeepSeek / PaddleOCR，并统一输出 OCRResponse
+同步接口和后台任务共用此流程
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple, Union
+
+from app.models.ocr_models import OCRResponse
+from app.services.keyword_engine import deferred_keywords, extract_keywords
+from app.services.page_router import AUTO_MODEL, ROUTE_TEXT, PageRouter
+from app.services.progress import ProgressTracker
+from app.services.service_registry import ServiceRegistry, ALL_MODELS
+from app.utils.pdf_utils import count_pages, is_pdf, page_runs, page_windows, split_pdf
+from app.utils.text_layer import (
+    PageTextLayer, TextLayerPolicy, analyze_pages, build_mineru_result, group_paragraphs, page_markdown
+)
+from app.utils.image_encoding import EncodingSummary
+from app.utils.table_codec import TABLE_ENCODING_COLUMNAR, encode_table, resolve_table_encoding
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_MODELS = ALL_MODELS
+
+# MinerU 可选返回字段（options.fields）；markdown 总是返回
+RETURN_FIELDS = ("markdown", "content_list", "middle_json", "images", "model_output")
+FIELD_PRESETS = {
+    "markdown": {"markdown"},
+    "structure": {"markdown", "content_list"},
+    "full": {"markdown", "content_list", "middle_json", "images"},
+}
+# 图片坐标换算需要 content_list 和 middle_json
+_FIELD_DEPENDENCIES = {"images": {"content_list", "middle_json"}}
+
+
+def resolve_return_fields(spec: Union[None, str, Iterable[str]]) -> Set[str]:
+    """
+    解析字段选择：预设名（markdown / structure / full）或逗号分隔的字段名
+
+    Raises:
+        ValueError: 未知的预设或字段名
+    """
+    if not spec:
+        return set(FIELD_PRESETS["full"])
+    names = [name.strip() for name in spec.split(",")] if isinstance(spec, str) else list(spec)
+
+    fields = {"markdown"}
+    for name in filter(None, names):
+        if name in FIELD_PRESETS:
+            fields |= FIELD_PRESETS[name]
+        elif name in RETURN_FIELDS:
+            fields.add(name)
+        else:
+            raise ValueError(
+                f"Unknown field '{name}'. Presets: {', '.join(FIELD_PRESETS)}; fields: {', '.join(RETURN_FIELDS)}"
+            )
+    for name, dependencies in _FIELD_DEPENDENCIES.items():
+        if name in fields:
+            fields |= dependencies
+    return fields
+
+
+def task_temp_dir(task_id: str) -> Path:
+    """任务的临时目录（PDF 分片等）；任务排队或运行期间存储清理器不会删除其中的文件"""
+    return Path(os.getenv("TEMP_DIR", "./temp")) / task_id
+
+
+class OCRProcessingError(Exception):
+    """OCR 处理失败"""
+
+
+class OCRPipeline:
+    """OCR 处理流程"""
+
+    def __init__(self, services: ServiceRegistry):
+        # 服务在首次使用时才初始化
+        self.services = services
+        # 按页窗口拆分大文档，后端不支持流式返回时由窗口提供页级进度（0 表示不拆分）
+        self.page_window = int(os.getenv("OCR_PAGE_WINDOW", "0"))
+        self.window_concurrency = max(1, int(os.getenv("OCR_WINDOW_CONCURRENCY", "1")))
+        # 数字原生 PDF 的文本层可用时本地提取，只把扫描页交给 GPU 后端
+        self.text_fast_path = os.getenv("OCR_TEXT_FAST_PATH", "false").lower() == "true"
+        self.text_layer_policy = TextLayerPolicy()
+        # 结果中表格的编码：rows（List[List[str]]）或 columnar（TableResult.compact）
+        self.table_encoding = resolve_table_encoding(os.getenv("OCR_TABLE_ENCODING", "rows"))
+        # model=auto 时逐页选择引擎
+        self.page_router = PageRouter(services.models, policy=self.text_layer_policy)
+
+    @property
+    def mineru_service(self):
+        return self.services.get("mineru")
+
+    @property
+    def deepseek_service(self):
+        return self.services.get("deepseek")
+
+    @property
+    def paddleocr_service(self):
+        return self.services.get("paddleocr")
+
+    @property
+    def markdown_parser(self):
+        return self.services.get("markdown_parser")
+
+    async def run(
+        self,
+        file_path: Path,
+        filename: str,
+        model: str,
+        options: Dict[str, Any] = None,
+        progress: Optional[ProgressTracker] = None
+    ) -> OCRResponse:
+        """
+        使用指定模型处理文件
+
+        Args:
+            file_path: 已保存的上传文件路径
+            filename: 原始文件名
+            model: OCR 模型 ('mineru', 'deepseek', 'paddleocr'，或 'auto' 逐页路由)
+            options: 额外选项 (page_window 可覆盖 OCR_PAGE_WINDOW，text_fast_path 可覆盖 OCR_TEXT_FAST_PATH，
+                     table_encoding 可覆盖 OCR_TABLE_ENCODING)
+            progress: 页级进度跟踪
+
+        Returns:
+            OCR 分析结果
+        """
+        opts = options or {}
+        progress = progress or ProgressTracker("local")
+        logger.info(f"Starting OCR analysis with {model}")
+
+        with deferred_keywords():
+            result = await self._run(file_path, filename, model, opts, progress)
+        # 关键词只在合并后的全文上计算一次，并把该文档计入语料文档频率
+        text = result.results.text
+        keywords = await asyncio.to_thread(extract_keywords, text.fullText or result.fullMarkdown, True)
+        if keywords:
+            text.keywords = keywords
+
+        if resolve_table_encoding(opts.get("table_encoding", self.table_encoding)) == TABLE_ENCODING_COLUMNAR:
+            # 只改变结果的存储与返回格式：表格在各后端构建 OCRResponse 时已按 rows 完整校验过一次，
+            # 这里转换并不能省掉那次校验
+            for table in result.results.tables:
+                if table.compact is None:
+                    table.compact = encode_table(table.rows)
+                    table.rows = []
+        return result
+
+    async def _run(
+        self,
+        file_path: Path,
+        filename: str,
+        model: str,
+        opts: Dict[str, Any],
+        progress: ProgressTracker
+    ) -> OCRResponse:
+        """按模型、窗口、文本层和路由设置分派处理"""
+
+        total_pages = await asyncio.to_thread(count_pages, file_path)
+        progress.set_total(total_pages)
+
+        window = int(opts.get("page_window", self.page_window) or 0)
+
+        if model == AUTO_MODEL:
+            layers = await asyncio.to_thread(analyze_pages, file_path) if is_pdf(file_path) else None
+            if layers:
+                return await self._run_routed(file_path, filename, opts, layers, window, progress)
+            # 图片或无法读取文本层时整份文档交给复杂版面模型
+            model = self.page_router.complex_model
+            logger.info(f"🧭 No page signals available, routing whole document to {model}")
+
+        text_fast_path = opts.get("text_fast_path", self.text_fast_path)
+        if isinstance(text_fast_path, str):
+            text_fast_path = text_fast_path.lower() == "true"
+        if text_fast_path and is_pdf(file_path):
+            layers = await asyncio.to_thread(analyze_pages, file_path)
+            if layers and any(self.text_layer_policy.is_usable(page) for page in layers):
+                return await self._run_with_text_layer(file_path, filename, model, opts, layers, window, progress)
+
+        windows = page_windows(total_pages or 0, window)
+        if not is_pdf(file_path) or len(windows) <= 1:
+            # 整份文档一次交给后端，没有逐页进度（需要 OCR_PAGE_WINDOW / page_window 拆分窗口）；
+            # 先推送页数和 page_level=False，完成时 pages_done 直接等于 pages_total
+            progress.page_level = False
+            progress.set_stage("processing")
+            result = await self._run_single(file_path, filename, model, opts)
+            progress.complete()
+            return result
+
+        logger.info(f"📑 Splitting {total_pages} pages into {len(windows)} windows of {window} pages")
+        shard_dir = task_temp_dir(progress.task_id) / f"shards_{uuid.uuid4().hex}"
+        try:
+            shard_files = await asyncio.to_thread(split_pdf, file_path, windows, shard_dir)
+            result = await self._run_windows(file_path, filename, model, opts, windows, shard_files, progress)
+            progress.complete()
+            return result
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    async def _run_with_text_layer(
+        self,
+        file_path: Path,
+        filename: str,
+        model: str,
+        opts: Dict[str, Any],
+        layers: List[PageTextLayer],
+        window: int,
+        progress: ProgressTracker
+    ) -> OCRResponse:
+        """文本层可用的页面本地生成结果，其余页面按连续区间拆分后交给后端，最后按页序合并"""
+        usable = [self.text_layer_policy.is_usable(page) for page in layers]
+        windows: List[Tuple[int, int]] = []
+        local_partials: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for start, end, is_text in page_runs(usable):
+            if is_text:
+                windows.append((start, end))
+                local_partials[(start, end)] = self._text_layer_partial(layers[start:end], filename, model)
+            else:
+                windows.extend(
+                    (start + offset, start + offset_end)
+                    for offset, offset_end in page_windows(end - start, window)
+                )
+
+        text_pages = sum(usable)
+        logger.info(f"⚡ Text layer fast path: {text_pages}/{len(layers)} pages extracted locally")
+
+        ocr_windows = [w for w in windows if w not in local_partials]
+        shard_dir = task_temp_dir(progress.task_id) / f"shards_{uuid.uuid4().hex}"
+        try:
+            shards = await asyncio.to_thread(split_pdf, file_path, ocr_windows, shard_dir) if ocr_windows else []
+            shard_files = dict(zip(ocr_windows, shards))
+            result = await self._run_windows(
+                file_path, filename, model, opts, windows,
+                [shard_files.get(w) for w in windows], progress, local_partials
+            )
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+        result.metadata["text_fast_path"] = {
+            "pages": text_pages,
+            "backend_pages": len(layers) - text_pages,
+            "page_indices": [page.page_idx for page, is_text in zip(layers, usable) if is_text],
+        }
+        progress.complete()
+        return result
+
+    async def _run_routed(
+        self,
+        file_path: Path,
+        filename: str,
+        opts: Dict[str, Any],
+        layers: List[PageTextLayer],
+        window: int,
+        progress: ProgressTracker
+    ) -> OCRResponse:
+        """逐页路由：相同路由的连续页面作为一个区间处理，各区间结果按页序重新组装"""
+        routes = self.page_router.plan(layers)
+        windows: List[Tuple[int, int]] = []
+        window_routes: List[str] = []
+        for start, end, route in page_runs(routes):
+            # 后端区间仍按 page_window 拆分，以提供页级进度
+            run_windows = [(start, end)] if route == ROUTE_TEXT else [
+                (start + offset, start + offset_end) for offset, offset_end in page_windows(end - start, window)
+            ]
+            windows.extend(run_windows)
+            window_routes.extend([route] * len(run_windows))
+
+        backend_windows = [w for w, route in zip(windows, window_routes) if route != ROUTE_TEXT]
+        semaphore = asyncio.Semaphore(self.window_concurrency)
+        shard_dir = task_temp_dir(progress.task_id) / f"shards_{uuid.uuid4().hex}"
+
+        async def run_window(window: Tuple[int, int], route: str, shard_file: Optional[Path]) -> OCRResponse:
+            if route == ROUTE_TEXT:
+                response = OCRResponse(**self._text_layer_response_data(layers[window[0]:window[1]], filename, ROUTE_TEXT))
+            else:
+                async with semaphore:
+                    response = await self._run_backend_window(route, shard_file, window, filename, opts)
+            progress.advance(window[1] - window[0])
+            return response
+
+        try:
+            shards = await asyncio.to_thread(split_pdf, file_path, backend_windows, shard_dir) if backend_windows else []
+            shard_files = dict(zip(backend_windows, shards))
+            responses = await asyncio.gather(*(
+                run_window(w, route, shard_files.get(w)) for w, route in zip(windows, window_routes)
+            ))
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+        result = self._merge_responses(responses, windows, filename)
+        result.metadata["routing"] = {
+            "pages": dict(Counter(routes)),
+            "runs": [
+                {"pages": [start + 1, end], "route": route}
+                for (start, end), route in zip(windows, window_routes)
+            ],
+        }
+        progress.complete()
+        return result
+
+    async def _run_backend_window(
+        self,
+        model: str,
+        shard_file: Path,
+        window: Tuple[int, int],
+        filename: str,
+        opts: Dict[str, Any]
+    ) -> OCRResponse:
+        """用指定后端处理一个页区间的 PDF"""
+        if model == "deepseek":
+            return OCRResponse(**await self.deepseek_service.analyze_document(shard_file, opts))
+        elif model == "paddleocr":
+            result = await self.paddleocr_service.process_file(str(shard_file), page_offset=window[0])
+            return self._build_paddleocr_response(result, filename)
+        else:
+            parse_result = await self._mineru_parse(shard_file, opts)
+            return await self._build_mineru_response(parse_result, shard_file, filename, model)
+
+    def _merge_responses(
+        self,
+        responses: List[OCRResponse],
+        windows: List[Tuple[int, int]],
+        filename: str
+    ) -> OCRResponse:
+        """合并不同引擎处理的页区间，元素 ID 加上区间前缀避免冲突"""
+        text_parts, text_blocks, keywords = [], [], []
+        elements: Dict[str, List[Dict[str, Any]]] = {"tables": [], "formulas": [], "images": []}
+        handwritten = {"detected": False, "text": "No handwritten content detected", "confidence": 0.0, "areas": []}
+        content_types: List[str] = []
+        total_chars = 0
+        weighted_confidence = weighted_accuracy = speed = 0.0
+        memory = 0
+        total_pages = sum(end - start for start, end in windows) or 1
+
+        for (start, end), response in zip(windows, responses):
+            prefix = f"p{start + 1}-{end}_"
+            results = response.results.model_dump()
+            pages = end - start
+
+            text_parts.append(response.fullMarkdown)
+            for block in results["text"]["textBlocks"]:
+                # 区间内的页码换算为原文档页码
+                if isinstance(block.get("page"), int):
+                    block["page"] += start
+                text_blocks.append(block)
+            keywords.extend(k for k in results["text"]["keywords"] if k not in keywords)
+            total_chars += results["text"]["stats"].get("total_chars", len(results["text"]["fullText"]))
+            weighted_confidence += results["text"]["confidence"] * pages
+
+            for key in elements:
+                for element in results[key]:
+                    element["id"] = prefix + str(element.get("id", ""))
+                    # PaddleOCR 已按 page_offset 输出原文档页码，其余引擎为区间内页码
+                    if isinstance(element.get("page"), int) and response.model != "paddleocr":
+                        element["page"] += start
+                    elements[key].append(element)
+
+            if results["handwritten"]["detected"]:
+                handwritten.update(
+                    detected=True,
+                    text=results["handwritten"]["text"],
+                    confidence=max(handwritten["confidence"], results["handwritten"]["confidence"])
+                )
+            handwritten["areas"].extend(results["handwritten"]["areas"])
+
+            weighted_accuracy += results["performance"]["accuracy"] * pages
+            speed += results["performance"]["speed"]
+            memory = max(memory, results["performance"]["memory"])
+            content_types.extend(t for t in results["metadata"]["contentTypes"] if t not in content_types)
+
+        full_markdown = "\n\n".join(text_parts)
+        return OCRResponse(
+            success=True,
+            model=AUTO_MODEL,
+            filename=filename,
+            fullMarkdown=full_markdown,
+            results={
+                "text": {
+                    "fullText": full_markdown,
+                    "textBlocks": text_blocks,
+                    "keywords": keywords,
+                    "confidence": round(weighted_confidence / total_pages, 2),
+                    "stats": {"total_chars": total_chars, "total_pages": total_pages}
+                },
+                **elements,
+                "handwritten": handwritten,
+                "performance": {
+                    "accuracy": round(weighted_accuracy / total_pages, 2),
+                    "speed": speed,
+                    "memory": memory
+                },
+                "metadata": {
+                    "totalElements": sum(len(items) for items in elements.values()),
+                    "contentTypes": content_types,
+                    "processingTime": None
+                }
+            },
+            metadata={"page_windows": len(windows)}
+        )
+
+    def _text_layer_response_data(self, pages: List[PageTextLayer], filename: str, model: str) -> Dict[str, Any]:
+        """文本层内容组装为 OCRResponse 结构（只有文本，没有表格 / 公式 / 图片）"""
+        markdown = "\n\n".join(page_markdown(page) for page in pages)
+        text_blocks = [
+            {
+                "id": f"text_{index}",
+                "type": "paragraph",
+                "title": text[:50] + "..." if len(text) > 50 else text,
+                "content": text,
+                "level": 0,
+                "bbox": [round(value, 2) for value in bbox],
+                "page": page.page_idx - pages[0].page_idx
+            }
+            for index, (page, (bbox, text)) in enumerate(
+                (page, paragraph) for page in pages for paragraph in group_paragraphs(page.lines)
+            )
+        ]
+        return {
+            "success": True,
+            "model": model,
+            "filename": filename,
+            "fullMarkdown": markdown,
+            "results": {
+                "text": {
+                    "fullText": markdown,
+                    "textBlocks": text_blocks,
+                    "keywords": [],
+                    "confidence": 100.0,
+                    "stats": {"total_chars": len(markdown)}
+                },
+                "tables": [],
+                "formulas": [],
+                "images": [],
+                "handwritten": {
+                    "detected": False,
+                    "text": "No handwritten content detected",
+                    "confidence": 0.0,
+                    "areas": []
+                },
+                "performance": {"accuracy": 100.0, "speed": 0.0, "memory": 0},
+                "metadata": {"totalElements": 0, "contentTypes": ["text"], "processingTime": None}
+            },
+            "metadata": {"page_count": len(pages), "images": {}}
+        }
+
+    def _text_layer_partial(self, pages: List[PageTextLayer], filename: str, model: str) -> Dict[str, Any]:
+        """按所选模型的窗口结果格式包装文本层内容，以便与后端结果一起合并"""
+        if model == "paddleocr":
+            return {
+                "markdown": "".join(f"\n\n# Page {page.page_idx + 1}\n\n{page_markdown(page)}" for page in pages),
+                "images": [],
+                "tables": [],
+                "formulas": [],
+                "metadata": {"total_pages": len(pages), "file_name": filename}
+            }
+        if model == "deepseek":
+            return self._text_layer_response_data(pages, filename, model)
+        return build_mineru_result(pages)
+
+    async def _run_single(self, file_path: Path, filename: str, model: str, opts: Dict[str, Any]) -> OCRResponse:
+        if model == "deepseek":
+            result = await self.deepseek_service.analyze_document(file_path, opts)
+            return OCRResponse(**result)
+        elif model == "paddleocr":
+            logger.info("📘 Processing with PaddleOCR-VL...")
+            result = await self.paddleocr_service.process_file(str(file_path))
+            return self._build_paddleocr_response(result, filename)
+        else:
+            parse_result = await self._mineru_parse(file_path, opts)
+            return await self._build_mineru_response(parse_result, file_path, filename, model)
+
+    async def _run_windows(
+        self,
+        file_path: Path,
+        filename: str,
+        model: str,
+        opts: Dict[str, Any],
+        windows: List[Tuple[int, int]],
+        shard_files: List[Optional[Path]],
+        progress: ProgressTracker,
+        local_partials: Optional[Dict[Tuple[int, int], Dict[str, Any]]] = None
+    ) -> OCRResponse:
+        """逐个窗口调用后端，每完成一个窗口推进进度，最后按页序合并（local_partials 中的窗口无需调用后端）"""
+        semaphore = asyncio.Semaphore(self.window_concurrency)
+        local_partials = local_partials or {}
+
+        async def run_window(window: Tuple[int, int], shard_file: Optional[Path]):
+            if window in local_partials:
+                progress.advance(window[1] - window[0])
+                return local_partials[window]
+            async with semaphore:
+                if model == "deepseek":
+                    partial = await self.deepseek_service.analyze_document(shard_file, opts)
+                elif model == "paddleocr":
+                    partial = await self.paddleocr_service.process_file(str(shard_file), page_offset=window[0])
+                else:
+                    partial = await self._mineru_parse(shard_file, opts)
+            progress.advance(window[1] - window[0])
+            return partial
+
+        partials = await asyncio.gather(*(
+            run_window(window, shard_file) for window, shard_file in zip(windows, shard_files)
+        ))
+
+        if model == "deepseek":
+            return OCRResponse(**self._merge_deepseek_results(partials, windows))
+        elif model == "paddleocr":
+            return self._build_paddleocr_response(self._merge_paddleocr_results(partials), filename)
+        else:
+            parse_result = self._merge_mineru_results(partials, windows)
+            return await self._build_mineru_response(parse_result, file_path, filename, model)
+
+    def _build_paddleocr_response(self, result: Dict[str, Any], filename: str) -> OCRResponse:
+        """将 PaddleOCR-VL 结果转换为 OCRResponse"""
+        # 提取数据
+        markdown_content = result.get("markdown", "")
+        images = result.get("images", [])
+        tables = result.get("tables", [])
+        formulas_raw = result.get("formulas", [])
+
+        # 转换公式格式
+        formulas_formatted = []
+        for formula in formulas_raw:
+            formulas_formatted.append({
+                "id": formula.get("id", ""),
+                "type": formula.get("type", "formula"),
+                "formula": formula.get("latex", ""),
+                "description": f"Formula on page {formula.get('page', 0) + 1}",
+                "confidence": formula.get("confidence", 90.0),
+                "position": None
+            })
+
+        # 构建完整响应
+        response_data = {
+            "success": True,
+            "model": "paddleocr",
+            "filename": filename,
+            "fullMarkdown": markdown_content,
+            "results": {
+                "text": {
+                    "fullText": markdown_content,
+                    "textBlocks": [],
+                    "keywords": [],
+                    "confidence": 95.0,
+                    "stats": {
+                        "total_chars": len(markdown_content),
+                        "total_pages": result.get("metadata", {}).get("total_pages", 0)
+                    }
+                },
+                "tables": tables,
+                "formulas": formulas_formatted,
+                "images": images,
+                "handwritten": {
+                    "detected": False,
+                    "text": "No handwritten content detected",
+                    "confidence": 0.0,
+                    "areas": []
+                },
+                "performance": {
+                    "accuracy": 95.0,
+                    "speed": 0.0,
+                    "memory": 0
+                },
+                "metadata": {
+                    "totalElements": len(images) + len(tables) + len(formulas_formatted),
+                    "contentTypes": ["text", "images", "tables", "formulas"],
+                    "processingTime": None
+                }
+            },
+            "metadata": result.get("metadata", {})
+        }
+
+        return OCRResponse(**response_data)
+
+    async def _mineru_parse(self, file_path: Path, opts: Dict[str, Any]) -> Dict[str, Any]:
+        """Use MinerU (default)"""
+        backend = opts.get('backend', os.getenv('MINERU_BACKEND', 'pipeline'))
+        enable_ocr = opts.get('enable_ocr', True)
+        language = opts.get('language', 'ch')
+        device = opts.get('device', 'cuda:3')
+        fields = resolve_return_fields(opts.get('fields'))
+        return_model_output = True if "model_output" in fields else opts.get('return_model_output')
+
+        logger.info(
+            f"🔧 MinerU options: backend={backend}, enable_ocr={enable_ocr}, language={language}, "
+            f"device={device}, fields={','.join(sorted(fields))}"
+        )
+
+        # Parse PDF using MinerU
+        parse_result = await self.mineru_service.parse_pdf(
+            str(file_path),
+            backend=backend,
+            enable_ocr=enable_ocr,
+            language=language,
+            device=device,
+            fields=fields,
+            return_model_output=return_model_output,
+            save_markdown=False
+        )
+
+        if not parse_result.get("success"):
+            raise OCRProcessingError(f"MinerU parsing failed: {parse_result.get('error', 'Unknown error')}")
+
+        return parse_result
+
+    async def _build_mineru_response(
+        self,
+        parse_result: Dict[str, Any],
+        file_path: Path,
+        filename: str,
+        model: str
+    ) -> OCRResponse:
+        # MinerU 的 markdown 直接取自解析结果，不经过磁盘上的共享文件
+        full_markdown = parse_result.get("content", "")
+
+        # Extract structured content from markdown using content_list data
+        raw_data = parse_result.get("raw_data", {})
+
+        # 调试：检查数据传递
+        logger.info(f"🔍 parse_result keys: {parse_result.keys()}")
+        logger.info(f"🔍 raw_data keys: {raw_data.keys()}")
+        logger.info(f"🔍 images type: {type(raw_data.get('images'))}")
+        if raw_data.get('images'):
+            if isinstance(raw_data.get('images'), dict):
+                logger.info(f"🔍 images keys: {list(raw_data.get('images').keys())[:3]}")
+                logger.info(f"🔍 images sample key type: {type(list(raw_data.get('images').keys())[0]) if raw_data.get('images') else 'N/A'}")
+            else:
+                logger.info(f"🔍 images is not dict, type: {type(raw_data.get('images'))}")
+                logger.info(f"🔍 images value preview: {str(raw_data.get('images'))[:200]}...")
+        else:
+            logger.warning("⚠️  raw_data中images为None或空")
+
+        structured_content = await self.markdown_parser.parse_with_content_list(
+            markdown_content=full_markdown,
+            content_list=raw_data.get("content_list"),
+            middle_json=raw_data.get("middle_json"),
+            images_data=raw_data.get("images")
+        )
+
+        logger.info(f"OCR analysis completed for {filename}")
+
+        return OCRResponse(
+            success=True,
+            model=model,
+            filename=filename,
+            results=structured_content,
+            fullMarkdown=full_markdown,
+            metadata=parse_result.get("metadata", {})
+        )
+
+    def _merge_mineru_results(
+        self,
+        partials: List[Dict[str, Any]],
+        windows: List[Tuple[int, int]]
+    ) -> Dict[str, Any]:
+        """合并各窗口的 MinerU 解析结果，content_list 的 page_idx 换算为原文档页码"""
+        md_parts = []
+        content_list = []
+        pdf_info = []
+        images = {}
+        total_images = 0
+
+        for (start, _), partial in zip(windows, partials):
+            raw_data = partial.get("raw_data", {})
+            md_parts.append(partial.get("content", ""))
+
+            for item in raw_data.get("content_list") or []:
+                if isinstance(item, dict):
+                    item = dict(item)
+                    item["page_idx"] = item.get("page_idx", 0) + start
+                content_list.append(item)
+
+            middle_json = raw_data.get("middle_json") or {}
+            pdf_info.extend(middle_json.get("pdf_info", []))
+            images.update(raw_data.get("images") or {})
+            total_images += partial.get("metadata", {}).get("total_images", 0)
+
+        md_content = "\n\n".join(md_parts)
+
+        first_metadata = partials[0].get("metadata", {}) if partials else {}
+        return {
+            "success": True,
+            "content": md_content,
+            "raw_data": {
+                "md_content": md_content,
+                "middle_json": {"pdf_info": pdf_info},
+                "content_list": content_list,
+                "images": images,
+            },
+            "metadata": {
+                "backend": first_metadata.get("backend"),
+                "version": first_metadata.get("version"),
+                "total_pages": len(pdf_info),
+                "total_images": total_images,
+                "content_list_count": len(content_list),
+                "fields": first_metadata.get("fields"),
+                "image_encoding": EncodingSummary.merge(
+                    partial.get("metadata", {}).get("image_encoding") for partial in partials
+                ),
+                # 各窗口依次渲染，取峰值最大的窗口
+                "page_render": max(
+                    (partial.get("metadata", {}).get("page_render") or {} for partial in partials),
+                    key=lambda stats: stats.get("peak_bytes", 0),
+                    default={}
+                ),
+                "page_windows": len(windows)
+            }
+        }
+
+    def _merge_paddleocr_results(self, partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并各窗口的 PaddleOCR 结果（页码已在服务中按窗口偏移）"""
+        merged = {"markdown": "", "images": [], "tables": [], "formulas": [], "metadata": {}}
+        total_pages = 0
+        for partial in partials:
+            merged["markdown"] += partial.get("markdown", "")
+            merged["images"].extend(partial.get("images", []))
+            merged["tables"].extend(partial.get("tables", []))
+            merged["formulas"].extend(partial.get("formulas", []))
+            total_pages += partial.get("metadata", {}).get("total_pages", 0)
+
+        if partials:
+            merged["metadata"] = dict(partials[0].get("metadata", {}))
+        merged["metadata"]["total_pages"] = total_pages
+        merged["metadata"]["image_encoding"] = EncodingSummary.merge(
+            partial.get("metadata", {}).get("image_encoding") for partial in partials
+        )
+        merged["metadata"]["page_windows"] = len(partials)
+        return merged
+
+    def _merge_deepseek_results(
+        self,
+        partials: List[Dict[str, Any]],
+        windows: List[Tuple[int, int]]
+    ) -> Dict[str, Any]:
+        """合并各窗口的 DeepSeek 响应，元素 ID 加上窗口前缀避免冲突"""
+        merged = dict(partials[0])
+        results = dict(merged["results"])
+        results["text"] = dict(results["text"])
+        for key in ("tables", "formulas", "images"):
+            results[key] = []
+
+        markdown_parts = []
+        text_blocks = []
+        images_data = {}
+        page_count = 0
+
+        for (start, end), partial in zip(windows, partials):
+            prefix = f"p{start + 1}-{end}_"
+            markdown_parts.append(partial.get("fullMarkdown", ""))
+            for block in partial["results"]["text"].get("textBlocks", []):
+                block = dict(block)
+                if isinstance(block.get("page"), int):
+                    block["page"] += start
+                text_blocks.append(block)
+            for key in ("tables", "formulas", "images"):
+                for element in partial["results"].get(key, []):
+                    element = dict(element)
+                    element["id"] = prefix + str(element.get("id", ""))
+                    results[key].append(element)
+            metadata = partial.get("metadata", {})
+            images_data.update(metadata.get("images") or {})
+            page_count += metadata.get("page_count", 0)
+
+        full_markdown = "\n\n".join(markdown_parts)
+        results["text"]["fullText"] = full_markdown
+        results["text"]["textBlocks"] = text_blocks
+        merged["results"] = results
+        merged["fullMarkdown"] = full_markdown
+        merged["metadata"] = {
+            **merged.get("metadata", {}),
+            "page_count": page_count,
+            "images": images_data,
+            "image_encoding": EncodingSummary.merge(
+                partial.get("metadata", {}).get("image_encoding") for partial in partials
+            ),
+            "page_windows": len(windows)
+        }
+        return merged
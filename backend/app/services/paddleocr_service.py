@@ -3,15 +3,19 @@ PaddleOCR-VL 服务封装
 处理 PDF 和图片文件的 OCR 识别
 """
 
+import asyncio
 import base64
 import json
 import logging
 import os
-import requests
+import httpx
 from pathlib import Path
 from typing import Dict, List, Optional
 import re
 
+from app.utils.image_encoding import get_image_encoder, EncodingSummary
+from app.utils.image_preprocess import is_image_file, prepare_image
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,14 +27,17 @@ class PaddleOCRService:
         初始化 PaddleOCR 服务
         """
         self.api_url = os.getenv("PADDLEOCR_API_URL", "http://192.168.110.131:10800/layout-parsing")
+        # 图片输入发送前的最长边上限（0 表示不缩小）
+        self.input_max_dimension = int(os.getenv("PADDLEOCR_INPUT_MAX_DIMENSION", "2048"))
         logger.info(f"🔧 Initialized PaddleOCR service with API: {self.api_url}")
 
-    async def process_file(self, file_path: str) -> Dict:
+    async def process_file(self, file_path: str, page_offset: int = 0) -> Dict:
         """
         处理文件（PDF 或图片）
 
         Args:
             file_path: 文件路径
+            page_offset: 页码偏移（处理按页窗口拆分的 PDF 时使用）
 
         Returns:
             包含 markdown、images、tables、formulas 的结果字典
@@ -38,15 +45,21 @@ class PaddleOCRService:
         try:
             logger.info(f"Processing file with PaddleOCR: {file_path}")
 
-            # 读取文件并编码为 base64
-            with open(file_path, "rb") as f:
-                file_base64 = base64.b64encode(f.read()).decode("utf-8")
+            # 读取文件并编码为 base64（图片先修正 EXIF 方向并缩小）
+            input_stats = None
+            if is_image_file(Path(file_path)):
+                prepared = await asyncio.to_thread(prepare_image, Path(file_path), self.input_max_dimension)
+                file_bytes = prepared.content
+                input_stats = prepared.stats
+            else:
+                file_bytes = await asyncio.to_thread(Path(file_path).read_bytes)
+            file_base64 = base64.b64encode(file_bytes).decode("utf-8")
 
             # 判断文件类型
             file_extension = Path(file_path).suffix.lower()
             if file_extension == ".pdf":
                 file_type = 0  # PDF
-            elif file_extension in [".png", ".jpg", ".jpeg", ".bmp"]:
+            elif is_image_file(Path(file_path)):
                 file_type = 1  # 图片
             else:
                 logger.warning(f"⚠️  Unknown file type: {file_extension}, treating as image")
@@ -62,14 +75,14 @@ class PaddleOCRService:
 
             headers = {"Content-Type": "application/json"}
 
-            # 发送请求
+            # 发送请求（异步请求，任务被取消时连接随之关闭）
             logger.info("Sending request to PaddleOCR API...")
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=300
-            )
+            async with httpx.AsyncClient(timeout=300) as client:
+                response = await client.post(
+                    self.api_url,
+                    headers=headers,
+                    content=json.dumps(payload)
+                )
 
             if response.status_code != 200:
                 error_msg = f"PaddleOCR API error: {response.status_code}"
@@ -89,8 +102,10 @@ class PaddleOCRService:
 
             logger.info("✅ PaddleOCR API response received")
 
-            # 提取和处理结果
-            processed_result = self._process_response(result, file_path)
+            # 提取和处理结果（图片编码和表格解析是 CPU 密集操作，不在事件循环中执行）
+            processed_result = await asyncio.to_thread(self._process_response, result, file_path, page_offset)
+            if input_stats is not None:
+                processed_result["metadata"]["input_image"] = input_stats
 
             return processed_result
 
@@ -98,13 +113,14 @@ class PaddleOCRService:
             logger.error(f"PaddleOCR processing failed: {e}")
             raise
 
-    def _process_response(self, api_response: Dict, file_path: str) -> Dict:
+    def _process_response(self, api_response: Dict, file_path: str, page_offset: int = 0) -> Dict:
         """
         处理 PaddleOCR API 响应
 
         Args:
             api_response: API 原始响应
             file_path: 原始文件路径
+            page_offset: 页码偏移
 
         Returns:
             标准化的结果字典
@@ -128,8 +144,10 @@ class PaddleOCRService:
 
         # 收集所有页面的内容
         all_markdown_parts = []
+        encoder = get_image_encoder()
+        encoding_summary = EncodingSummary()
 
-        for page_idx, page_result in enumerate(layout_parsing_results):
+        for page_idx, page_result in enumerate(layout_parsing_results, start=page_offset):
             logger.info(f"Processing page {page_idx + 1}...")
 
             # 提取 markdown
@@ -146,14 +164,9 @@ class PaddleOCRService:
             if markdown_images:
                 logger.info(f"   Found {len(markdown_images)} images in markdown.images")
                 for img_filename, img_base64 in markdown_images.items():
-                    # 构建 data URI
-                    # 判断图片格式
-                    if img_filename.endswith('.jpg') or img_filename.endswith('.jpeg'):
-                        data_uri = f"data:image/jpeg;base64,{img_base64}"
-                    elif img_filename.endswith('.png'):
-                        data_uri = f"data:image/png;base64,{img_base64}"
-                    else:
-                        data_uri = f"data:image/jpeg;base64,{img_base64}"  # 默认 jpeg
+                    # 构建 data URI（按文件扩展名判断图片格式，默认 jpeg）
+                    mime = "image/png" if img_filename.endswith('.png') else "image/jpeg"
+                    encoded = encoding_summary.add(encoder.encode_base64(img_base64, mime))
 
                     image_info = {
                         "id": f"page_{page_idx}_{img_filename.replace('.jpg', '').replace('.png', '')}",
@@ -161,7 +174,8 @@ class PaddleOCRService:
                         "description": f"Page {page_idx + 1} - {img_filename}",
                         "altText": img_filename,
                         "confidence": 95.0,
-                        "base64": data_uri,
+                        "base64": encoded.data_uri,
+                        "thumbnail": encoded.thumbnail_uri,
                         "path": img_filename,
                         "page": page_idx
                     }
@@ -173,6 +187,7 @@ class PaddleOCRService:
 
         # 合并所有页面的 markdown
         results["markdown"] = "".join(all_markdown_parts)
+        results["metadata"]["image_encoding"] = encoding_summary.to_dict()
 
         logger.info(f"✅ Extracted: {len(results['images'])} images, "
                    f"{len(results['tables'])} tables, "
@@ -209,8 +224,7 @@ class PaddleOCRService:
                 logger.warning(f"No base64 data found for image at bbox {bbox}")
                 return None
 
-            # 构建 data URI
-            data_uri = f"data:image/jpeg;base64,{image_base64}"
+            encoded = get_image_encoder().encode_base64(image_base64, "image/jpeg")
 
             return {
                 "id": f"page_{page_idx}_img_{int(bbox[0])}_{int(bbox[1])}",
@@ -218,7 +232,8 @@ class PaddleOCRService:
                 "description": f"Page {page_idx + 1} - {region.get('type', 'Image')}",
                 "altText": image_filename or f"Image on page {page_idx + 1}",
                 "confidence": 95.0,
-                "base64": data_uri,
+                "base64": encoded.data_uri,
+                "thumbnail": encoded.thumbnail_uri,
                 "path": image_filename,
                 "bbox": bbox,
                 "page": page_idx
@@ -367,6 +382,3 @@ class PaddleOCRService:
             logger.warning(f"Failed to parse HTML table: {e}")
             return [], []
 
-
-# 全局服务实例
-paddleocr_service = PaddleOCRService()
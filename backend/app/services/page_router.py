@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Page Router
+model=auto 时逐页选择成本最低且能胜任的引擎：
+- text: 文本层可用的普通文字页，网关本地提取（不占 GPU）
+- 表格页（文本层可用但矢量线条密集）交给 PaddleOCR
+- 扫描件、含图片或公式密集的复杂版面交给 MinerU / DeepSeek
+"""
+
+import logging
+import os
+from collections import Counter
+from typing import List, Optional
+
+from app.utils.text_layer import PageTextLayer, TextLayerPolicy
+
+logger = logging.getLogger(__name__)
+
+AUTO_MODEL = "auto"
+ROUTE_TEXT = "text"
+
+
+class PageRouter:
+    """基于本地廉价信号的逐页路由"""
+
+    def __init__(
+        self,
+        models: List[str],
+        complex_model: Optional[str] = None,
+        table_model: Optional[str] = None,
+        table_min_paths: Optional[int] = None,
+        max_math_ratio: Optional[float] = None,
+        policy: Optional[TextLayerPolicy] = None
+    ):
+        """
+        Args:
+            models: 已启用的后端模型
+            complex_model: 复杂版面使用的模型（ROUTER_COMPLEX_MODEL，默认 mineru）
+            table_model: 表格页使用的模型（ROUTER_TABLE_MODEL，默认 paddleocr）
+            table_min_paths: 矢量路径数达到该值视为表格页（默认与 policy 一致）
+            max_math_ratio: 数学符号比例超过该值视为公式页
+            policy: 文本层可用性判断
+        """
+        self.models = list(models)
+        self.complex_model = self._available(
+            complex_model or os.getenv("ROUTER_COMPLEX_MODEL", "mineru"),
+            self.models[0] if self.models else "mineru"
+        )
+        self.table_model = self._available(
+            table_model or os.getenv("ROUTER_TABLE_MODEL", "paddleocr"),
+            self.complex_model
+        )
+        self.max_math_ratio = max_math_ratio if max_math_ratio is not None else float(
+            os.getenv("ROUTER_MAX_MATH_RATIO", "0.05")
+        )
+        self.policy = policy or TextLayerPolicy(table_min_paths=table_min_paths)
+        self.table_min_paths = table_min_paths if table_min_paths is not None else self.policy.table_min_paths
+
+    def _available(self, model: str, fallback: str) -> str:
+        """配置的模型未启用时使用 fallback"""
+        if model in self.models:
+            return model
+        logger.warning(f"Router model '{model}' is not enabled, using '{fallback}'")
+        return fallback
+
+    def route(self, page: PageTextLayer) -> str:
+        """返回页面的路由：ROUTE_TEXT 或后端模型名"""
+        if not self.policy.has_text(page) or page.math_ratio > self.max_math_ratio:
+            return self.complex_model
+        if page.path_count >= self.table_min_paths:
+            return self.table_model
+        # 文本层丢失图片内容
+        if page.image_count:
+            return self.complex_model
+        return ROUTE_TEXT
+
+    def plan(self, pages: List[PageTextLayer]) -> List[str]:
+        routes = [self.route(page) for page in pages]
+        logger.info(f"🧭 Page routes: {dict(Counter(routes))}")
+        return routes
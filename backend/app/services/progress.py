@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Progress Reporting
+页级进度跟踪，以及向 SSE 订阅者推送进度事件
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBroker:
+    """进程内的进度事件发布/订阅（跨 worker 时订阅方会回退到轮询任务存储）"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[task_id].add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(task_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(task_id, None)
+
+    def publish(self, task_id: str, event: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers.get(task_id, ())):
+            if queue.full():
+                # 慢订阅者只需要最新进度，丢弃最旧的事件
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+
+class ProgressTracker:
+    """
+    单个任务的进度
+
+    ETA 根据已观察到的页处理速度 (pages / second) 估算
+    """
+
+    def __init__(self, task_id: str, publish: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.task_id = task_id
+        self._publish = publish
+        self.started_at = time.monotonic()
+        self.stage = "processing"
+        self.pages_done = 0
+        self.pages_total: Optional[int] = None
+        # False：后端一次处理整份文档，pages_done 不会逐页推进，完成时直接等于 pages_total
+        self.page_level = True
+
+    def set_total(self, pages_total: Optional[int]) -> None:
+        self.pages_total = pages_total
+        self._emit()
+
+    def set_stage(self, stage: str) -> None:
+        self.stage = stage
+        self._emit()
+
+    def advance(self, pages: int) -> None:
+        """完成若干页"""
+        self.pages_done += pages
+        if self.pages_total is not None:
+            self.pages_done = min(self.pages_done, self.pages_total)
+        self._emit()
+
+    def complete(self) -> None:
+        if self.pages_total is not None:
+            self.pages_done = self.pages_total
+        self.stage = "completed"
+        self._emit()
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        pages_per_second = self.pages_done / elapsed if elapsed > 0 and self.pages_done else None
+
+        eta = None
+        if pages_per_second and self.pages_total is not None:
+            eta = round((self.pages_total - self.pages_done) / pages_per_second, 1)
+
+        return {
+            "stage": self.stage,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "page_level": self.page_level,
+            "elapsed_seconds": round(elapsed, 1),
+            "pages_per_second": round(pages_per_second, 3) if pages_per_second else None,
+            "eta_seconds": eta,
+        }
+
+    def _emit(self) -> None:
+        if self._publish is None:
+            return
+        try:
+            self._publish(self.snapshot())
+        except Exception as e:
+            logger.warning(f"Failed to publish progress for {self.task_id}: {str(e)}")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Result Store
+将已完成任务的 OCR 结果保存到磁盘，任务存储中只记录结果位置
+
+除完整结果外，还按页和元素类型写出分片（<task_id>.parts/），大文档可以按页区间和游标分批读取：
+- pages.jsonl：每页一行（该页文本、textBlocks、表格、公式、图片）
+- tables.jsonl / formulas.jsonl / images.jsonl：每个元素一行
+- manifest.json：页数、各类元素数量、每页在 pages.jsonl 中的字节偏移，最后写入
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.search_index import pages_from_result
+
+logger = logging.getLogger(__name__)
+
+ELEMENT_TYPES = ("tables", "formulas", "images")
+PARTS_VERSION = 1
+# manifest 中不保留的大字段（如 DeepSeek 的全部图片 base64）
+_MANIFEST_SKIP_METADATA = {"images"}
+
+
+class CursorError(ValueError):
+    """游标无效（格式错误、类型不匹配或不在行首）"""
+
+
+def encode_cursor(kind: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{kind}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> int:
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_kind, offset = decoded.split(":", 1)
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorError("Invalid cursor")
+    if cursor_kind != kind or offset < 0:
+        raise CursorError(f"Cursor does not belong to {kind}")
+    return offset
+
+
+class ResultStore:
+    """基于文件系统的结果存储"""
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = Path(base_dir or os.getenv("RESULTS_DIR", "./results"))
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(self, task_id: str, result: Dict[str, Any]) -> str:
+        """
+        保存结果（先写临时文件再重命名，避免读取到半写入的文件）
+
+        Returns:
+            结果文件路径
+        """
+        path = self.base_dir / f"{task_id}.json"
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        shutil.rmtree(self.parts_dir(str(path)), ignore_errors=True)
+        try:
+            self.save_parts(str(path), result)
+        except Exception as e:
+            # 分片在首次分页读取时会重新生成
+            logger.warning(f"Failed to write result parts for {task_id}: {str(e)}")
+        logger.info(f"Result saved: {path}")
+        return str(path)
+
+    def load(self, result_path: str) -> Optional[Dict[str, Any]]:
+        """读取结果，文件不存在时返回 None"""
+        path = Path(result_path)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def parts_dir(result_path: str) -> Path:
+        return Path(result_path).with_suffix(".parts")
+
+    def save_parts(self, result_path: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        写出按页 / 按元素类型的分片（先写临时目录，再整体重命名）
+
+        Returns:
+            manifest
+        """
+        target = self.parts_dir(result_path)
+        tmp_dir = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        tmp_dir.mkdir(parents=True)
+        try:
+            results = result.get("results") or {}
+            text = results.get("text") or {}
+            page_texts = dict(pages_from_result(result))
+            blocks: Dict[int, List[Dict[str, Any]]] = {}
+            for block in text.get("textBlocks") or []:
+                if isinstance(block, dict) and isinstance(block.get("page"), int):
+                    blocks.setdefault(block["page"], []).append(block)
+
+            counts, unpaged = {}, {}
+            paged: Dict[int, Dict[str, List[Dict[str, Any]]]] = {}
+            for kind in ELEMENT_TYPES:
+                elements = results.get(kind) or []
+                counts[kind] = len(elements)
+                unpaged[kind] = 0
+                with open(tmp_dir / f"{kind}.jsonl", "w", encoding="utf-8") as f:
+                    for element in elements:
+                        f.write(json.dumps(element, ensure_ascii=False) + "\n")
+                        page = element.get("page") if isinstance(element, dict) else None
+                        if isinstance(page, int):
+                            paged.setdefault(page, {}).setdefault(kind, []).append(element)
+                        else:
+                            unpaged[kind] += 1
+
+            metadata = {k: v for k, v in (result.get("metadata") or {}).items() if k not in _MANIFEST_SKIP_METADATA}
+            known_pages = set(page_texts) | set(blocks) | set(paged)
+            declared = metadata.get("total_pages") or metadata.get("page_count") or 0
+            page_count = max(max(known_pages, default=-1) + 1, declared if isinstance(declared, int) else 0)
+
+            offsets = []
+            with open(tmp_dir / "pages.jsonl", "wb") as f:
+                for page in range(page_count):
+                    offsets.append(f.tell())
+                    record = {"page": page, "markdown": page_texts.get(page, ""), "textBlocks": blocks.get(page, [])}
+                    for kind in ELEMENT_TYPES:
+                        record[kind] = paged.get(page, {}).get(kind, [])
+                    f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+            manifest = {
+                "version": PARTS_VERSION,
+                "success": result.get("success"),
+                "model": result.get("model"),
+                "filename": result.get("filename"),
+                "keywords": text.get("keywords") or [],
+                "page_count": page_count,
+                "counts": counts,
+                "unpaged": unpaged,
+                "metadata": metadata,
+                "page_offsets": offsets,
+            }
+            with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+
+            try:
+                os.rename(tmp_dir, target)
+            except OSError:
+                # 其他请求已经生成了同一结果的分片
+                if not (target / "manifest.json").exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return manifest
+
+    def manifest(self, result_path: str) -> Optional[Dict[str, Any]]:
+        """读取分片 manifest；旧结果没有分片时按完整结果补建一次，结果不存在时返回 None"""
+        path = self.parts_dir(result_path) / "manifest.json"
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        result = self.load(result_path)
+        if result is None:
+            return None
+        return self.save_parts(result_path, result)
+
+    @staticmethod
+    def _read_lines(path: Path, offset: int, limit: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """从字节偏移处读取至多 limit 行，返回 (记录, 下一行偏移或 None)"""
+        if not path.exists():
+            raise FileNotFoundError(str(path))
+        size = path.stat().st_size
+        items = []
+        with open(path, "rb") as f:
+            if offset > size:
+                raise CursorError("Cursor is past the end of the result")
+            if offset > 0:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    raise CursorError("Cursor is not at a record boundary")
+            f.seek(offset)
+            while len(items) < limit:
+                line = f.readline()
+                if not line:
+                    break
+                items.append(json.loads(line))
+            position = f.tell()
+        return items, (position if position < size else None)
+
+    def read_pages(
+        self,
+        result_path: str,
+        start: int = 0,
+        limit: int = 10,
+        cursor: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        按页读取（cursor 优先于 start）
+
+        Returns:
+            {"pages": [...], "next_cursor", "page_count"}，结果不存在时返回 None
+
+        Raises:
+            CursorError: 游标无效
+        """
+        manifest = self.manifest(result_path)
+        if manifest is None:
+            return None
+        if cursor:
+            offset = decode_cursor(cursor, "pages")
+        else:
+            offsets = manifest["page_offsets"]
+            if start >= len(offsets):
+                return {"pages": [], "next_cursor": None, "page_count": manifest["page_count"]}
+            offset = offsets[max(0, start)]
+        pages, next_offset = self._read_lines(self.parts_dir(result_path) / "pages.jsonl", offset, limit)
+        return {
+            "pages": pages,
+            "next_cursor": encode_cursor("pages", next_offset) if next_offset is not None else None,
+            "page_count": manifest["page_count"],
+        }
+
+    def read_elements(
+        self,
+        result_path: str,
+        kind: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        按元素类型读取（tables / formulas / images）
+
+        Raises:
+            ValueError: 未知的元素类型
+            CursorError: 游标无效
+        """
+        if kind not in ELEMENT_TYPES:
+            raise ValueError(f"Unknown element type '{kind}'. Supported: {', '.join(ELEMENT_TYPES)}")
+        manifest = self.manifest(result_path)
+        if manifest is None:
+            return None
+        offset = decode_cursor(cursor, kind) if cursor else 0
+        items, next_offset = self._read_lines(self.parts_dir(result_path) / f"{kind}.jsonl", offset, limit)
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(kind, next_offset) if next_offset is not None else None,
+            "total": manifest["counts"].get(kind, 0),
+        }
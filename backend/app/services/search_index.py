@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Search Index
+已处理文档的全文索引（SQLite FTS5），按页粒度检索：
+- 任务完成时增量写入，同一文档重新处理时替换旧的页面；结果文件被清理时删除对应的索引
+- 中日韩文字按相邻二字切分（bigram）后建索引，查询使用同样的切分并按短语匹配
+- 摘要在原文上截取，返回命中位置供前端高亮
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 假名、CJK 统一汉字（含扩展 A / 兼容区）、韩文音节
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_RUN = re.compile(f"[{_CJK_CHARS}]+")
+# 中日韩文字连续段，或不含中日韩文字的单词
+_QUERY_TERM = re.compile(f"[{_CJK_CHARS}]+|[^\\W{_CJK_CHARS}]+")
+_PAGE_MARKER = re.compile(r"^#\s*Page\s+(\d+)\s*$", re.MULTILINE)
+# DeepSeek-OCR 在每页 markdown 之后输出的分页标记
+_DEEPSEEK_PAGE_SPLIT = re.compile(r"^\s*<-+\s*Page\s+Split\s*-+>\s*$", re.MULTILINE)
+
+
+def _bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize_for_index(text: str) -> str:
+    """中日韩连续文字展开为重叠的二字词，其余文字交给 FTS5 的 unicode61 分词"""
+    parts = []
+    last = 0
+    for match in _CJK_RUN.finditer(text):
+        parts.append(text[last:match.start()])
+        parts.append(" ".join(_bigrams(match.group())))
+        last = match.end()
+    parts.append(text[last:])
+    return " ".join(parts)
+
+
+def query_terms(query: str) -> List[str]:
+    """查询拆分为检索词：中日韩文字连续段、其余按单词"""
+    return _QUERY_TERM.findall(query)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    构造 FTS5 MATCH 表达式：每个检索词一个短语（中日韩文字为二字词短语），词之间为 AND
+
+    所有检索词都加引号，用户输入中的 FTS5 语法字符不会生效
+    """
+    phrases = []
+    for term in query_terms(query):
+        if _CJK_RUN.fullmatch(term) and len(term) == 1:
+            # 单字只能匹配以该字开头的二字词
+            phrases.append(f'"{term}"*')
+            continue
+        tokens = _bigrams(term) if _CJK_RUN.fullmatch(term) else [term]
+        phrases.append('"' + " ".join(token.replace('"', '""') for token in tokens) + '"')
+    return " AND ".join(phrases) if phrases else None
+
+
+def make_snippet(text: str, terms: List[str], width: int = 80) -> Tuple[str, List[List[int]]]:
+    """
+    在原文中截取第一个命中附近的片段
+
+    Returns:
+        (snippet, highlights)，highlights 为片段内命中的 [start, end) 位置
+    """
+    lowered = text.lower()
+    positions = [(lowered.find(term.lower()), term) for term in terms]
+    positions = [(pos, term) for pos, term in positions if pos >= 0]
+    if not positions:
+        snippet = text[:width * 2]
+        return snippet.strip(), []
+
+    first = min(pos for pos, _ in positions)
+    start = max(0, first - width)
+    end = min(len(text), first + width)
+    snippet = text[start:end]
+
+    highlights = []
+    lowered_snippet = snippet.lower()
+    for term in {term.lower() for _, term in positions}:
+        index = lowered_snippet.find(term)
+        while index >= 0:
+            highlights.append([index, index + len(term)])
+            index = lowered_snippet.find(term, index + len(term))
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    return prefix + snippet + suffix, sorted([s + len(prefix), e + len(prefix)] for s, e in highlights)
+
+
+def pages_from_result(result: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """
+    从 OCRResponse 字典中按页拆分文本
+
+    优先使用带页码的 textBlocks；否则按 PaddleOCR 的 "# Page N" 标记或 DeepSeek-OCR 的
+    "<--- Page Split --->" 分页标记拆分 markdown；都没有时整篇作为第 0 页
+    """
+    results = result.get("results") or {}
+    blocks = (results.get("text") or {}).get("textBlocks") or []
+    pages: Dict[int, List[str]] = {}
+    for block in blocks:
+        if isinstance(block, dict) and isinstance(block.get("page"), int) and block.get("content"):
+            pages.setdefault(block["page"], []).append(block["content"])
+    if pages:
+        return [(page, "\n".join(texts)) for page, texts in sorted(pages.items())]
+
+    markdown = result.get("fullMarkdown") or ""
+    markers = list(_PAGE_MARKER.finditer(markdown))
+    if markers:
+        split = []
+        for index, marker in enumerate(markers):
+            end = markers[index + 1].start() if index + 1 < len(markers) else len(markdown)
+            text = markdown[marker.end():end].strip()
+            if text:
+                split.append((int(marker.group(1)) - 1, text))
+        return split
+
+    if _DEEPSEEK_PAGE_SPLIT.search(markdown):
+        # 第 N 个分页标记之前的内容为第 N 页（最后一页之后可能没有标记）
+        return [
+            (page, text.strip())
+            for page, text in enumerate(_DEEPSEEK_PAGE_SPLIT.split(markdown))
+            if text.strip()
+        ]
+
+    return [(0, markdown)] if markdown.strip() else []
+
+
+class SearchIndex:
+    """SQLite FTS5 全文索引（多 worker 共享同一数据库文件）"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path or os.getenv("SEARCH_INDEX_DB", "./data/search.db"))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.snippet_width = int(os.getenv("SEARCH_SNIPPET_CHARS", "80"))
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                task_id TEXT,
+                filename TEXT,
+                model TEXT,
+                pages INTEGER NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_doc ON pages(doc_id)")
+        # terms 为 tokenize_for_index 处理后的文本，rowid 与 pages.id 对应
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+                terms, tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+
+    def index_document(
+        self,
+        doc_id: str,
+        pages: List[Tuple[int, str]],
+        task_id: Optional[str] = None,
+        filename: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> int:
+        """
+        写入（或替换）一个文档的所有页面
+
+        Returns:
+            写入的页数
+        """
+        rows = [(page, text) for page, text in pages if text and text.strip()]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_pages(conn, doc_id)
+            for page, text in rows:
+                cursor = conn.execute(
+                    "INSERT INTO pages (doc_id, page, text) VALUES (?, ?, ?)", (doc_id, page, text)
+                )
+                conn.execute(
+                    "INSERT INTO pages_fts (rowid, terms) VALUES (?, ?)",
+                    (cursor.lastrowid, tokenize_for_index(text))
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, task_id, filename, model, pages, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, task_id, filename, model, len(rows), time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"🔎 Indexed {len(rows)} pages for document {doc_id}")
+        return len(rows)
+
+    def index_result(self, doc_id: str, result: Dict[str, Any], task_id: Optional[str] = None) -> int:
+        """按页索引一个 OCRResponse 字典"""
+        return self.index_document(
+            doc_id,
+            pages_from_result(result),
+            task_id=task_id,
+            filename=result.get("filename"),
+            model=result.get("model")
+        )
+
+    @staticmethod
+    def _delete_pages(conn: sqlite3.Connection, doc_id: str) -> None:
+        conn.execute(
+            "DELETE FROM pages_fts WHERE rowid IN (SELECT id FROM pages WHERE doc_id = ?)", (doc_id,)
+        )
+        conn.execute("DELETE FROM pages WHERE doc_id = ?", (doc_id,))
+
+    def delete_document(self, doc_id: str) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_pages(conn, doc_id)
+            deleted = conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted > 0
+
+    def delete_task(self, task_id: str) -> int:
+        """
+        删除由该任务写入的文档（其结果文件已被清理）；文档已被之后的任务重新索引时保留
+
+        Returns:
+            删除的文档数
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            doc_ids = [row["doc_id"] for row in conn.execute(
+                "SELECT doc_id FROM documents WHERE task_id = ?", (task_id,)
+            ).fetchall()]
+            for doc_id in doc_ids:
+                self._delete_pages(conn, doc_id)
+                conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if doc_ids:
+            logger.info(f"🔎 Removed {len(doc_ids)} indexed documents of evicted task {task_id}")
+        return len(doc_ids)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        检索页面，按 BM25 相关度排序
+
+        Returns:
+            {"query", "hits": [{doc_id, task_id, filename, page, snippet, highlights, score}], "took_ms"}
+        """
+        started = time.perf_counter()
+        match = build_match_query(query)
+        hits = []
+        if match:
+            rows = self._connect().execute(
+                """
+                SELECT p.doc_id, p.page, p.text, d.task_id, d.filename, bm25(pages_fts) AS score
+                FROM pages_fts
+                JOIN pages p ON p.id = pages_fts.rowid
+                LEFT JOIN documents d ON d.doc_id = p.doc_id
+                WHERE pages_fts MATCH ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+                """,
+                (match, limit, offset)
+            ).fetchall()
+            terms = query_terms(query)
+            for row in rows:
+                snippet, highlights = make_snippet(row["text"], terms, self.snippet_width)
+                hits.append({
+                    "doc_id": row["doc_id"],
+                    "task_id": row["task_id"],
+                    "filename": row["filename"],
+                    "page": row["page"],
+                    "snippet": snippet,
+                    "highlights": highlights,
+                    "score": round(-row["score"], 4),
+                })
+        return {
+            "query": query,
+            "hits": hits,
+            "limit": limit,
+            "offset": offset,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        documents, pages = conn.execute("SELECT COUNT(*), COALESCE(SUM(pages), 0) FROM documents").fetchone()
+        return {
+            "documents": documents,
+            "pages": pages,
+            "db_bytes": self.db_path.stat().st_size if self.db_path.exists() else 0,
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Service Registry
+按需（首次使用时）导入并初始化各 OCR 服务，记录初始化耗时
+未启用的模型不会被导入，也不会占用内存
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# 服务名 -> (模块路径, 类名)
+SERVICE_FACTORIES = {
+    "mineru": ("app.services.mineru_service", "MinerUService"),
+    "deepseek": ("app.services.deepseek_service", "DeepSeekOCRService"),
+    "paddleocr": ("app.services.paddleocr_service", "PaddleOCRService"),
+    "markdown_parser": ("app.services.markdown_parser", "MarkdownParser"),
+}
+
+ALL_MODELS = ["mineru", "deepseek", "paddleocr"]
+
+
+def enabled_models() -> List[str]:
+    """ENABLED_MODELS 中配置的模型（默认全部启用）"""
+    configured = os.getenv("ENABLED_MODELS", ",".join(ALL_MODELS))
+    models = [name.strip() for name in configured.split(",") if name.strip()]
+    unknown = set(models) - set(ALL_MODELS)
+    if unknown:
+        logger.warning(f"Ignoring unknown models in ENABLED_MODELS: {', '.join(sorted(unknown))}")
+    return [name for name in ALL_MODELS if name in models]
+
+
+class ServiceRegistry:
+    """延迟初始化的服务容器"""
+
+    def __init__(self, models: List[str] = None):
+        self.models = models if models is not None else enabled_models()
+        self._instances: Dict[str, Any] = {}
+        self._timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def is_enabled(self, name: str) -> bool:
+        return name in self.models or name not in ALL_MODELS
+
+    def get(self, name: str) -> Any:
+        """获取服务实例，首次调用时导入模块并创建实例"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in SERVICE_FACTORIES:
+            raise KeyError(f"Unknown service: {name}")
+        if not self.is_enabled(name):
+            raise RuntimeError(f"Model '{name}' is disabled (ENABLED_MODELS={','.join(self.models)})")
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                module_name, class_name = SERVICE_FACTORIES[name]
+                started = time.perf_counter()
+                module = importlib.import_module(module_name)
+                instance = getattr(module, class_name)()
+                self._timings[name] = time.perf_counter() - started
+                self._instances[name] = instance
+                logger.info(f"Initialized {class_name} in {self._timings[name] * 1000:.1f} ms")
+        return instance
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self._instances
+
+    def preload(self) -> None:
+        """预先初始化所有启用的服务（PRELOAD_SERVICES=true 时在启动阶段调用）"""
+        for name in self.models + ["markdown_parser"]:
+            self.get(name)
+
+    def report(self) -> Dict[str, Any]:
+        """各服务的初始化状态与耗时"""
+        return {
+            "enabled_models": self.models,
+            "services": {
+                name: {
+                    "enabled": self.is_enabled(name),
+                    "initialized": self.is_initialized(name),
+                    "init_ms": round(self._timings[name] * 1000, 1) if name in self._timings else None,
+                }
+                for name in SERVICE_FACTORIES
+            }
+        }
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Storage Janitor
+定期清理 uploads/、temp/、exports/ 和 results/ 目录：
+- TTL：超过保留时间的文件被删除
+- 配额：目录总大小超过配额时，按最旧（mtime）或最近最少访问（atime）顺序淘汰
+- 仍被活跃任务引用的文件（包括运行中任务的临时目录），以及刚写入不久的文件不会被删除
+- 上传文件经 UploadStore 按引用计数释放；结果文件与其 <task_id>.parts/ 分片目录一起淘汰，
+  淘汰后通知搜索索引删除对应的页面
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+@dataclass
+class StoragePolicy:
+    """单个目录的清理策略"""
+    name: str
+    directory: Path
+    ttl_seconds: float = 0          # 0 表示不按 TTL 清理
+    quota_bytes: int = 0            # 0 表示不限制大小
+    # 与文件同名、以该后缀结尾的目录随文件一起淘汰（如 results/<task_id>.parts/）
+    companion_suffix: str = ""
+    # 代替直接删除的回调 (路径, 引用截止时间) -> 是否已删除（如上传文件按引用计数释放）
+    evict: Optional[Callable[[Path, float], bool]] = None
+    # 删除成功后的回调 (路径)（如删除结果对应的搜索索引），失败只记录日志
+    on_removed: Optional[Callable[[Path], None]] = None
+
+
+@dataclass
+class _FileEntry:
+    path: Path
+    size: int
+    last_used: float
+    # 与 path 一起淘汰的附属目录
+    companions: List[Path] = field(default_factory=list)
+
+
+@dataclass
+class _DirectoryStats:
+    files_removed: int = 0
+    bytes_reclaimed: int = 0
+    bytes_in_use: int = 0
+    files_in_use: int = 0
+    last_error: Optional[str] = None
+
+
+def _env_hours(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default))) * 3600
+
+
+def _env_mb(name: str, default: float) -> int:
+    return int(float(os.getenv(name, str(default))) * _MB)
+
+
+def default_policies(
+    evict_upload: Optional[Callable[[Path, float], bool]] = None,
+    result_removed: Optional[Callable[[str], None]] = None
+) -> List[StoragePolicy]:
+    """
+    根据环境变量生成各目录的清理策略
+
+    Args:
+        evict_upload: 上传文件的淘汰回调（UploadStore.evict），保证引用计数表与文件一致
+        result_removed: 结果被淘汰后的回调 (task_id)（如 SearchIndex.delete_task）
+    """
+    return [
+        StoragePolicy("uploads", Path(os.getenv("UPLOAD_DIR", "./uploads")),
+                      _env_hours("UPLOAD_TTL_HOURS", 24), _env_mb("UPLOAD_QUOTA_MB", 2048), evict=evict_upload),
+        StoragePolicy("temp", Path(os.getenv("TEMP_DIR", "./temp")),
+                      _env_hours("TEMP_TTL_HOURS", 6), _env_mb("TEMP_QUOTA_MB", 1024)),
+        StoragePolicy("exports", Path(os.getenv("EXPORT_DIR", "./exports")),
+                      _env_hours("EXPORT_TTL_HOURS", 72), _env_mb("EXPORT_QUOTA_MB", 2048)),
+        StoragePolicy("results", Path(os.getenv("RESULTS_DIR", "./results")),
+                      _env_hours("RESULTS_TTL_HOURS", 168), _env_mb("RESULTS_QUOTA_MB", 0), companion_suffix=".parts",
+                      # results/<task_id>.json 或只剩 results/<task_id>.parts/
+                      on_removed=(lambda path: result_removed(path.stem)) if result_removed else None),
+    ]
+
+
+class StorageJanitor:
+    """后台存储清理器"""
+
+    def __init__(
+        self,
+        policies: List[StoragePolicy],
+        protected_paths: Callable[[], Set[str]],
+        interval: Optional[float] = None,
+        eviction_policy: Optional[str] = None,
+        min_age_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            policies: 各目录的清理策略
+            protected_paths: 返回仍被活跃任务引用的文件或目录路径集合（目录下的所有文件都不会被删除）
+            interval: 两次清理之间的秒数
+            eviction_policy: 'lru'（按最近访问时间）或 'oldest'（按修改时间）
+            min_age_seconds: 文件至少存在多久才允许被删除
+        """
+        self.policies = policies
+        self.protected_paths = protected_paths
+        self.interval = interval if interval is not None else float(os.getenv("JANITOR_INTERVAL", "300"))
+        self.eviction_policy = (eviction_policy or os.getenv("JANITOR_EVICTION_POLICY", "lru")).lower()
+        self.min_age_seconds = min_age_seconds if min_age_seconds is not None else float(
+            os.getenv("JANITOR_MIN_AGE_SECONDS", "300")
+        )
+        self._stats = {policy.name: _DirectoryStats() for policy in policies}
+        self.runs = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """启动后台清理循环"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Storage janitor sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def _last_used(self, stat: os.stat_result) -> float:
+        if self.eviction_policy == "oldest":
+            return stat.st_mtime
+        # 以 noatime 挂载时 atime 不会更新，取两者较大值
+        return max(stat.st_atime, stat.st_mtime)
+
+    def _scan(self, policy: StoragePolicy) -> List[_FileEntry]:
+        """列出可淘汰的单元：普通文件各自一个；设置了 companion_suffix 时文件与同名附属目录合为一个"""
+        entries = []
+        units: Dict[Path, _FileEntry] = {}
+        for root, dirs, files in os.walk(policy.directory):
+            root_path = Path(root)
+            if policy.companion_suffix:
+                for name in [name for name in dirs if name.endswith(policy.companion_suffix)]:
+                    dirs.remove(name)
+                    companion = root_path / name
+                    size, last_used = self._directory_usage(companion)
+                    unit = units.setdefault(companion.with_suffix(""), _FileEntry(companion, 0, 0))
+                    unit.companions.append(companion)
+                    unit.size += size
+                    unit.last_used = max(unit.last_used, last_used)
+            for name in files:
+                path = root_path / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if not policy.companion_suffix:
+                    entries.append(_FileEntry(path, stat.st_size, self._last_used(stat)))
+                    continue
+                unit = units.setdefault(path.with_suffix(""), _FileEntry(path, 0, 0))
+                unit.path = path
+                unit.size += stat.st_size
+                unit.last_used = max(unit.last_used, self._last_used(stat))
+        return entries + list(units.values())
+
+    def _directory_usage(self, directory: Path):
+        size, last_used = 0, 0.0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                try:
+                    stat = (Path(root) / name).stat()
+                except FileNotFoundError:
+                    continue
+                size += stat.st_size
+                last_used = max(last_used, self._last_used(stat))
+        if not last_used:
+            try:
+                last_used = self._last_used(directory.stat())
+            except FileNotFoundError:
+                pass
+        return size, last_used
+
+    @staticmethod
+    def _is_protected(entry: _FileEntry, protected: Set[str]) -> bool:
+        for path in (entry.path, *entry.companions):
+            resolved = path.resolve()
+            if str(resolved) in protected or any(str(parent) in protected for parent in resolved.parents):
+                return True
+        return False
+
+    def _remove(self, policy: StoragePolicy, entry: _FileEntry, stats: _DirectoryStats, ref_cutoff: float) -> bool:
+        try:
+            if entry.path not in entry.companions:
+                if policy.evict is not None:
+                    if not policy.evict(entry.path, ref_cutoff):
+                        return False
+                else:
+                    entry.path.unlink()
+            for companion in entry.companions:
+                shutil.rmtree(companion)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            stats.last_error = f"{entry.path}: {str(e)}"
+            return False
+        stats.files_removed += 1
+        stats.bytes_reclaimed += entry.size
+        if policy.on_removed is not None:
+            try:
+                policy.on_removed(entry.path)
+            except Exception as e:
+                logger.warning(f"Post-removal hook failed for {entry.path}: {str(e)}")
+        return True
+
+    @staticmethod
+    def _remove_empty_dirs(directory: Path, protected: Set[str]) -> None:
+        # 自底向上遍历，子目录删除后父目录也可能变空；非空目录 rmdir 会失败
+        for root, _, files in os.walk(directory, topdown=False):
+            if Path(root) == directory or files or str(Path(root).resolve()) in protected:
+                continue
+            try:
+                Path(root).rmdir()
+            except OSError:
+                pass
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        执行一次清理
+
+        Returns:
+            每个目录本次回收的字节数
+        """
+        started = time.perf_counter()
+        now = time.time()
+        protected = {str(Path(path).resolve()) for path in self.protected_paths() if path}
+        reclaimed = {}
+        # 早于该时间登记的上传引用，其任务若仍活跃必然已出现在 protected 中
+        ref_cutoff = now - self.min_age_seconds
+
+        for policy in self.policies:
+            stats = self._stats[policy.name]
+            if not policy.directory.exists():
+                reclaimed[policy.name] = 0
+                continue
+
+            before = stats.bytes_reclaimed
+            candidates = []
+            kept_bytes = 0
+            kept_files = 0
+
+            for entry in self._scan(policy):
+                age = now - entry.last_used
+                if age < self.min_age_seconds or self._is_protected(entry, protected):
+                    kept_bytes += entry.size
+                    kept_files += 1
+                elif policy.ttl_seconds and age > policy.ttl_seconds:
+                    if not self._remove(policy, entry, stats, ref_cutoff):
+                        kept_bytes += entry.size
+                        kept_files += 1
+                else:
+                    candidates.append(entry)
+
+            total = kept_bytes + sum(entry.size for entry in candidates)
+            if policy.quota_bytes and total > policy.quota_bytes:
+                # 从最久未使用的文件开始淘汰，直到回到配额以内
+                candidates.sort(key=lambda entry: entry.last_used)
+                survivors = []
+                for entry in candidates:
+                    if total > policy.quota_bytes and self._remove(policy, entry, stats, ref_cutoff):
+                        total -= entry.size
+                    else:
+                        survivors.append(entry)
+                candidates = survivors
+
+            self._remove_empty_dirs(policy.directory, protected)
+            stats.bytes_in_use = kept_bytes + sum(entry.size for entry in candidates)
+            stats.files_in_use = kept_files + len(candidates)
+            reclaimed[policy.name] = stats.bytes_reclaimed - before
+
+        self.runs += 1
+        self.last_run_at = now
+        self.last_run_seconds = time.perf_counter() - started
+
+        total_reclaimed = sum(reclaimed.values())
+        if total_reclaimed:
+            logger.info(f"🧹 Storage janitor reclaimed {total_reclaimed / _MB:.1f} MB: {reclaimed}")
+        return reclaimed
+
+    def stats(self) -> Dict[str, Any]:
+        """清理指标"""
+        return {
+            "runs": self.runs,
+            "interval_seconds": self.interval,
+            "eviction_policy": self.eviction_policy,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": round(self.last_run_seconds, 3) if self.last_run_seconds is not None else None,
+            "bytes_reclaimed_total": sum(stats.bytes_reclaimed for stats in self._stats.values()),
+            "directories": {
+                policy.name: {
+                    "path": str(policy.directory),
+                    "ttl_seconds": policy.ttl_seconds,
+                    "quota_bytes": policy.quota_bytes,
+                    "bytes_in_use": self._stats[policy.name].bytes_in_use,
+                    "files_in_use": self._stats[policy.name].files_in_use,
+                    "files_removed": self._stats[policy.name].files_removed,
+                    "bytes_reclaimed": self._stats[policy.name].bytes_reclaimed,
+                    "last_error": self._stats[policy.name].last_error,
+                }
+                for policy in self.policies
+            }
+        }
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Table Store
+所有已提取表格的列式数据集（Parquet，按 hive 风格分区）：
+- 任务完成时把结果中的表格展开为单元格行（文档 / 页 / 表格 / 行 / 列），追加写入
+- 只追加不修改：每次刷新写出新的 Parquet 文件（先写临时文件再原子重命名），多 worker 可共享同一目录
+- 按 date=YYYY-MM-DD/model=xxx 分区，分析时按分区裁剪，直接扫描列式文件，无需再解析 JSON
+- pyarrow 为可选依赖，首次写入或查询时才导入（不拖慢启动），不可用时表格数据集功能关闭
+
+持久性：单元格先在进程内缓冲，最多 TABLE_STORE_FLUSH_SECONDS 秒或 TABLE_STORE_FLUSH_ROWS 行后写出；
+正常关闭时会写出剩余缓冲，但进程崩溃或被 SIGKILL 时缓冲中的单元格会丢失（结果 JSON 不受影响）。
+TABLE_STORE_FLUSH_ON_COMPLETE=true 时每个任务完成即写出（不丢数据，但会产生更多小文件）。
+写出失败的分区放回缓冲，下次刷新时重试。
+
+重复数据：doc_id 是上传文件的内容键，同一文件再次处理时会以新的 task_id 再追加一份单元格，
+旧的不会被替换；只需要最新结果时按 task_id 查询（或在分析时按 doc_id 取 indexed_at 最大的 task_id）
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.utils.table_codec import table_rows
+
+logger = logging.getLogger(__name__)
+
+# 单元格行的列（分区列 date / model 不写入文件本身，由目录名给出）
+TABLE_COLUMNS = [
+    ("doc_id", "string"),
+    ("task_id", "string"),
+    ("filename", "string"),
+    ("page", "int32"),
+    ("table_index", "int32"),
+    ("table_id", "string"),
+    ("title", "string"),
+    ("row", "int32"),
+    ("col", "int32"),
+    ("is_header", "bool_"),
+    ("value", "string"),
+    ("indexed_at", "float64"),
+]
+PARTITION_COLUMNS = ("date", "model")
+
+_pyarrow = None
+
+
+def load_pyarrow():
+    """按需导入 pyarrow（表格数据集的可选依赖），不可用时返回 None"""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.dataset  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+            _pyarrow = pyarrow
+        except ImportError:
+            _pyarrow = False
+            logger.warning("pyarrow not available - table dataset will be disabled")
+    return _pyarrow or None
+
+
+def table_schema(pa):
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in TABLE_COLUMNS])
+
+
+def table_cells(tables: List[Dict[str, Any]]) -> Iterator[Tuple[int, Dict[str, Any], int, int, bool, str]]:
+    """
+    把 TableResult 字典展开为单元格
+
+    Yields:
+        (table_index, table, row, col, is_header, value)；有表头时表头为第 0 行
+    """
+    for table_index, table in enumerate(tables):
+        rows = []
+        headers = table.get("headers") or []
+        if headers:
+            rows.append((True, headers))
+        rows.extend((False, row) for row in table_rows(table))
+        for row_index, (is_header, cells) in enumerate(rows):
+            for col_index, value in enumerate(cells):
+                yield table_index, table, row_index, col_index, is_header, "" if value is None else str(value)
+
+
+class TableStore:
+    """追加写入的 Parquet 表格数据集（进程内缓冲，按行数或时间刷新）"""
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        flush_rows: Optional[int] = None,
+        flush_seconds: Optional[float] = None
+    ):
+        self.base_dir = Path(base_dir or os.getenv("TABLE_STORE_DIR", "./data/tables"))
+        self.flush_rows = flush_rows or int(os.getenv("TABLE_STORE_FLUSH_ROWS", "50000"))
+        self.flush_seconds = flush_seconds if flush_seconds is not None else float(
+            os.getenv("TABLE_STORE_FLUSH_SECONDS", "30")
+        )
+        self.flush_on_complete = os.getenv("TABLE_STORE_FLUSH_ON_COMPLETE", "false").lower() == "true"
+        # 是否检查过 pyarrow 在首次使用时才确定
+        self.enabled = os.getenv("TABLE_STORE_ENABLED", "true").lower() == "true"
+        self._lock = threading.Lock()
+        # (date, model) -> 列名 -> 值列表
+        self._buffers: Dict[Tuple[str, str], Dict[str, List[Any]]] = {}
+        self._buffered_rows = 0
+        self._oldest: Optional[float] = None
+        self._files_written = 0
+        self._rows_written = 0
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _available(self) -> bool:
+        """首次使用时导入 pyarrow，不可用时关闭数据集"""
+        if self.enabled and load_pyarrow() is None:
+            self.enabled = False
+        return self.enabled
+
+    def _start_flusher(self) -> None:
+        """有数据缓冲后才启动定时刷新线程（调用方持有锁）"""
+        if self._flusher is None and self.flush_seconds > 0 and not self._stop.is_set():
+            self._flusher = threading.Thread(target=self._flush_loop, name="table-store-flush", daemon=True)
+            self._flusher.start()
+
+    def append_result(self, doc_id: str, result: Dict[str, Any], task_id: Optional[str] = None) -> int:
+        """
+        追加一个 OCRResponse 字典中的所有表格
+
+        Returns:
+            写入缓冲的单元格行数
+        """
+        tables = (result.get("results") or {}).get("tables") or []
+        if not tables or not self._available():
+            return 0
+
+        now = time.time()
+        key = (datetime.fromtimestamp(now, tz=timezone.utc).strftime("%Y-%m-%d"), result.get("model") or "unknown")
+        filename = result.get("filename")
+        added = 0
+        with self._lock:
+            buffer = self._buffers.setdefault(key, {name: [] for name, _ in TABLE_COLUMNS})
+            for table_index, table, row, col, is_header, value in table_cells(tables):
+                page = table.get("page")
+                for name, item in (
+                    ("doc_id", doc_id), ("task_id", task_id), ("filename", filename),
+                    ("page", page if isinstance(page, int) else None), ("table_index", table_index),
+                    ("table_id", str(table.get("id") or "")), ("title", table.get("title")),
+                    ("row", row), ("col", col), ("is_header", is_header), ("value", value), ("indexed_at", now),
+                ):
+                    buffer[name].append(item)
+                added += 1
+            self._buffered_rows += added
+            if self._oldest is None:
+                self._oldest = now
+            self._start_flusher()
+            should_flush = self.flush_on_complete or self._buffered_rows >= self.flush_rows
+        if should_flush:
+            self.flush()
+        return added
+
+    def flush(self) -> int:
+        """
+        把缓冲写出为 Parquet 文件（每个分区一个新文件）
+
+        Raises:
+            写出失败时抛出原异常；该分区及之后尚未写出的分区放回缓冲，已写出的分区不会重复写入
+        """
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            oldest, self._oldest = self._oldest, None
+            self._buffered_rows = 0
+        if not buffers:
+            return 0
+
+        pa = load_pyarrow()
+        schema = table_schema(pa)
+        written = 0
+        partitions = list(buffers.items())
+        for index, ((date, model), columns) in enumerate(partitions):
+            directory = self.base_dir / f"date={date}" / f"model={model}"
+            name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:12]}.parquet"
+            tmp_path = directory / f".{name}.tmp"
+            try:
+                directory.mkdir(parents=True, exist_ok=True)
+                pa.parquet.write_table(
+                    pa.Table.from_pydict(columns, schema=schema), str(tmp_path), compression="zstd"
+                )
+                os.replace(tmp_path, directory / name)
+            except Exception:
+                self._restore(partitions[index:], oldest)
+                raise
+            finally:
+                tmp_path.unlink(missing_ok=True)
+            rows = len(columns["doc_id"])
+            written += rows
+            self._rows_written += rows
+            self._files_written += 1
+        logger.info(f"🧮 Table store flushed {written} cells to {len(buffers)} parquet files")
+        return written
+
+    def _restore(self, partitions: List[Tuple[Tuple[str, str], Dict[str, List[Any]]]], oldest: Optional[float]) -> None:
+        """写出失败的分区放回缓冲（排在刷新期间新追加的单元格之前）"""
+        with self._lock:
+            for key, columns in partitions:
+                self._buffered_rows += len(columns["doc_id"])
+                newer = self._buffers.get(key)
+                if newer:
+                    for name, values in columns.items():
+                        values.extend(newer[name])
+                self._buffers[key] = columns
+            if oldest is not None:
+                self._oldest = oldest if self._oldest is None else min(self._oldest, oldest)
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(min(self.flush_seconds, 5.0)):
+            oldest = self._oldest
+            if oldest is not None and time.time() - oldest >= self.flush_seconds:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.warning(f"Table store flush failed: {str(e)}")
+
+    def dataset(self):
+        """整个数据集（pyarrow.dataset，分区列 date / model 由目录名给出）"""
+        pa = load_pyarrow()
+        schema = table_schema(pa)
+        for name in PARTITION_COLUMNS:
+            schema = schema.append(pa.field(name, pa.string()))
+        return pa.dataset.dataset(
+            str(self.base_dir),
+            format="parquet",
+            partitioning="hive",
+            schema=schema,
+            # 跳过写入中的临时文件
+            ignore_prefixes=[".", "_"],
+        )
+
+    def query(
+        self,
+        doc_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+        model: Optional[str] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        按文档 / 任务 / 模型过滤单元格行（只包含已刷新到磁盘的数据）
+
+        同一上传文件多次处理时，按 doc_id 查询会返回每次处理的单元格（task_id 不同），需要时再按 task_id 过滤
+        """
+        if limit <= 0 or not self.enabled or not any(self.base_dir.rglob("*.parquet")):
+            return []
+        if not self._available():
+            return []
+        field = load_pyarrow().dataset.field
+        expression = None
+        for name, value in (("doc_id", doc_id), ("task_id", task_id), ("model", model)):
+            if value is not None:
+                condition = field(name) == value
+                expression = condition if expression is None else expression & condition
+        return self.dataset().head(limit, filter=expression).to_pylist()
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.base_dir.rglob("*.parquet")) if self.enabled else []
+        return {
+            "enabled": self.enabled,
+            "path": str(self.base_dir),
+            "files": len(files),
+            "bytes": sum(path.stat().st_size for path in files),
+            "buffered_rows": self._buffered_rows,
+            "flush_seconds": self.flush_seconds,
+            "flush_on_complete": self.flush_on_complete,
+            "files_written": self._files_written,
+            "rows_written": self._rows_written,
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        if self._buffered_rows:
+            self.flush()
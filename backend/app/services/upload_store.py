@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Upload Store
+按内容寻址的上传文件存储：
+- 文件以 SHA-256 命名，内容相同的上传只保存一份
+- 先写临时文件再原子重命名，正在处理的任务不会读到半写入或被替换的文件
+- 每个任务持有一个引用，最后一个引用释放时删除文件
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SAFE_SUFFIX = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class UploadStore:
+    """内容寻址 + 引用计数的上传文件存储（SQLite 索引，多 worker 共享）"""
+
+    def __init__(self, base_dir: Optional[str] = None, db_path: Optional[str] = None):
+        self.base_dir = Path(base_dir or os.getenv("UPLOAD_DIR", "./uploads"))
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path or os.getenv("UPLOAD_INDEX_DB", "./data/uploads.db"))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        # 每个持有者（任务 ID）一行，重复释放不会把计数减成负数
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS refs (
+                key TEXT NOT NULL,
+                holder TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (key, holder)
+            )
+        """)
+
+    @staticmethod
+    def make_key(digest: str, filename: str) -> str:
+        """内容哈希 + 规范化的扩展名（各 OCR 服务依赖扩展名判断文件类型）"""
+        suffix = Path(filename or "").suffix.lower()
+        return digest + (suffix if _SAFE_SUFFIX.match(suffix) else "")
+
+    def path_for(self, key: str) -> Path:
+        return self.base_dir / key[:2] / key
+
+    def put(self, content: bytes, filename: str, holder: str) -> Tuple[str, Path]:
+        """
+        保存上传内容并为 holder 增加一个引用
+
+        Args:
+            content: 文件内容
+            filename: 原始文件名（只用于扩展名）
+            holder: 引用持有者，一般为任务 ID
+
+        Returns:
+            (key, 文件路径)
+        """
+        key = self.make_key(hashlib.sha256(content).hexdigest(), filename)
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 在事务外写好临时文件，持有写锁的时间只包含重命名
+        tmp_path = None
+        if not path.exists():
+            tmp_path = self._write_tmp(path, content)
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not path.exists():
+                if tmp_path is None:
+                    tmp_path = self._write_tmp(path, content)
+                os.replace(tmp_path, path)
+                tmp_path = None
+            conn.execute(
+                """
+                INSERT INTO blobs (key, size, created_at, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET last_used = excluded.last_used
+                """,
+                (key, len(content), now, now)
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO refs (key, holder, created_at) VALUES (?, ?, ?)",
+                (key, holder, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            if tmp_path is not None:
+                # 其他请求已经写入了相同内容
+                tmp_path.unlink(missing_ok=True)
+
+        return key, path
+
+    @staticmethod
+    def _write_tmp(path: Path, content: bytes) -> Path:
+        tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+
+    def release(self, key: str, holder: str) -> bool:
+        """
+        释放 holder 的引用，没有引用时删除文件
+
+        Returns:
+            文件是否被删除
+        """
+        removed = self._drop_refs(key, "holder = ?", (holder,))
+        if removed:
+            logger.info(f"Upload {key} released and removed")
+        return removed
+
+    def evict(self, path: Path, before: float) -> bool:
+        """
+        存储清理器淘汰上传文件：释放 before 之前登记的引用（持有的任务已不再活跃），
+        没有剩余引用时删除文件。清理期间新上传相同内容登记的引用会保留文件
+
+        Returns:
+            文件是否被删除
+        """
+        path = Path(path)
+        key = path.name
+        if path.resolve() != self.path_for(key).resolve():
+            # 不是内容寻址的文件（如中断写入遗留的临时文件），直接删除
+            path.unlink()
+            return True
+        removed = self._drop_refs(key, "created_at < ?", (before,))
+        if removed:
+            logger.info(f"Upload {key} evicted")
+        return removed
+
+    def _drop_refs(self, key: str, condition: str, params: tuple) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM refs WHERE key = ? AND {condition}", (key, *params))
+            remaining = conn.execute("SELECT COUNT(*) FROM refs WHERE key = ?", (key,)).fetchone()[0]
+            removed = False
+            if remaining == 0:
+                conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+                try:
+                    self.path_for(key).unlink()
+                    removed = True
+                except FileNotFoundError:
+                    pass
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def refcount(self, key: str) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM refs WHERE key = ?", (key,)).fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
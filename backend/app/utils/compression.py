@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Response Compression
+按 Accept-Encoding 协商响应压缩（zstd / br / gzip）的 ASGI 中间件：
+- 小于阈值、已编码、不可压缩类型（图片、压缩包）和 SSE 流不压缩
+- 压缩级别按响应大小选择：小响应压得更狠，大响应优先速度
+- 大块数据在线程池中压缩，不阻塞事件循环；流式响应逐块压缩
+- 统计各编码的压缩率和耗时
+- brotli / zstandard 为可选依赖，不可用时只协商 gzip
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 服务端偏好顺序（客户端 q 值相同时使用）
+DEFAULT_ENCODINGS = ("zstd", "br", "gzip")
+
+# 各编码在 小 / 中 / 大 响应下的压缩级别
+_LEVELS = {
+    "gzip": (6, 4, 1),
+    "br": (6, 4, 1),
+    "zstd": (6, 3, 1),
+}
+_MEDIUM_SIZE = 256 * 1024
+_LARGE_SIZE = 4 * 1024 * 1024
+
+_COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "application/x-ndjson",
+    "application/problem+json", "image/svg+xml",
+)
+
+_brotli = None
+_zstd = None
+
+
+def load_brotli():
+    """按需导入 brotli（或 brotlicffi），不可用时返回 None"""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            try:
+                import brotlicffi as brotli
+                _brotli = brotli
+            except ImportError:
+                _brotli = False
+                logger.info("brotli not available - br response compression will be disabled")
+    return _brotli or None
+
+
+def load_zstd():
+    """按需导入 zstandard，不可用时返回 None"""
+    global _zstd
+    if _zstd is None:
+        try:
+            import zstandard
+            _zstd = zstandard
+        except ImportError:
+            _zstd = False
+            logger.info("zstandard not available - zstd response compression will be disabled")
+    return _zstd or None
+
+
+def available_encodings(preferred: Tuple[str, ...] = DEFAULT_ENCODINGS) -> List[str]:
+    loaders = {"gzip": lambda: zlib, "br": load_brotli, "zstd": load_zstd}
+    return [name for name in preferred if name in loaders and loaders[name]() is not None]
+
+
+def configured_encodings() -> List[str]:
+    """COMPRESSION_ENCODINGS 中已安装依赖的编码（按偏好顺序）"""
+    names = os.getenv("COMPRESSION_ENCODINGS", ",".join(DEFAULT_ENCODINGS)).split(",")
+    return available_encodings(tuple(name.strip().lower() for name in names if name.strip()))
+
+
+def negotiate(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    按 Accept-Encoding 的 q 值选择编码，q 值相同时按服务端偏好顺序
+
+    Returns:
+        编码名，没有可接受的编码时返回 None
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in supported:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compression_level(encoding: str, size: Optional[int]) -> int:
+    small, medium, large = _LEVELS[encoding]
+    if size is None:
+        return medium
+    if size < _MEDIUM_SIZE:
+        return small
+    return medium if size < _LARGE_SIZE else large
+
+
+class _Compressor:
+    """统一 gzip / br / zstd 的增量压缩接口"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+        elif encoding == "br":
+            self._obj = load_brotli().Compressor(quality=level)
+            self._compress, self._finish = self._obj.process, self._obj.finish
+        else:
+            self._obj = load_zstd().ZstdCompressor(level=level).compressobj()
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionStats:
+    """各编码的压缩次数、原始/压缩后字节数和耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encodings: Dict[str, Dict[str, float]] = {}
+        self._skipped: Dict[str, int] = {}
+
+    def _entry(self, encoding: str) -> Dict[str, float]:
+        return self._encodings.setdefault(encoding, {
+            "responses": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0, "threaded": 0
+        })
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, seconds: float, threaded: bool) -> None:
+        with self._lock:
+            entry = self._entry(encoding)
+            entry["bytes_in"] += bytes_in
+            entry["bytes_out"] += bytes_out
+            entry["seconds"] += seconds
+            entry["threaded"] += int(threaded)
+
+    def count_response(self, encoding: str) -> None:
+        with self._lock:
+            self._entry(encoding)["responses"] += 1
+
+    def skip(self, reason: str) -> None:
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            encodings = {}
+            for name, entry in self._encodings.items():
+                encodings[name] = {
+                    "responses": entry["responses"],
+                    "bytes_in": entry["bytes_in"],
+                    "bytes_out": entry["bytes_out"],
+                    "ratio": round(entry["bytes_in"] / entry["bytes_out"], 2) if entry["bytes_out"] else None,
+                    "cpu_ms": round(entry["seconds"] * 1000, 2),
+                    "mb_per_second": round(entry["bytes_in"] / entry["seconds"] / (1024 * 1024), 1)
+                    if entry["seconds"] else None,
+                    "threaded_chunks": entry["threaded"],
+                }
+            return {"encodings": encodings, "skipped": dict(self._skipped)}
+
+
+_stats = CompressionStats()
+
+
+def get_compression_stats() -> CompressionStats:
+    return _stats
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary.strip() == b"*":
+        return headers
+    return _without(headers, b"vary") + [(b"vary", vary + b", Accept-Encoding")]
+
+
+def encoded_etag(etag: bytes, encoding: str) -> bytes:
+    """同一资源的不同编码使用不同的强 ETag（"abc" -> "abc-gzip"），弱 ETag 保持不变"""
+    if etag.startswith(b'"') and etag.endswith(b'"'):
+        return etag[:-1] + b"-" + encoding.encode() + b'"'
+    return etag
+
+
+class CompressionMiddleware:
+    """ASGI 响应压缩中间件"""
+
+    def __init__(
+        self,
+        app: Callable,
+        min_size: Optional[int] = None,
+        encodings: Optional[Tuple[str, ...]] = None,
+        thread_threshold: Optional[int] = None,
+        stats: Optional[CompressionStats] = None
+    ):
+        self.app = app
+        self.enabled = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+        self.min_size = min_size if min_size is not None else int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        self.encodings = available_encodings(encodings) if encodings else configured_encodings()
+        # 超过该大小的数据块在线程池中压缩
+        self.thread_threshold = thread_threshold if thread_threshold is not None else int(
+            os.getenv("COMPRESSION_THREAD_THRESHOLD", str(256 * 1024))
+        )
+        self.stats = stats or get_compression_stats()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope.get("headers") or [], b"accept-encoding")
+        encoding = negotiate(accept.decode("latin-1"), self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = _header(scope.get("headers") or [], b"if-none-match")
+        await self.app(scope, receive, _Responder(self, encoding, send, if_none_match).send)
+
+    async def compress(self, compressor: _Compressor, data: bytes, finish: bool) -> bytes:
+        """压缩一块数据，大块数据放到线程池中执行"""
+        threaded = len(data) >= self.thread_threshold
+
+        def run() -> Tuple[bytes, float]:
+            started = time.perf_counter()
+            out = compressor.compress(data)
+            if finish:
+                out += compressor.finish()
+            return out, time.perf_counter() - started
+
+        out, seconds = await asyncio.to_thread(run) if threaded else run()
+        self.stats.record(compressor.encoding, len(data), len(out), seconds, threaded)
+        return out
+
+
+class _Responder:
+    """拦截一个响应的 start / body 消息并按需压缩"""
+
+    def __init__(
+        self, middleware: CompressionMiddleware, encoding: str, send: Callable, if_none_match: Optional[bytes] = None
+    ):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.if_none_match = if_none_match
+        self.start: Optional[Dict[str, Any]] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _skip_reason(self, message: Dict[str, Any]) -> Optional[str]:
+        headers = message.get("headers") or []
+        status = message.get("status", 200)
+        if status < 200 or status in (204, 304):
+            return "status"
+        if _header(headers, b"content-encoding") is not None:
+            return "already_encoded"
+        content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+        if content_type.startswith("text/event-stream"):
+            return "event_stream"
+        if not content_type.startswith(_COMPRESSIBLE_TYPES):
+            return "content_type"
+        if b"no-transform" in (_header(headers, b"cache-control") or b"").lower():
+            return "no_transform"
+        length = _header(headers, b"content-length")
+        if length is not None and length.isdigit() and int(length) < self.middleware.min_size:
+            return "too_small"
+        return None
+
+    def _not_modified_headers(self, headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+        """304 响应沿用客户端缓存的那个（压缩后的）ETag"""
+        etag = _header(headers, b"etag")
+        if etag is None or not self.if_none_match:
+            return headers
+        encoded = encoded_etag(etag, self.encoding)
+        if encoded != etag and encoded in self.if_none_match:
+            headers = _without(headers, b"etag") + [(b"etag", encoded)]
+        return _add_vary(headers)
+
+    def _encoded_headers(self, length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = list(self.start.get("headers") or [])
+        etag = _header(headers, b"etag")
+        headers = _without(headers, b"content-length", b"etag")
+        headers.append((b"content-encoding", self.encoding.encode()))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        if etag is not None:
+            headers.append((b"etag", encoded_etag(etag, self.encoding)))
+        return _add_vary(headers)
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            reason = self._skip_reason(message)
+            if reason is not None:
+                self.middleware.stats.skip(reason)
+                self.passthrough = True
+                if reason == "too_small":
+                    message = dict(message, headers=_add_vary(list(message.get("headers") or [])))
+                elif message.get("status") == 304:
+                    message = dict(message, headers=self._not_modified_headers(list(message.get("headers") or [])))
+                await self._send(message)
+            else:
+                # 等第一块响应体到达后再决定是否压缩
+                self.start = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        stats = self.middleware.stats
+
+        if self.compressor is None:
+            length = _header(self.start.get("headers") or [], b"content-length")
+            if not more_body:
+                # 一次性响应：体积已知，过小则原样返回
+                if len(body) < self.middleware.min_size:
+                    stats.skip("too_small")
+                    self.passthrough = True
+                    await self._send(dict(self.start, headers=_add_vary(list(self.start.get("headers") or []))))
+                    await self._send(message)
+                    return
+                self.compressor = _Compressor(self.encoding, compression_level(self.encoding, len(body)))
+                stats.count_response(self.encoding)
+                out = await self.middleware.compress(self.compressor, body, finish=True)
+                await self._send(dict(self.start, headers=self._encoded_headers(len(out))))
+                await self._send({"type": "http.response.body", "body": out, "more_body": False})
+                return
+
+            size = int(length) if length is not None and length.isdigit() else None
+            self.compressor = _Compressor(self.encoding, compression_level(self.encoding, size))
+            stats.count_response(self.encoding)
+            await self._send(dict(self.start, headers=self._encoded_headers(None)))
+
+        out = await self.middleware.compress(self.compressor, body, finish=not more_body)
+        if out or not more_body:
+            await self._send({"type": "http.response.body", "body": out, "more_body": more_body})
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Configuration
+统一加载 backend/.env（每个进程只加载一次）
+"""
+
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+ENV_PATH = Path(__file__).parent.parent.parent / ".env"
+
+_loaded = False
+
+
+def load_environment() -> None:
+    """
+    加载 .env 中的配置
+
+    已存在的进程环境变量优先，便于容器/自动扩缩容环境通过环境变量覆盖配置
+    """
+    global _loaded
+    if _loaded:
+        return
+    load_dotenv(dotenv_path=ENV_PATH)
+    _loaded = True
+    logger.debug(f"Environment loaded from {ENV_PATH}")
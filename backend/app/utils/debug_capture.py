@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Debug Capture
+按采样率保存后端原始响应，便于排查解析问题
+
+- 默认关闭（DEBUG_CAPTURE=true 开启），开启后按 DEBUG_CAPTURE_SAMPLE_RATE 采样
+- 每个请求写入独立文件，并发请求互不覆盖
+- 在线程池中写入，不阻塞事件循环
+- 单个文件超过 DEBUG_CAPTURE_MAX_BYTES 时截断，目录中最多保留 DEBUG_CAPTURE_MAX_FILES 个文件
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_TRUNCATED_MARKER = b"\n...[truncated]\n"
+
+
+class DebugCapture:
+    """单个服务的调试转储"""
+
+    def __init__(
+        self,
+        name: str,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_files: Optional[int] = None
+    ):
+        self.name = name
+        self.enabled = enabled if enabled is not None else os.getenv("DEBUG_CAPTURE", "false").lower() == "true"
+        self.sample_rate = sample_rate if sample_rate is not None else float(
+            os.getenv("DEBUG_CAPTURE_SAMPLE_RATE", "1.0")
+        )
+        self.directory = Path(directory or os.getenv("DEBUG_CAPTURE_DIR", "./debug")) / name
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("DEBUG_CAPTURE_MAX_BYTES", "5242880"))
+        self.max_files = max_files if max_files is not None else int(os.getenv("DEBUG_CAPTURE_MAX_FILES", "50"))
+        self._lock = threading.Lock()
+        self._pending: Set[asyncio.Task] = set()
+
+    def should_capture(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    def capture(self, label: str, artifacts: Dict[str, Any]) -> Optional[str]:
+        """
+        在后台保存一次请求的调试数据（未开启或未被采样时什么也不做）
+
+        Args:
+            label: 请求标识（如文件名），用于文件命名
+            artifacts: 扩展名 -> 内容，dict/list 保存为 JSON，其余按文本保存
+
+        Returns:
+            本次转储的 ID，未保存时返回 None
+        """
+        if not self.should_capture():
+            return None
+
+        capture_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        safe_label = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in Path(label).stem)[:40]
+        prefix = f"{capture_id}_{safe_label}"
+
+        task = asyncio.create_task(asyncio.to_thread(self._write, prefix, artifacts))
+        # 保留引用直到写完，避免任务被回收
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return capture_id
+
+    def _write(self, prefix: str, artifacts: Dict[str, Any]) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for extension, content in artifacts.items():
+                if isinstance(content, (dict, list)):
+                    data = json.dumps(content, ensure_ascii=False).encode("utf-8")
+                else:
+                    data = str(content).encode("utf-8")
+                if len(data) > self.max_bytes:
+                    data = data[:self.max_bytes] + _TRUNCATED_MARKER
+
+                path = self.directory / f"{prefix}.{extension}"
+                tmp_path = path.with_name(path.name + ".tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+                logger.debug(f"Debug capture saved: {path}")
+
+            self._rotate()
+        except Exception as e:
+            logger.warning(f"Failed to write debug capture {prefix}: {str(e)}")
+
+    def _rotate(self) -> None:
+        """只保留最新的 max_files 个文件"""
+        with self._lock:
+            files = []
+            for path in self.directory.iterdir():
+                if path.is_file() and not path.name.endswith(".tmp"):
+                    try:
+                        files.append((path.stat().st_mtime, path))
+                    except FileNotFoundError:
+                        continue
+            files.sort(reverse=True)
+            for _, path in files[self.max_files:]:
+                path.unlink(missing_ok=True)
@@ -5,6 +5,7 @@ Helper functions for file operations
 """
 
 import os
+import time
 import logging
 from pathlib import Path
 import shutil
@@ -43,7 +44,7 @@ def cleanup_directory(directory_path: str, max_age_hours: int = 24):
         if not directory.exists():
             return
 
-        current_time = Path.stat(directory).st_mtime
+        current_time = time.time()
 
         for file_path in directory.glob("*"):
             if file_path.is_file():
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+HTTP Cache Helpers
+基于内容哈希的强 ETag 与条件请求（If-None-Match / 304）：
+- 文件的摘要按 (路径, 大小, mtime) 缓存，重复请求不必重新读取大文件
+- 比较时忽略压缩中间件追加的编码后缀（"abc-gzip" 与 "abc" 视为同一内容）
+- 各类资源的 Cache-Control 策略可通过环境变量调整
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+_ENCODING_SUFFIXES = ("-gzip", "-br", "-zstd")
+
+# 资源类型 -> (环境变量, 默认 Cache-Control)
+CACHE_POLICIES = {
+    # 已完成任务的结果和导出文件不会再变化
+    "result": ("HTTP_CACHE_RESULT", "private, max-age=3600"),
+    # 任务状态随时变化，每次都要重新验证（未变化时返回 304）
+    "status": ("HTTP_CACHE_STATUS", "no-cache"),
+    "image": ("HTTP_CACHE_IMAGE", "public, max-age=86400"),
+}
+
+_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_digests_lock = threading.Lock()
+_MAX_DIGESTS = 4096
+
+
+def _quote(digest: str) -> str:
+    return f'"{digest[:32]}"'
+
+
+def etag_for_bytes(data: bytes) -> str:
+    return _quote(hashlib.sha256(data).hexdigest())
+
+
+def etag_for_json(value: Any) -> str:
+    """JSON 可序列化对象的 ETag（键排序后哈希，与字典顺序无关）"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return etag_for_bytes(payload.encode("utf-8"))
+
+
+def file_etag(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    文件内容的 ETag（分块计算 SHA-256，按路径 / 大小 / mtime 缓存）
+
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    stat = os.stat(path)
+    key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is not None:
+            _digests.move_to_end(key)
+            return _quote(digest)
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _digests_lock:
+        _digests[key] = digest
+        while len(_digests) > _MAX_DIGESTS:
+            _digests.popitem(last=False)
+    return _quote(digest)
+
+
+def derived_etag(base: str, *parts: Any) -> str:
+    """同一内容的不同视图（如分页、表格编码）使用派生的 ETag"""
+    if not any(part is not None for part in parts):
+        return base
+    return etag_for_bytes("\x00".join([base] + [str(part) for part in parts]).encode("utf-8"))
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in _ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，"*" 命中任何已存在的资源）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _opaque(etag)
+    return any(_opaque(tag) == target for tag in if_none_match.split(",") if tag.strip())
+
+
+def cache_headers(etag: str, kind: str) -> Dict[str, str]:
+    env_name, default = CACHE_POLICIES[kind]
+    return {"ETag": etag, "Cache-Control": os.getenv(env_name, default)}
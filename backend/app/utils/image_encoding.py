@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Image Encoding
+MinerU 提取的图片以及 DeepSeek / PaddleOCR 透传的图片共用的编码环节：
+- 输出格式（PNG / JPEG / WebP）、质量、最大边长
+- 可选缩略图（前端列表展示用），与原图一起返回
+- 统计每张图片的编码 CPU 时间和输出字节数
+"""
+
+import base64
+import binascii
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Any, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 格式 -> (PIL 格式名, MIME 类型)
+IMAGE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+_pil_image = None
+
+
+def _load_pil():
+    """按需导入 PIL.Image，不可用时返回 None"""
+    global _pil_image
+    if _pil_image is None:
+        try:
+            from PIL import Image
+            _pil_image = Image
+        except ImportError:
+            _pil_image = False
+            logger.warning("PIL not available - pass-through images will not be re-encoded")
+    return _pil_image or None
+
+
+@dataclass
+class EncodedImage:
+    """一张编码后的图片"""
+    data_uri: str
+    thumbnail_uri: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    bytes: int = 0
+    cpu_seconds: float = 0.0
+
+    def as_value(self) -> Union[str, Dict[str, str]]:
+        """
+        images 映射中使用的值：没有缩略图时为 data URI 字符串（与后端原始格式一致），
+        否则为 {"base64": ..., "thumbnail": ...}
+        """
+        if self.thumbnail_uri is None:
+            return self.data_uri
+        return {"base64": self.data_uri, "thumbnail": self.thumbnail_uri}
+
+
+class EncodingSummary:
+    """单次请求的编码统计"""
+
+    def __init__(self):
+        self.images = 0
+        self.bytes = 0
+        self.cpu_seconds = 0.0
+
+    def add(self, encoded: EncodedImage) -> EncodedImage:
+        self.images += 1
+        self.bytes += encoded.bytes
+        self.cpu_seconds += encoded.cpu_seconds
+        return encoded
+
+    @classmethod
+    def merge(cls, summaries: Iterable[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """合并多个 to_dict() 结果（按页窗口拆分处理时使用）"""
+        merged = cls()
+        for summary in summaries:
+            if not summary:
+                continue
+            merged.images += summary.get("images", 0)
+            merged.bytes += summary.get("bytes", 0)
+            merged.cpu_seconds += summary.get("cpu_ms", 0.0) / 1000
+        return merged.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "images": self.images,
+            "bytes": self.bytes,
+            "cpu_ms": round(self.cpu_seconds * 1000, 1),
+            "avg_bytes": self.bytes // self.images if self.images else 0,
+            "avg_cpu_ms": round(self.cpu_seconds * 1000 / self.images, 2) if self.images else 0.0,
+        }
+
+
+class ImageEncoder:
+    """可配置的图片编码器（线程安全，可在 asyncio.to_thread 中使用）"""
+
+    def __init__(
+        self,
+        image_format: Optional[str] = None,
+        quality: Optional[int] = None,
+        max_dimension: Optional[int] = None,
+        thumbnail_size: Optional[int] = None,
+        reencode_passthrough: Optional[bool] = None
+    ):
+        self.format = (image_format or os.getenv("IMAGE_FORMAT", "png")).lower()
+        if self.format == "jpg":
+            self.format = "jpeg"
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported IMAGE_FORMAT '{self.format}'. Supported: {', '.join(IMAGE_FORMATS)}")
+        self.quality = quality if quality is not None else int(os.getenv("IMAGE_QUALITY", "85"))
+        self.png_compress_level = int(os.getenv("IMAGE_PNG_COMPRESS_LEVEL", "6"))
+        self.max_dimension = max_dimension if max_dimension is not None else int(os.getenv("IMAGE_MAX_DIMENSION", "0"))
+        self.thumbnail_size = thumbnail_size if thumbnail_size is not None else int(
+            os.getenv("IMAGE_THUMBNAIL_SIZE", "0")
+        )
+        self.reencode_passthrough = reencode_passthrough if reencode_passthrough is not None else (
+            os.getenv("IMAGE_REENCODE_PASSTHROUGH", "false").lower() == "true"
+        )
+        self._lock = threading.Lock()
+        self._totals = {"encoded": EncodingSummary(), "passthrough": EncodingSummary()}
+
+    def _save(self, image, image_format: str) -> bytes:
+        pil_format, _ = IMAGE_FORMATS[image_format]
+        if image_format == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image_format == "webp" and image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        buffered = BytesIO()
+        if image_format == "png":
+            image.save(buffered, format=pil_format, compress_level=self.png_compress_level)
+        else:
+            image.save(buffered, format=pil_format, quality=self.quality)
+        return buffered.getvalue()
+
+    @staticmethod
+    def _data_uri(mime: str, data: bytes) -> str:
+        return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+    def encode(self, image) -> EncodedImage:
+        """
+        编码 PIL 图片
+
+        Args:
+            image: PIL.Image
+
+        Returns:
+            EncodedImage
+        """
+        started = time.thread_time()
+
+        if self.max_dimension and max(image.size) > self.max_dimension:
+            image = image.copy()
+            image.thumbnail((self.max_dimension, self.max_dimension))
+
+        _, mime = IMAGE_FORMATS[self.format]
+        data = self._save(image, self.format)
+        encoded = EncodedImage(
+            data_uri=self._data_uri(mime, data),
+            width=image.size[0],
+            height=image.size[1],
+            bytes=len(data)
+        )
+
+        if self.thumbnail_size and max(image.size) > self.thumbnail_size:
+            thumbnail = image.copy()
+            thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size))
+            thumb_data = self._save(thumbnail, self.format)
+            encoded.thumbnail_uri = self._data_uri(mime, thumb_data)
+            encoded.bytes += len(thumb_data)
+
+        encoded.cpu_seconds = time.thread_time() - started
+        self._record("encoded", encoded)
+        return encoded
+
+    def encode_base64(self, image_base64: str, default_mime: str = "image/png") -> EncodedImage:
+        """
+        处理后端返回的 base64 图片（可带 data URI 前缀）
+
+        默认原样透传；IMAGE_REENCODE_PASSTHROUGH=true 时按当前配置重新编码
+        """
+        mime = default_mime
+        payload = image_base64
+        if image_base64.startswith("data:") and "," in image_base64:
+            header, payload = image_base64.split(",", 1)
+            mime = header[5:].split(";", 1)[0] or default_mime
+
+        Image = _load_pil() if self.reencode_passthrough else None
+        if Image is not None:
+            try:
+                with Image.open(BytesIO(base64.b64decode(payload))) as image:
+                    image.load()
+                    return self.encode(image)
+            except (binascii.Error, OSError, ValueError) as e:
+                logger.warning(f"Failed to re-encode image, passing through: {str(e)}")
+
+        encoded = EncodedImage(data_uri=f"data:{mime};base64,{payload}", bytes=len(payload) * 3 // 4)
+        self._record("passthrough", encoded)
+        return encoded
+
+    def _record(self, kind: str, encoded: EncodedImage) -> None:
+        with self._lock:
+            self._totals[kind].add(encoded)
+
+    def stats(self) -> Dict[str, Any]:
+        """累计编码统计"""
+        with self._lock:
+            return {
+                "format": self.format,
+                "quality": self.quality,
+                "max_dimension": self.max_dimension,
+                "thumbnail_size": self.thumbnail_size,
+                "reencode_passthrough": self.reencode_passthrough,
+                **{kind: summary.to_dict() for kind, summary in self._totals.items()}
+            }
+
+
+_encoder: Optional[ImageEncoder] = None
+_encoder_lock = threading.Lock()
+
+
+def get_image_encoder() -> ImageEncoder:
+    """进程内共享的编码器（统计在各服务间累计）"""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = ImageEncoder()
+    return _encoder
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Image Preprocessing
+图片输入发送给 OCR 后端之前的预处理：
+- 只解码一次，按 EXIF 方向信息旋转
+- 缩小到模型实际使用的分辨率（超出部分只会增加上传字节和后端解码时间）
+- 无需处理的图片原样发送，不做有损重编码
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+
+_MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+}
+
+_pil = None
+
+
+def _load_pil():
+    """按需导入 PIL.Image / ImageOps，不可用时返回 None"""
+    global _pil
+    if _pil is None:
+        try:
+            from PIL import Image, ImageOps
+            _pil = (Image, ImageOps)
+        except ImportError:
+            _pil = False
+            logger.warning("PIL not available - image inputs will be sent without preprocessing")
+    return _pil or None
+
+
+def is_image_file(file_path: Path) -> bool:
+    return Path(file_path).suffix.lower() in IMAGE_SUFFIXES
+
+
+@dataclass
+class PreparedImage:
+    """预处理后准备发送的图片"""
+    content: bytes
+    filename: str
+    mime: str
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+def _target_size(size: Tuple[int, int], max_dimension: int) -> Tuple[int, int]:
+    width, height = size
+    longest = max(width, height)
+    if not max_dimension or longest <= max_dimension:
+        return size
+    ratio = max_dimension / longest
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def prepare_image(file_path: Path, max_dimension: int, content: Optional[bytes] = None) -> PreparedImage:
+    """
+    读取并预处理图片文件（同步函数，在 asyncio.to_thread 中调用）
+
+    Args:
+        file_path: 图片路径
+        max_dimension: 最长边上限（像素，0 表示不缩小）
+        content: 已读取的文件内容（可选）
+
+    Returns:
+        PreparedImage；无需处理或 PIL 不可用时 content 为原始字节
+    """
+    file_path = Path(file_path)
+    if content is None:
+        content = file_path.read_bytes()
+    suffix = file_path.suffix.lower()
+    original = PreparedImage(
+        content=content,
+        filename=file_path.name,
+        mime=_MIME_TYPES.get(suffix, "application/octet-stream"),
+        stats={"original_bytes": len(content), "sent_bytes": len(content), "preprocessed": False}
+    )
+
+    libs = _load_pil()
+    if libs is None or suffix not in IMAGE_SUFFIXES:
+        return original
+    Image, ImageOps = libs
+
+    started = time.perf_counter()
+    try:
+        with Image.open(BytesIO(content)) as image:
+            original_size = image.size
+            orientation = image.getexif().get(0x0112, 1)  # EXIF Orientation
+            target_size = _target_size(original_size, max_dimension)
+            original.stats["original_size"] = list(original_size)
+
+            if orientation in (None, 1) and target_size == original_size:
+                return original
+
+            image = ImageOps.exif_transpose(image)
+            target_size = _target_size(image.size, max_dimension)
+            if target_size != image.size:
+                if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+                image = image.resize(target_size, Image.LANCZOS)
+
+            # 有透明通道保留 PNG，其余（照片）统一 JPEG
+            buffered = BytesIO()
+            if "A" in image.getbands():
+                image.save(buffered, format="PNG", optimize=False)
+                new_suffix, mime = ".png", "image/png"
+            else:
+                image.convert("RGB").save(
+                    buffered, format="JPEG", quality=int(os.getenv("IMAGE_INPUT_QUALITY", "90"))
+                )
+                new_suffix, mime = ".jpg", "image/jpeg"
+            sent_size = image.size
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️  图片预处理失败，原样发送: {file_path.name} ({str(e)})")
+        return original
+
+    prepared = PreparedImage(
+        content=buffered.getvalue(),
+        filename=f"{file_path.stem}{new_suffix}",
+        mime=mime,
+        stats={
+            "original_bytes": len(content),
+            "sent_bytes": buffered.tell(),
+            "original_size": list(original_size),
+            "sent_size": list(sent_size),
+            "orientation_fixed": orientation not in (None, 1),
+            "preprocessed": True,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
+    logger.info(
+        f"🖼️  预处理图片 {file_path.name}: {original_size[0]}x{original_size[1]} -> "
+        f"{sent_size[0]}x{sent_size[1]}, {len(content)} -> {prepared.stats['sent_bytes']} bytes"
+    )
+    return prepared
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+JSON Streaming Utilities
+增量解析大型后端响应：
+- 可选依赖 ijson 可用时边读边构建对象，并跳过不需要的字段（不会在结果中保留）
+- 内嵌的 JSON 字符串字段（如 MinerU 的 middle_json）在首次访问时才解码
+- 按前缀逐个读取大文件中的数组元素（如结果中的图片、表格），不必整份加载
+"""
+
+import json
+import logging
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_ijson = None
+
+
+def load_ijson():
+    """按需导入 ijson，不可用时返回 None（回退到标准库 json）"""
+    global _ijson
+    if _ijson is None:
+        try:
+            import ijson
+            _ijson = ijson
+        except ImportError:
+            _ijson = False
+            logger.info("ijson not available - falling back to json.load for backend responses")
+    return _ijson or None
+
+
+def safe_json_loads(text: Any) -> Any:
+    """解码 JSON 字符串，非字符串原样返回，解码失败返回 None"""
+    if not isinstance(text, str):
+        return text
+    try:
+        return json.loads(text.strip())
+    except ValueError:
+        return None
+
+
+def _drop_keys(value: Any, skip_keys: frozenset) -> None:
+    if isinstance(value, dict):
+        for key in skip_keys & value.keys():
+            del value[key]
+        for child in value.values():
+            _drop_keys(child, skip_keys)
+    elif isinstance(value, list):
+        for child in value:
+            _drop_keys(child, skip_keys)
+
+
+def load_json(fp: BinaryIO, skip_keys: Iterable[str] = ()) -> Any:
+    """
+    从文件对象解析 JSON，任意层级中名为 skip_keys 的字段会被丢弃
+
+    Args:
+        fp: 以二进制方式打开的文件对象
+        skip_keys: 需要丢弃的字段名
+
+    Returns:
+        解析后的对象
+    """
+    skip_keys = frozenset(skip_keys)
+    ijson = load_ijson()
+    if ijson is None:
+        data = json.load(fp)
+        _drop_keys(data, skip_keys)
+        return data
+
+    builder = ijson.ObjectBuilder()
+    skip_next = False
+    depth = 0  # 正在跳过的值的嵌套深度
+    for _, event, value in ijson.parse(fp, use_float=True):
+        if skip_next:
+            skip_next = False
+            if event in ("start_map", "start_array"):
+                depth = 1
+            continue
+        if depth:
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+            continue
+        if event == "map_key" and value in skip_keys:
+            skip_next = True
+            continue
+        builder.event(event, value)
+    return builder.value
+
+
+def _walk(value: Any, parts: List[str]) -> Iterator[Any]:
+    if not parts:
+        yield value
+    elif parts[0] == "item":
+        if isinstance(value, list):
+            for child in value:
+                yield from _walk(child, parts[1:])
+    elif isinstance(value, dict) and parts[0] in value:
+        yield from _walk(value[parts[0]], parts[1:])
+
+
+def iter_items(source: Union[Path, Any], prefix: str) -> Iterator[Any]:
+    """
+    逐个产出 JSON 中 prefix 处的值（ijson 前缀语法，如 "results.tables.item"）
+
+    Args:
+        source: JSON 文件路径（用 ijson 流式读取，内存中只保留当前的值），
+            或已解析的对象（ijson 不可用时由调用方整份加载一次后传入）
+        prefix: 以 . 分隔的字段路径，item 表示数组中的每个元素
+    """
+    if not isinstance(source, Path):
+        yield from _walk(source, prefix.split("."))
+        return
+
+    ijson = load_ijson()
+    if ijson is None:
+        with open(source, "rb") as fp:
+            yield from _walk(json.load(fp), prefix.split("."))
+        return
+    with open(source, "rb") as fp:
+        yield from ijson.items(fp, prefix, use_float=True)
+
+
+class LazyJSONFields(Mapping):
+    """
+    只读字段映射：lazy_keys 中的字段如果是 JSON 字符串，首次访问时才解码，
+    解码后释放原始字符串
+    """
+
+    def __init__(self, fields: Dict[str, Any], lazy_keys: Iterable[str] = ()):
+        lazy_keys = set(lazy_keys)
+        self._values: Dict[str, Any] = {}
+        self._encoded: Dict[str, str] = {}
+        for key, value in fields.items():
+            if key in lazy_keys and isinstance(value, str):
+                self._encoded[key] = value
+            else:
+                self._values[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._encoded:
+            self._values[key] = safe_json_loads(self._encoded.pop(key))
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._values
+        yield from list(self._encoded)
+
+    def __len__(self) -> int:
+        return len(self._values) + len(self._encoded)
+
+    def get_encoded(self, key: str, default: Any = None) -> Any:
+        """取字段的原始值（未解码时为 JSON 字符串），不触发解码"""
+        if key in self._encoded:
+            return self._encoded[key]
+        return self._values.get(key, default)
+
+    def is_decoded(self, key: str) -> Optional[bool]:
+        """字段是否已解码，字段不存在时返回 None"""
+        if key in self._encoded:
+            return False
+        return True if key in self._values else None
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Page Render Cache
+按页渲染 PDF 页面供图片裁剪使用：
+- 渲染尺寸受像素预算限制（超大页面自动降低缩放比例）
+- 缓存页数有上限，按页序处理时每页在最后一次裁剪后立即释放
+- 统计本阶段渲染图片占用内存的峰值
+"""
+
+import logging
+import math
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PageRenderCache:
+    """有界的页面渲染缓存（非线程安全，每次提取使用独立实例）"""
+
+    def __init__(
+        self,
+        doc,
+        scale: Optional[float] = None,
+        max_pixels: Optional[int] = None,
+        max_pages: Optional[int] = None
+    ):
+        """
+        Args:
+            doc: pypdfium2.PdfDocument（支持 len() 与 get_page()）
+            scale: 期望的渲染缩放比例
+            max_pixels: 单页渲染像素上限（0 表示不限制）
+            max_pages: 同时缓存的最大页数
+        """
+        self.doc = doc
+        self.scale = scale if scale is not None else float(os.getenv("MINERU_RENDER_SCALE", "2.0"))
+        self.max_pixels = max_pixels if max_pixels is not None else int(
+            os.getenv("MINERU_RENDER_MAX_PIXELS", "16000000")
+        )
+        self.max_pages = max(1, max_pages if max_pages is not None else int(
+            os.getenv("MINERU_RENDER_CACHE_PAGES", "2")
+        ))
+        self._pages: "OrderedDict[int, Any]" = OrderedDict()
+        self._resident_bytes = 0
+        self.peak_bytes = 0
+        self.pages_rendered = 0
+        self.pages_downscaled = 0
+        self.evictions = 0
+
+    @staticmethod
+    def image_bytes(image) -> int:
+        """PIL 图片像素数据占用的字节数"""
+        width, height = image.size
+        return width * height * len(image.getbands())
+
+    def scale_for(self, width_pt: float, height_pt: float) -> float:
+        """在像素预算内的缩放比例"""
+        if not self.max_pixels or width_pt <= 0 or height_pt <= 0:
+            return self.scale
+        budget_scale = math.sqrt(self.max_pixels / (width_pt * height_pt))
+        return min(self.scale, budget_scale)
+
+    def get(self, page_idx: int):
+        """获取页面渲染图（未缓存时渲染，超出页数上限时淘汰最早的页）"""
+        if page_idx in self._pages:
+            self._pages.move_to_end(page_idx)
+            return self._pages[page_idx]
+
+        page = self.doc.get_page(page_idx)
+        try:
+            width_pt, height_pt = page.get_size()
+            scale = self.scale_for(width_pt, height_pt)
+            if scale < self.scale:
+                self.pages_downscaled += 1
+                logger.info(f"📐 页面 {page_idx} 超出像素预算，渲染缩放 {self.scale} -> {scale:.2f}")
+            image = page.render(scale=scale).to_pil()
+        finally:
+            page.close()
+
+        while len(self._pages) >= self.max_pages:
+            self._evict(next(iter(self._pages)))
+            self.evictions += 1
+
+        self._pages[page_idx] = image
+        self._resident_bytes += self.image_bytes(image)
+        self.peak_bytes = max(self.peak_bytes, self._resident_bytes)
+        self.pages_rendered += 1
+        return image
+
+    def release(self, page_idx: int) -> None:
+        """页面的最后一次裁剪完成后释放渲染图"""
+        if page_idx in self._pages:
+            self._evict(page_idx)
+
+    def _evict(self, page_idx: int) -> None:
+        image = self._pages.pop(page_idx)
+        self._resident_bytes -= self.image_bytes(image)
+        image.close()
+
+    def close(self) -> None:
+        for page_idx in list(self._pages):
+            self._evict(page_idx)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pages_rendered": self.pages_rendered,
+            "pages_downscaled": self.pages_downscaled,
+            "evictions": self.evictions,
+            "max_pages": self.max_pages,
+            "max_pixels": self.max_pixels,
+            "peak_bytes": self.peak_bytes,
+        }
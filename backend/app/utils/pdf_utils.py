@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PDF Utilities
+页数统计与按页窗口拆分 PDF
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_pdfium = None
+
+
+def load_pdfium():
+    """按需导入 pypdfium2，不可用时返回 None"""
+    global _pdfium
+    if _pdfium is None:
+        try:
+            import pypdfium2
+            _pdfium = pypdfium2
+        except ImportError:
+            _pdfium = False
+            logger.warning("pypdfium2 not available - page counting and splitting will be disabled")
+    return _pdfium or None
+
+
+def is_pdf(file_path: Path) -> bool:
+    return Path(file_path).suffix.lower() == ".pdf"
+
+
+def count_pages(file_path: Path) -> Optional[int]:
+    """返回 PDF 页数，图片返回 1，无法统计时返回 None"""
+    if not is_pdf(file_path):
+        return 1
+    pdfium = load_pdfium()
+    if pdfium is None:
+        return None
+    try:
+        doc = pdfium.PdfDocument(str(file_path))
+        try:
+            return len(doc)
+        finally:
+            doc.close()
+    except Exception as e:
+        logger.warning(f"Failed to count pages of {file_path}: {str(e)}")
+        return None
+
+
+def page_windows(total_pages: int, window: int) -> List[Tuple[int, int]]:
+    """将 [0, total_pages) 划分为大小为 window 的半开区间"""
+    if window <= 0 or total_pages <= 0:
+        return [(0, total_pages)]
+    return [(start, min(start + window, total_pages)) for start in range(0, total_pages, window)]
+
+
+def page_runs(labels: List[Any]) -> List[Tuple[int, int, Any]]:
+    """将逐页标签合并为连续区间 (start, end, label)，end 为开区间"""
+    runs: List[Tuple[int, int, Any]] = []
+    for page_idx, label in enumerate(labels):
+        if runs and runs[-1][2] == label:
+            runs[-1] = (runs[-1][0], page_idx + 1, label)
+        else:
+            runs.append((page_idx, page_idx + 1, label))
+    return runs
+
+
+def split_pdf(file_path: Path, windows: List[Tuple[int, int]], output_dir: Path) -> List[Path]:
+    """
+    按页窗口拆分 PDF
+
+    Args:
+        file_path: 源 PDF
+        windows: (start, end) 半开区间列表
+        output_dir: 输出目录
+
+    Returns:
+        每个窗口对应的 PDF 文件路径
+    """
+    pdfium = load_pdfium()
+    if pdfium is None:
+        raise RuntimeError("pypdfium2 is required to split PDF files")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    file_path = Path(file_path)
+    src = pdfium.PdfDocument(str(file_path))
+    outputs = []
+    try:
+        for start, end in windows:
+            dest = pdfium.PdfDocument.new()
+            try:
+                dest.import_pages(src, list(range(start, end)))
+                out_path = output_dir / f"{file_path.stem}_p{start + 1}-{end}.pdf"
+                dest.save(str(out_path))
+                outputs.append(out_path)
+            finally:
+                dest.close()
+    finally:
+        src.close()
+
+    return outputs
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Table Codec
+表格的紧凑列式编码（TableResult.compact）：
+- 按列存储，字符串列存放共享字符串表中的下标，重复的单元格值只保存一次
+- 整列都是可无损还原的整数 / 小数时存为数值列
+- 行长度不一致时记录每行长度，解码结果与原始 rows 完全一致
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+TABLE_ENCODING_ROWS = "rows"
+TABLE_ENCODING_COLUMNAR = "columnar"
+TABLE_ENCODINGS = (TABLE_ENCODING_ROWS, TABLE_ENCODING_COLUMNAR)
+
+# 超过 15 位的整数在 JavaScript 中会丢失精度，仍按字符串保存
+_INT = re.compile(r"0|-?[1-9]\d{0,14}")
+_FLOAT = re.compile(r"-?(?:0|[1-9]\d{0,14})\.\d{1,15}")
+
+
+def resolve_table_encoding(value: Optional[str]) -> str:
+    """
+    Raises:
+        ValueError: 未知的表格编码
+    """
+    encoding = (value or TABLE_ENCODING_ROWS).strip().lower()
+    if encoding not in TABLE_ENCODINGS:
+        raise ValueError(f"Unknown table encoding '{value}'. Supported: {', '.join(TABLE_ENCODINGS)}")
+    return encoding
+
+
+def _numeric_type(cells: Iterable[str]) -> Optional[str]:
+    """整列（空单元格除外）都能无损转换时返回 int / float"""
+    column_type = None
+    for cell in cells:
+        if cell == "":
+            continue
+        if _INT.fullmatch(cell):
+            column_type = column_type or "int"
+        elif _FLOAT.fullmatch(cell) and repr(float(cell)) == cell:
+            column_type = "float"
+        else:
+            return None
+    return column_type
+
+
+def encode_table(rows: List[List[Any]]) -> Dict[str, Any]:
+    """
+    rows -> 紧凑列式编码
+
+    Returns:
+        {"strings": [...], "columns": [{"type": "string"|"int"|"float", "values": [...]}],
+         "rowCount": n, "rowLengths": [...]（仅行长度不一致时）}
+    """
+    rows = [["" if cell is None else str(cell) for cell in row] for row in rows]
+    width = max((len(row) for row in rows), default=0)
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+    columns = []
+    for col in range(width):
+        cells = [row[col] if col < len(row) else "" for row in rows]
+        column_type = _numeric_type(cells)
+        if column_type == "int":
+            values = [int(cell) if cell else None for cell in cells]
+        elif column_type == "float":
+            values = [float(cell) if cell else None for cell in cells]
+        else:
+            column_type = "string"
+            values = []
+            for cell in cells:
+                index = string_ids.get(cell)
+                if index is None:
+                    index = string_ids[cell] = len(strings)
+                    strings.append(cell)
+                values.append(index)
+        columns.append({"type": column_type, "values": values})
+
+    compact: Dict[str, Any] = {"strings": strings, "columns": columns, "rowCount": len(rows)}
+    lengths = [len(row) for row in rows]
+    if any(length != width for length in lengths):
+        compact["rowLengths"] = lengths
+    return compact
+
+
+def decode_table(compact: Dict[str, Any]) -> List[List[str]]:
+    """紧凑列式编码 -> rows"""
+    strings = compact.get("strings") or []
+    columns = []
+    for column in compact.get("columns") or []:
+        values = column.get("values") or []
+        if column.get("type") == "string":
+            columns.append([strings[index] for index in values])
+        else:
+            columns.append(["" if value is None else str(value) for value in values])
+
+    rows = [list(row) for row in zip(*columns)] if columns else [[] for _ in range(compact.get("rowCount", 0))]
+    lengths = compact.get("rowLengths")
+    if lengths:
+        rows = [row[:length] for row, length in zip(rows, lengths)]
+    return rows
+
+
+def table_rows(table: Dict[str, Any]) -> List[List[str]]:
+    """表格字典的数据行（兼容 rows 和 compact 两种编码）"""
+    compact = table.get("compact")
+    if compact:
+        return decode_table(compact)
+    return table.get("rows") or []
+
+
+def apply_table_encoding(result: Dict[str, Any], encoding: str) -> Dict[str, Any]:
+    """把 OCRResponse 字典中的表格就地转换为指定编码"""
+    for table in (result.get("results") or {}).get("tables") or []:
+        if encoding == TABLE_ENCODING_COLUMNAR and not table.get("compact"):
+            table["compact"] = encode_table(table.get("rows") or [])
+            table["rows"] = []
+        elif encoding == TABLE_ENCODING_ROWS and table.get("compact"):
+            table["rows"] = decode_table(table["compact"])
+            table["compact"] = None
+    return result
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+PDF Text Layer
+读取数字原生 PDF 自带的文本层，在网关本地（CPU）完成文本与版面提取：
+- 逐页统计廉价信号：字符数、有效字符比例、图片数量与覆盖率、矢量路径数
+- 文本层可用的页面直接生成 MinerU 格式的结果（content_list / middle_json）
+- 扫描件、含图片或表格（矢量线条密集）的页面仍交给 GPU 后端
+"""
+
+import logging
+import os
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.pdf_utils import load_pdfium
+
+logger = logging.getLogger(__name__)
+
+# 页面对象类型（与 pypdfium2.raw 中的 FPDF_PAGEOBJ_* 一致）
+_PAGEOBJ_PATH = 2
+_PAGEOBJ_IMAGE = 3
+
+Line = Tuple[List[float], str]  # (bbox [x0, y0, x1, y1]，左上角为原点), text
+
+
+@dataclass
+class PageTextLayer:
+    """单页文本层与版面信号"""
+    page_idx: int
+    width: float
+    height: float
+    chars: int = 0
+    valid_ratio: float = 0.0
+    image_coverage: float = 0.0
+    image_count: int = 0
+    path_count: int = 0
+    math_ratio: float = 0.0
+    lines: List[Line] = field(default_factory=list)
+
+    @property
+    def text_density(self) -> float:
+        """每千平方点的字符数"""
+        area = self.width * self.height
+        return self.chars * 1000 / area if area else 0.0
+
+    def signals(self) -> Dict[str, Any]:
+        return {
+            "chars": self.chars,
+            "valid_ratio": round(self.valid_ratio, 3),
+            "image_coverage": round(self.image_coverage, 3),
+            "image_count": self.image_count,
+            "path_count": self.path_count,
+            "math_ratio": round(self.math_ratio, 3),
+            "text_density": round(self.text_density, 2),
+        }
+
+
+class TextLayerPolicy:
+    """
+    判断页面文本层是否可直接使用
+
+    文本层只有文字和位置：表格的单元格结构（矢量线条）和图片内容都会丢失，
+    这类页面即使文字可读也要交给后端
+    """
+
+    def __init__(
+        self,
+        min_chars: Optional[int] = None,
+        min_valid_ratio: Optional[float] = None,
+        max_image_coverage: Optional[float] = None,
+        table_min_paths: Optional[int] = None
+    ):
+        self.min_chars = min_chars if min_chars is not None else int(os.getenv("TEXT_LAYER_MIN_CHARS", "100"))
+        self.min_valid_ratio = min_valid_ratio if min_valid_ratio is not None else float(
+            os.getenv("TEXT_LAYER_MIN_VALID_RATIO", "0.9")
+        )
+        self.max_image_coverage = max_image_coverage if max_image_coverage is not None else float(
+            os.getenv("TEXT_LAYER_MAX_IMAGE_COVERAGE", "0.3")
+        )
+        # 与 PageRouter 的表格页规则共用同一阈值
+        self.table_min_paths = table_min_paths if table_min_paths is not None else int(
+            os.getenv("ROUTER_TABLE_MIN_PATHS", "40")
+        )
+
+    def has_text(self, page: PageTextLayer) -> bool:
+        """文本层本身是否可读（不考虑表格和图片）"""
+        # 扫描件即使带有 OCR 隐藏文本层，整页图片也会占据大部分面积
+        return (
+            page.chars >= self.min_chars
+            and page.valid_ratio >= self.min_valid_ratio
+            and page.image_coverage <= self.max_image_coverage
+        )
+
+    def is_table(self, page: PageTextLayer) -> bool:
+        """矢量路径（表格线）密集的页面"""
+        return page.path_count >= self.table_min_paths
+
+    def is_usable(self, page: PageTextLayer) -> bool:
+        return self.has_text(page) and not self.is_table(page) and page.image_count == 0
+
+
+def _valid_ratio(text: str) -> float:
+    """可见字符中非乱码（替换字符、私有区、控制字符）的比例"""
+    visible = [ch for ch in text if not ch.isspace()]
+    if not visible:
+        return 0.0
+    invalid = sum(
+        1 for ch in visible
+        if ch == "\ufffd" or unicodedata.category(ch) in ("Co", "Cc", "Cs", "Cn")
+    )
+    return 1 - invalid / len(visible)
+
+
+def _math_ratio(text: str) -> float:
+    """可见字符中数学符号（Unicode Sm 类及希腊字母）的比例，公式密集的页面较高"""
+    visible = [ch for ch in text if not ch.isspace()]
+    if not visible:
+        return 0.0
+    math = sum(1 for ch in visible if unicodedata.category(ch) == "Sm" or "\u0370" <= ch <= "\u03ff")
+    return math / len(visible)
+
+
+def _is_cjk(ch: str) -> bool:
+    return "\u2e80" <= ch <= "\u9fff" or "\uf900" <= ch <= "\ufaff" or "\uff00" <= ch <= "\uffef"
+
+
+def join_text(parts: List[str]) -> str:
+    """拼接行或文本段：中日韩文字之间不插入空格"""
+    result = ""
+    for part in parts:
+        if result and not (_is_cjk(result[-1]) and _is_cjk(part[0])):
+            result += " "
+        result += part
+    return result
+
+
+def _group_lines(segments: List[Line]) -> List[Line]:
+    """把文本段按纵向重叠合并为行，行内按 x 排序"""
+    lines: List[Tuple[List[float], List[Tuple[float, str]]]] = []
+    for bbox, text in sorted(segments, key=lambda seg: (seg[0][1], seg[0][0])):
+        for line_bbox, parts in lines:
+            overlap = min(line_bbox[3], bbox[3]) - max(line_bbox[1], bbox[1])
+            if overlap > 0.5 * min(line_bbox[3] - line_bbox[1], bbox[3] - bbox[1]):
+                line_bbox[0] = min(line_bbox[0], bbox[0])
+                line_bbox[1] = min(line_bbox[1], bbox[1])
+                line_bbox[2] = max(line_bbox[2], bbox[2])
+                line_bbox[3] = max(line_bbox[3], bbox[3])
+                parts.append((bbox[0], text))
+                break
+        else:
+            lines.append((list(bbox), [(bbox[0], text)]))
+
+    return [
+        (line_bbox, join_text([text for _, text in sorted(parts)]))
+        for line_bbox, parts in sorted(lines, key=lambda line: (line[0][1], line[0][0]))
+    ]
+
+
+def group_paragraphs(lines: List[Line]) -> List[Line]:
+    """行间距明显大于行高时分段"""
+    paragraphs: List[Line] = []
+    current_bbox, current_text, last = None, [], None
+    for bbox, text in lines:
+        height = bbox[3] - bbox[1]
+        if last is not None and bbox[1] - last[3] > 0.8 * max(height, last[3] - last[1]):
+            paragraphs.append((current_bbox, join_text(current_text)))
+            current_bbox, current_text = None, []
+        if current_bbox is None:
+            current_bbox = list(bbox)
+        else:
+            current_bbox = [
+                min(current_bbox[0], bbox[0]), min(current_bbox[1], bbox[1]),
+                max(current_bbox[2], bbox[2]), max(current_bbox[3], bbox[3])
+            ]
+        current_text.append(text)
+        last = bbox
+    if current_bbox is not None:
+        paragraphs.append((current_bbox, join_text(current_text)))
+    return paragraphs
+
+
+def _read_page(doc, page_idx: int, with_lines: bool) -> PageTextLayer:
+    page = doc.get_page(page_idx)
+    try:
+        width, height = page.get_size()
+        info = PageTextLayer(page_idx=page_idx, width=width, height=height)
+
+        textpage = page.get_textpage()
+        try:
+            info.chars = textpage.count_chars()
+            if info.chars:
+                text = textpage.get_text_bounded()
+                info.valid_ratio = _valid_ratio(text)
+                info.math_ratio = _math_ratio(text)
+            if with_lines and info.chars:
+                segments = []
+                for index in range(textpage.count_rects()):
+                    left, bottom, right, top = textpage.get_rect(index)
+                    text = textpage.get_text_bounded(left, bottom, right, top).strip()
+                    if text:
+                        segments.append(([left, height - top, right, height - bottom], text))
+                info.lines = _group_lines(segments)
+        finally:
+            textpage.close()
+
+        image_area = 0.0
+        for obj in page.get_objects(filter=(_PAGEOBJ_IMAGE, _PAGEOBJ_PATH)):
+            if obj.type == _PAGEOBJ_PATH:
+                info.path_count += 1
+                continue
+            left, bottom, right, top = obj.get_pos()
+            # 裁剪到页面范围内
+            left, right = max(0.0, left), min(width, right)
+            bottom, top = max(0.0, bottom), min(height, top)
+            if right > left and top > bottom:
+                info.image_count += 1
+                image_area += (right - left) * (top - bottom)
+        if width and height:
+            info.image_coverage = min(1.0, image_area / (width * height))
+        return info
+    finally:
+        page.close()
+
+
+def analyze_pages(file_path: Path, with_lines: bool = True) -> Optional[List[PageTextLayer]]:
+    """
+    读取 PDF 每一页的文本层和版面信号（同步函数，在 asyncio.to_thread 中调用）
+
+    Returns:
+        每页一个 PageTextLayer；pypdfium2 不可用或读取失败时返回 None
+    """
+    pdfium = load_pdfium()
+    if pdfium is None:
+        return None
+    try:
+        doc = pdfium.PdfDocument(str(file_path))
+    except Exception as e:
+        logger.warning(f"Failed to open {file_path} for text layer analysis: {str(e)}")
+        return None
+    try:
+        return [_read_page(doc, page_idx, with_lines) for page_idx in range(len(doc))]
+    except Exception as e:
+        logger.warning(f"Text layer analysis failed for {file_path}: {str(e)}")
+        return None
+    finally:
+        doc.close()
+
+
+def build_mineru_result(pages: List[PageTextLayer]) -> Dict[str, Any]:
+    """
+    由文本层生成 MinerU 格式的解析结果，page_idx 相对于 pages[0]
+
+    content_list 的 bbox 与 MinerU 一致映射到 0-1000，middle_json 使用 PDF 坐标
+    """
+    md_parts = []
+    content_list = []
+    pdf_info = []
+    start = pages[0].page_idx if pages else 0
+
+    for page in pages:
+        page_idx = page.page_idx - start
+        blocks = []
+        for bbox, text in group_paragraphs(page.lines):
+            md_parts.append(text)
+            blocks.append({
+                "type": "text",
+                "bbox": [round(value, 2) for value in bbox],
+                "lines": [{"bbox": bbox, "spans": [{"bbox": bbox, "type": "text", "content": text}]}]
+            })
+            content_list.append({
+                "type": "text",
+                "text": text,
+                "text_level": 0,
+                "bbox": [
+                    int(bbox[0] * 1000 / page.width), int(bbox[1] * 1000 / page.height),
+                    int(bbox[2] * 1000 / page.width), int(bbox[3] * 1000 / page.height)
+                ],
+                "page_idx": page_idx
+            })
+        pdf_info.append({
+            "page_idx": page_idx,
+            "page_size": [page.width, page.height],
+            "preproc_blocks": blocks,
+            "para_blocks": blocks,
+            "source": "text_layer"
+        })
+
+    md_content = "\n\n".join(md_parts)
+    return {
+        "success": True,
+        "content": md_content,
+        "raw_data": {
+            "md_content": md_content,
+            "middle_json": {"pdf_info": pdf_info},
+            "content_list": content_list,
+            "images": {},
+        },
+        "metadata": {
+            "backend": "text_layer",
+            "total_pages": len(pages),
+            "total_images": 0,
+            "content_list_count": len(content_list),
+        }
+    }
+
+
+def page_markdown(page: PageTextLayer) -> str:
+    """单页文本层的 markdown（段落之间空行分隔）"""
+    return "\n\n".join(text for _, text in group_paragraphs(page.lines))
@@ -4,26 +4,55 @@ OCR Analysis Backend Service
 FastAPI server for PDF OCR processing with MinerU
 """
 
+import time
+
+# 启动计时：从导入 main.py 开始
+_import_started = time.perf_counter()
+
 import os
 import sys
+import json
+import hashlib
+import asyncio
+import logging
+import httpx
 import uvicorn
 from pathlib import Path
+from typing import Optional
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-import logging
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 # Add app directory to path
 sys.path.append(str(Path(__file__).parent / "app"))
 
-from app.services.mineru_service import MinerUService
-from app.services.deepseek_service import DeepSeekOCRService
-from app.services.paddleocr_service import PaddleOCRService
-from app.services.markdown_parser import MarkdownParser
-from app.utils.file_utils import ensure_directories, cleanup_file
-from app.models.ocr_models import OCRRequest, OCRResponse, HealthResponse
+from app.utils.config import load_environment
+
+# Load environment variables (once per process)
+load_environment()
+
+# OCR 服务在首次使用时才导入和初始化（未启用的模型不会加载）
+from app.services.service_registry import ServiceRegistry
+from app.services.ocr_pipeline import OCRPipeline, resolve_return_fields, task_temp_dir
+from app.services.page_router import AUTO_MODEL
+from app.services.job_store import create_job_store, JOB_COMPLETED, JOB_CANCELLED, FINAL_STATUSES, ACTIVE_STATUSES
+from app.services.progress import ProgressBroker
+from app.services.job_runner import JobRunner, JobCancelledError
+from app.services.job_scheduler import JobScheduler, DEFAULT_TENANT
+from app.services.result_store import ResultStore, CursorError
+from app.services.upload_store import UploadStore
+from app.services.search_index import SearchIndex
+from app.services.export_service import ExportService, ExportError
+from app.services.table_store import TableStore
+from app.services.keyword_engine import get_keyword_engine
+from app.utils.table_codec import apply_table_encoding, resolve_table_encoding
+from app.utils.compression import CompressionMiddleware, configured_encodings, get_compression_stats
+from app.utils.http_cache import cache_headers, derived_etag, etag_for_bytes, etag_for_json, etag_matches, file_etag
+from app.services.storage_janitor import StorageJanitor, default_policies
+from app.utils.file_utils import ensure_directories
+from app.utils.image_encoding import get_image_encoder
+from app.models.ocr_models import OCRResponse, HealthResponse
 
 # Configure logging
 logging.basicConfig(
@@ -32,10 +61,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
-
 # Ensure directories exist
 ensure_directories()
 
@@ -56,15 +81,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 按 Accept-Encoding 压缩 JSON / markdown 等文本响应
+app.add_middleware(CompressionMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/exports", StaticFiles(directory="exports"), name="exports")
+# exports/ 下的文件由 download_file 提供（带内容哈希 ETag 和 Cache-Control），不再挂载为静态目录
+
+def _not_modified(request: Request, etag: str, kind: str) -> Optional[Response]:
+    """If-None-Match 命中时返回 304 响应"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag, kind))
+    return None
 
 # 图片代理路由 - 支持 MinerU 和 DeepSeek-OCR API 服务器
 @app.get("/images/{image_path:path}")
-async def proxy_images(image_path: str):
+async def proxy_images(image_path: str, request: Request):
     """代理图片请求到 MinerU 或 DeepSeek-OCR API 服务器"""
-    import requests
     try:
         # 检查是否是DeepSeek图像路径
         if image_path.startswith("deepseek_img_"):
@@ -80,13 +113,18 @@ async def proxy_images(image_path: str):
             image_url = f"{mineru_host}/images/{image_path}"
             logger.info(f"代理MinerU图片请求: {image_url}")
 
-        response = requests.get(image_url, timeout=10)
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(image_url)
 
         if response.status_code == 200:
-            from fastapi.responses import Response
+            etag = etag_for_bytes(response.content)
+            not_modified = _not_modified(request, etag, "image")
+            if not_modified is not None:
+                return not_modified
             return Response(
                 content=response.content,
-                media_type=response.headers.get("content-type", "image/jpeg")
+                media_type=response.headers.get("content-type", "image/jpeg"),
+                headers=cache_headers(etag, "image")
             )
         else:
             logger.warning(f"图片获取失败: {image_url}, 状态码: {response.status_code}")
@@ -95,14 +133,68 @@ async def proxy_images(image_path: str):
         logger.error(f"图片代理失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch image: {str(e)}")
 
-# Initialize services
-mineru_service = MinerUService()
-deepseek_service = DeepSeekOCRService()
-paddleocr_service = PaddleOCRService()
-markdown_parser = MarkdownParser()
+# Initialize services (lazily, on first use)
+service_registry = ServiceRegistry()
+ocr_pipeline = OCRPipeline(service_registry)
+
+# Task storage shared by all workers and persisted across restarts
+job_store = create_job_store()
+result_store = ResultStore()
+job_scheduler = JobScheduler()
+progress_broker = ProgressBroker()
+upload_store = UploadStore()
+search_index = SearchIndex()
+export_service = ExportService()
+table_store = TableStore()
+job_runner = JobRunner(
+    job_store, ocr_pipeline, result_store, job_scheduler, progress_broker, upload_store, search_index, table_store
+)
+
+def _active_job_paths() -> set:
+    """仍在排队/运行的任务引用的文件和临时目录，清理时跳过"""
+    paths = set()
+    for job in job_store.list_jobs(statuses=list(ACTIVE_STATUSES), limit=10000):
+        paths.update(path for path in (job.get("file_path"), job.get("result_path")) if path)
+        paths.add(str(task_temp_dir(job["task_id"])))
+    return paths
+
+# 定期清理 uploads/、temp/、exports/、results/（上传文件经引用计数表释放，淘汰的结果从搜索索引中删除）
+storage_janitor = StorageJanitor(
+    default_policies(evict_upload=upload_store.evict, result_removed=search_index.delete_task), _active_job_paths
+)
+
+# 启动耗时报告
+startup_report = {"import_seconds": round(time.perf_counter() - _import_started, 3)}
+
+@app.on_event("startup")
+async def on_startup():
+    """Resume interrupted jobs and report startup time"""
+    started = time.perf_counter()
+
+    if os.getenv("PRELOAD_SERVICES", "false").lower() == "true":
+        await asyncio.to_thread(service_registry.preload)
+
+    await job_runner.resume_pending()
+    job_runner.start_recovery()
+    storage_janitor.start()
+
+    startup_report["startup_hook_seconds"] = round(time.perf_counter() - started, 3)
+    startup_report["ready_seconds"] = round(time.perf_counter() - _import_started, 3)
+    logger.info(
+        f"🚀 Ready in {startup_report['ready_seconds']:.3f}s "
+        f"(import {startup_report['import_seconds']:.3f}s, enabled models: {', '.join(service_registry.models)})"
+    )
 
-# Global task storage for progress tracking
-processing_tasks = {}
+@app.on_event("shutdown")
+async def close_job_store():
+    await job_runner.stop_recovery()
+    await storage_janitor.stop()
+    upload_store.close()
+    search_index.close()
+    get_keyword_engine().close()
+    await asyncio.to_thread(table_store.close)
+    export_service.shutdown()
+    job_store.close()
 
 @app.get("/", response_model=dict)
 async def root():
@@ -116,48 +208,43 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    mineru_health = await mineru_service.check_health()
+    services = {}
+    if service_registry.is_enabled("mineru"):
+        services["mineru"] = await service_registry.get("mineru").check_health()
 
+    healthy = all(service.get("available") for service in services.values())
     return HealthResponse(
-        status="healthy" if mineru_health.get("available") else "degraded",
+        status="healthy" if healthy else "degraded",
         timestamp=str(Path().absolute()),
-        services={
-            "mineru": mineru_health
-        }
+        services=services
     )
 
-@app.post("/api/ocr/analyze", response_model=OCRResponse)
-async def analyze_pdf(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    model: str = Form("mineru"),
-    options: str = Form("{}")
-):
-    """
-    Analyze PDF file using specified OCR model
-
-    Args:
-        file: Uploaded PDF file
-        model: OCR model to use ('mineru' or 'deepseek')
-        options: JSON string of additional options
-
-    Returns:
-        OCR analysis results
-    """
-
-    # Debug logging for received parameters
-    import json
-    logger.info(f"🔍 Backend model debugging:")
-    logger.info(f"  Received model parameter: '{model}'")
-    logger.info(f"  Model type: {type(model)}")
-    logger.info(f"  Model repr: {repr(model)}")
-    logger.info(f"  Model stripped: '{model.strip() if model else model}'")
-
-    supported_models = ["mineru", "deepseek", "paddleocr"]
-    if model not in supported_models:
+@app.get("/api/system/startup")
+async def get_startup_report():
+    """Startup timing and lazy service initialization status"""
+    return {**startup_report, **service_registry.report()}
+
+@app.get("/api/system/storage")
+async def get_storage_stats():
+    """Disk usage per managed directory and janitor eviction metrics"""
+    return storage_janitor.stats()
+
+@app.get("/api/system/images")
+async def get_image_encoding_stats():
+    """Image encoding settings and cumulative encode time / output bytes"""
+    return get_image_encoder().stats()
+
+@app.get("/api/system/compression")
+async def get_compression_report():
+    """Negotiable response encodings, compression ratio and CPU time per encoding"""
+    return {"encodings_enabled": configured_encodings(), **get_compression_stats().snapshot()}
+
+async def _read_validated_upload(file: UploadFile, model: str) -> bytes:
+    """校验模型、文件类型和大小，返回文件内容"""
+    if model not in service_registry.models and model != AUTO_MODEL:
         raise HTTPException(
             status_code=400,
-            detail=f"Model '{model}' not supported. Available models: {', '.join(supported_models)}"
+            detail=f"Model '{model}' not supported. Available models: {', '.join(service_registry.models + [AUTO_MODEL])}"
         )
 
     # Validate file type
@@ -170,7 +257,6 @@ async def analyze_pdf(
 
     # Validate file size
     max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB default
-    file_size = 0
     content = await file.read()
     file_size = len(content)
 
@@ -180,204 +266,484 @@ async def analyze_pdf(
             detail=f"File size {file_size} exceeds maximum allowed size {max_size} bytes"
         )
 
-    # Save uploaded file
-    upload_dir = Path(os.getenv("UPLOAD_DIR", "./uploads"))
-    file_path = upload_dir / file.filename
+    return content
 
+def _resolve_tenant(request: Request) -> str:
+    """按租户头或 API Key 识别租户（API Key 只保存哈希）"""
+    tenant = request.headers.get("X-Tenant-ID")
+    if tenant:
+        return tenant.strip()
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return DEFAULT_TENANT
+
+def _resolve_priority(priority: str, default: str) -> str:
     try:
-        with open(file_path, "wb") as f:
-            f.write(content)
-
-        logger.info(f"File uploaded: {file.filename} ({file_size} bytes)")
-
-        # Process based on selected model
-        logger.info(f"Starting OCR analysis with {model}")
-
-        if model == "deepseek":
-            # Use DeepSeek OCR
-            import json
-            opts = json.loads(options) if options else {}
-            result = await deepseek_service.analyze_document(file_path, opts)
-
-            return OCRResponse(**result)
-
-        elif model == "paddleocr":
-            # Use PaddleOCR-VL
-            logger.info("📘 Processing with PaddleOCR-VL...")
-            result = await paddleocr_service.process_file(str(file_path))
-
-            # 提取数据
-            markdown_content = result.get("markdown", "")
-            images = result.get("images", [])
-            tables = result.get("tables", [])
-            formulas_raw = result.get("formulas", [])
-
-            # 转换公式格式
-            formulas_formatted = []
-            for formula in formulas_raw:
-                formulas_formatted.append({
-                    "id": formula.get("id", ""),
-                    "type": formula.get("type", "formula"),
-                    "formula": formula.get("latex", ""),
-                    "description": f"Formula on page {formula.get('page', 0) + 1}",
-                    "confidence": formula.get("confidence", 90.0),
-                    "position": None
-                })
-
-            # 构建完整响应
-            response_data = {
-                "success": True,
-                "model": "paddleocr",
-                "filename": file.filename,
-                "fullMarkdown": markdown_content,
-                "results": {
-                    "text": {
-                        "fullText": markdown_content,
-                        "textBlocks": [],
-                        "keywords": [],
-                        "confidence": 95.0,
-                        "stats": {
-                            "total_chars": len(markdown_content),
-                            "total_pages": result.get("metadata", {}).get("total_pages", 0)
-                        }
-                    },
-                    "tables": tables,
-                    "formulas": formulas_formatted,
-                    "images": images,
-                    "handwritten": {
-                        "detected": False,
-                        "text": "No handwritten content detected",
-                        "confidence": 0.0,
-                        "areas": []
-                    },
-                    "performance": {
-                        "accuracy": 95.0,
-                        "speed": 0.0,
-                        "memory": 0
-                    },
-                    "metadata": {
-                        "totalElements": len(images) + len(tables) + len(formulas_formatted),
-                        "contentTypes": ["text", "images", "tables", "formulas"],
-                        "processingTime": None
-                    }
-                },
-                "metadata": result.get("metadata", {})
-            }
+        return JobScheduler.normalize_priority(priority, default)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-            return OCRResponse(**response_data)
+def _estimate_cost(content: bytes) -> float:
+    """以 MB 为单位估算任务代价，用于租户间公平分配"""
+    return max(len(content) / (1024 * 1024), 0.1)
 
-        else:
-            # Use MinerU (default)
-            # Parse options
-            import json
-            opts = json.loads(options) if options else {}
-            backend = opts.get('backend', os.getenv('MINERU_BACKEND', 'pipeline'))
-            enable_ocr = opts.get('enable_ocr', True)
-            language = opts.get('language', 'ch')
-            device = opts.get('device', 'cuda:3')
-
-            logger.info(f"🔧 MinerU options: backend={backend}, enable_ocr={enable_ocr}, language={language}, device={device}")
-
-            # Parse PDF using MinerU
-            parse_result = await mineru_service.parse_pdf(
-                str(file_path),
-                backend=backend,
-                enable_ocr=enable_ocr,
-                language=language,
-                device=device
-            )
+def _parse_options(options: str) -> dict:
+    try:
+        opts = json.loads(options) if options else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="options must be a JSON object")
+    if not isinstance(opts, dict):
+        raise HTTPException(status_code=400, detail="options must be a JSON object")
+
+    # 字段选择规范化为有序列表，等价的选择可以合并到同一个任务
+    if "fields" in opts:
+        try:
+            opts["fields"] = sorted(resolve_return_fields(opts["fields"]))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if "table_encoding" in opts:
+        try:
+            opts["table_encoding"] = resolve_table_encoding(opts["table_encoding"])
+        except (AttributeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return opts
+
+async def _await_job_result(task_id: str, filename: str) -> OCRResponse:
+    """等待被附加的任务结束并读取其结果"""
+    job = await job_runner.wait_for(task_id)
+    if job is not None and job["status"] == JOB_CANCELLED:
+        raise JobCancelledError(f"Task {task_id} was cancelled")
+    if job is None or job["status"] != JOB_COMPLETED:
+        raise RuntimeError((job or {}).get("error") or "Task not found")
+    result = await asyncio.to_thread(result_store.load, job["result_path"])
+    if result is None:
+        raise RuntimeError("Result no longer available")
+    result["filename"] = filename
+    return OCRResponse(**result)
+
+async def _run_until_disconnect(request: Request, task_id: str, waiter_id: str, filename: str):
+    """
+    执行（leader）或等待（附加到已有任务的请求）同步任务
 
-            if not parse_result.get("success"):
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"MinerU parsing failed: {parse_result.get('error', 'Unknown error')}"
-                )
-
-            # Parse markdown content
-            markdown_file = parse_result.get("markdown_file")
-            if not markdown_file or not Path(markdown_file).exists():
-                raise HTTPException(
-                    status_code=500,
-                    detail="No markdown file generated by MinerU"
-                )
-
-            # Extract structured content from markdown using content_list data
-            raw_data = parse_result.get("raw_data", {})
-
-            # 调试：检查数据传递
-            logger.info(f"🔍 parse_result keys: {parse_result.keys()}")
-            logger.info(f"🔍 raw_data keys: {raw_data.keys()}")
-            logger.info(f"🔍 images type: {type(raw_data.get('images'))}")
-            if raw_data.get('images'):
-                if isinstance(raw_data.get('images'), dict):
-                    logger.info(f"🔍 images keys: {list(raw_data.get('images').keys())[:3]}")
-                    logger.info(f"🔍 images sample key type: {type(list(raw_data.get('images').keys())[0]) if raw_data.get('images') else 'N/A'}")
-                else:
-                    logger.info(f"🔍 images is not dict, type: {type(raw_data.get('images'))}")
-                    logger.info(f"🔍 images value preview: {str(raw_data.get('images'))[:200]}...")
+    客户端断开连接时脱离任务；最后一个等待者离开时才取消任务并中止上游请求。
+    任务被取消（POST /api/ocr/jobs/{task_id}/cancel）时抛出 JobCancelledError
+    """
+    leader = waiter_id == task_id
+    if leader:
+        task = asyncio.create_task(job_runner.run_inline(task_id))
+    else:
+        task = asyncio.create_task(_await_job_result(task_id, filename))
+    poll_interval = float(os.getenv("DISCONNECT_POLL_INTERVAL", "1"))
+
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=poll_interval)
+        if done:
+            if task.cancelled():
+                raise JobCancelledError(f"Task {task_id} was cancelled")
+            return task.result()
+        if await request.is_disconnected():
+            cancelled = await job_runner.detach(task_id, waiter_id)
+            if cancelled or not leader:
+                logger.info(f"Client disconnected, {'cancelling' if cancelled else 'detaching from'} task {task_id}")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
             else:
-                logger.warning("⚠️  raw_data中images为None或空")
+                # 其他请求仍在等待该任务的结果，继续在后台执行
+                logger.info(f"Client disconnected, task {task_id} continues for other waiters")
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise HTTPException(status_code=499, detail="Client closed request")
 
-            structured_content = await markdown_parser.parse_with_content_list(
-                markdown_content=parse_result.get("content", ""),
-                content_list=raw_data.get("content_list"),
-                middle_json=raw_data.get("middle_json"),
-                images_data=raw_data.get("images")
-            )
+@app.post("/api/ocr/analyze", response_model=OCRResponse)
+async def analyze_pdf(
+    background_tasks: BackgroundTasks,
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    model: str = Form("mineru"),
+    options: str = Form("{}"),
+    priority: str = Form("interactive")
+):
+    """
+    Analyze PDF file using specified OCR model
 
-            # Keep files for user access - don't cleanup
-            logger.info(f"OCR analysis completed for {file.filename}")
-            logger.info(f"PDF saved to: {file_path}")
-            logger.info(f"Markdown saved to: {markdown_file}")
-
-            # Read the complete markdown content
-            with open(markdown_file, 'r', encoding='utf-8') as f:
-                full_markdown = f.read()
-
-            return OCRResponse(
-                success=True,
-                model=model,
-                filename=file.filename,
-                results=structured_content,
-                fullMarkdown=full_markdown,
-                metadata=parse_result.get("metadata", {})
-            )
+    Args:
+        file: Uploaded PDF file
+        model: OCR model to use ('mineru', 'deepseek', 'paddleocr', or 'auto' for per-page routing)
+        options: JSON string of additional options
+
+    Returns:
+        OCR analysis results
+    """
 
+    # Debug logging for received parameters
+    logger.info(f"🔍 Backend model debugging:")
+    logger.info(f"  Received model parameter: '{model}'")
+    logger.info(f"  Model type: {type(model)}")
+    logger.info(f"  Model repr: {repr(model)}")
+    logger.info(f"  Model stripped: '{model.strip() if model else model}'")
+
+    content = await _read_validated_upload(file, model)
+    opts = _parse_options(options)
+    priority = _resolve_priority(priority, "interactive")
+
+    # Save uploaded file (content-addressed, shared by identical uploads)
+    task_id = job_runner.new_task_id()
+    upload_key, file_path = await asyncio.to_thread(upload_store.put, content, file.filename, task_id)
+    job = None
+
+    try:
+        logger.info(f"File uploaded: {file.filename} ({len(content)} bytes) -> {upload_key}")
+
+        # 登记到任务存储，其他 worker 也能查询该请求的状态；
+        # 相同文件、模型和选项的任务正在处理时直接附加到该任务上
+        job = await job_runner.create_job(
+            file_path, file.filename, model, opts, mode="sync", task_id=task_id,
+            priority=priority, tenant=_resolve_tenant(request), cost=_estimate_cost(content),
+            upload_key=upload_key, coalesce=True
+        )
+        leader = job["task_id"] == task_id
+        if not leader:
+            await asyncio.to_thread(upload_store.release, upload_key, task_id)
+        response.headers["X-Task-ID"] = job["task_id"]
+
+        return await _run_until_disconnect(request, job["task_id"], task_id, file.filename)
+
+    except HTTPException:
+        raise
+    except JobCancelledError as e:
+        logger.info(f"Sync request for {file.filename} ended: {str(e)}")
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing file {file.filename}: {str(e)}")
-        # Cleanup on error
-        if file_path.exists():
-            background_tasks.add_task(cleanup_file, file_path)
+        # 任务未登记时由这里释放引用，已登记的任务结束时会自行释放
+        if job is None:
+            background_tasks.add_task(upload_store.release, upload_key, task_id)
         raise HTTPException(
             status_code=500,
             detail=f"Processing failed: {str(e)}"
         )
 
+@app.post("/api/ocr/jobs")
+async def submit_job(
+    request: Request,
+    file: UploadFile = File(...),
+    model: str = Form("mineru"),
+    options: str = Form("{}"),
+    priority: str = Form("normal")
+):
+    """
+    Submit an OCR job for background processing
+
+    Returns:
+        Task ID and initial status; poll /api/ocr/status/{task_id} for progress
+    """
+    content = await _read_validated_upload(file, model)
+    opts = _parse_options(options)
+    priority = _resolve_priority(priority, "normal")
+
+    # 任务持有上传文件的引用，排队期间文件不会被删除或替换
+    task_id = job_runner.new_task_id()
+    upload_key, file_path = await asyncio.to_thread(upload_store.put, content, file.filename, task_id)
+
+    try:
+        job = await job_runner.create_job(
+            file_path, file.filename, model, opts, mode="async", task_id=task_id,
+            priority=priority, tenant=_resolve_tenant(request), cost=_estimate_cost(content),
+            upload_key=upload_key, coalesce=True
+        )
+    except Exception:
+        await asyncio.to_thread(upload_store.release, upload_key, task_id)
+        raise
+
+    if job["task_id"] != task_id:
+        # 相同的任务已在处理中，共享其结果
+        await asyncio.to_thread(upload_store.release, upload_key, task_id)
+        logger.info(f"Job request for {file.filename} attached to in-flight job {job['task_id']}")
+        return {**JobRunner.public_view(job), "coalesced": True, "waiter_id": task_id}
+
+    job_runner.submit(task_id)
+
+    logger.info(f"Job {task_id} submitted: {file.filename} ({len(content)} bytes, model={model})")
+    return {**JobRunner.public_view(job), "coalesced": False, "waiter_id": task_id}
+
+@app.post("/api/ocr/jobs/{task_id}/cancel")
+async def cancel_job(task_id: str, waiter_id: Optional[str] = None):
+    """
+    Cancel a queued or running job
+
+    Running jobs are aborted together with their in-flight backend requests
+    and page shards, on whichever worker is executing them. When identical
+    requests were coalesced into this job, the call only detaches the caller
+    (identified by the `waiter_id` returned on submit, defaulting to the
+    request that created the job); the job is aborted once no other request
+    is waiting for its result. Repeating the call has no further effect.
+    """
+    if not await asyncio.to_thread(job_store.get_job, task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    await job_runner.detach(task_id, waiter_id)
+    return JobRunner.public_view(await asyncio.to_thread(job_store.get_job, task_id))
+
+@app.get("/api/ocr/queue/stats")
+async def get_queue_stats():
+    """Queue depth and wait time per priority class (this worker)"""
+    return job_scheduler.stats()
+
 @app.get("/api/ocr/status/{task_id}")
-async def get_task_status(task_id: str):
+async def get_task_status(task_id: str, request: Request, response: Response):
     """Get processing status for a task"""
-    if task_id not in processing_tasks:
+    job = await asyncio.to_thread(job_store.get_job, task_id)
+    if not job:
         raise HTTPException(
             status_code=404,
             detail="Task not found"
         )
 
-    return processing_tasks[task_id]
+    view = JobRunner.public_view(job)
+    etag = etag_for_json(view)
+    not_modified = _not_modified(request, etag, "status")
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(cache_headers(etag, "status"))
+    return view
+
+@app.get("/api/ocr/jobs/{task_id}/events")
+async def stream_task_events(task_id: str, request: Request):
+    """
+    Server-Sent Events stream of page-level progress
+
+    Each event carries status, pages done / total, elapsed time and ETA.
+    Events published by this worker are pushed immediately; progress made
+    by other workers is picked up by polling the job store.
+    """
+    if not await asyncio.to_thread(job_store.get_job, task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    poll_interval = float(os.getenv("PROGRESS_POLL_INTERVAL", "2"))
+
+    async def event_stream():
+        queue = progress_broker.subscribe(task_id)
+        last_payload = None
+        event = None
+        try:
+            while not await request.is_disconnected():
+                if event is not None:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=poll_interval)
+                    except asyncio.TimeoutError:
+                        event = None
+                if event is None:
+                    # 首个事件以及超时后从任务存储读取当前状态
+                    job = await asyncio.to_thread(job_store.get_job, task_id)
+                    if not job:
+                        break
+                    event = {
+                        "task_id": task_id,
+                        "status": job["status"],
+                        "progress": job.get("progress") or {},
+                        "error": job.get("error")
+                    }
+
+                payload = json.dumps(event, ensure_ascii=False)
+                if payload != last_payload:
+                    last_payload = payload
+                    yield f"event: progress\ndata: {payload}\n\n"
+                if event.get("status") in FINAL_STATUSES:
+                    break
+        finally:
+            progress_broker.unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/ocr/jobs/{task_id}/result", response_model=OCRResponse)
+async def get_task_result(
+    task_id: str, request: Request, response: Response, table_encoding: Optional[str] = None
+):
+    """Get the stored result of a completed task (table_encoding=rows|columnar converts the tables)"""
+    result_path = await _completed_result_path(task_id)
+    if table_encoding:
+        try:
+            table_encoding = resolve_table_encoding(table_encoding)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # 先按结果文件的摘要判断缓存是否有效，命中时不必读取和序列化整个结果
+    etag = derived_etag(await _result_etag(result_path), table_encoding)
+    not_modified = _not_modified(request, etag, "result")
+    if not_modified is not None:
+        return not_modified
+
+    result = await asyncio.to_thread(result_store.load, result_path)
+    if result is None:
+        raise HTTPException(status_code=410, detail="Result no longer available")
+    if table_encoding:
+        apply_table_encoding(result, table_encoding)
+    response.headers.update(cache_headers(etag, "result"))
+    return result
+
+async def _completed_result_path(task_id: str) -> str:
+    job = await asyncio.to_thread(job_store.get_job, task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if job["status"] != JOB_COMPLETED or not job.get("result_path"):
+        raise HTTPException(status_code=409, detail=f"Task is {job['status']}")
+    return job["result_path"]
+
+async def _result_etag(result_path: str) -> str:
+    """结果文件内容的 ETag（摘要按文件大小和修改时间缓存）"""
+    try:
+        return await asyncio.to_thread(file_etag, Path(result_path))
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Result no longer available")
+
+async def _read_result_part(read, *args, **kwargs) -> dict:
+    """在线程中读取结果分片，统一处理游标错误和已被清理的结果"""
+    try:
+        part = await asyncio.to_thread(read, *args, **kwargs)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        part = None
+    if part is None:
+        raise HTTPException(status_code=410, detail="Result no longer available")
+    return part
+
+@app.get("/api/ocr/jobs/{task_id}/summary")
+async def get_task_result_summary(task_id: str, request: Request, response: Response):
+    """Page count, element counts, keywords and metadata of a completed result (without content)"""
+    result_path = await _completed_result_path(task_id)
+    etag = derived_etag(await _result_etag(result_path), "summary")
+    not_modified = _not_modified(request, etag, "result")
+    if not_modified is not None:
+        return not_modified
+    manifest = await _read_result_part(result_store.manifest, result_path)
+    response.headers.update(cache_headers(etag, "result"))
+    return {key: value for key, value in manifest.items() if key != "page_offsets"}
+
+@app.get("/api/ocr/jobs/{task_id}/pages")
+async def get_task_result_pages(
+    task_id: str, request: Request, response: Response, start: int = 0, limit: int = 10, cursor: Optional[str] = None
+):
+    """Pages of a completed result (text, text blocks, tables, formulas and images per page) with a cursor"""
+    result_path = await _completed_result_path(task_id)
+    start, limit = max(0, start), max(1, min(limit, 50))
+    etag = derived_etag(await _result_etag(result_path), "pages", start, limit, cursor)
+    not_modified = _not_modified(request, etag, "result")
+    if not_modified is not None:
+        return not_modified
+    part = await _read_result_part(result_store.read_pages, result_path, start, limit, cursor)
+    response.headers.update(cache_headers(etag, "result"))
+    return part
+
+@app.get("/api/ocr/jobs/{task_id}/elements/{kind}")
+async def get_task_result_elements(
+    task_id: str, kind: str, request: Request, response: Response, limit: int = 50, cursor: Optional[str] = None
+):
+    """Tables, formulas or images of a completed result in document order with a cursor"""
+    result_path = await _completed_result_path(task_id)
+    limit = max(1, min(limit, 200))
+    etag = derived_etag(await _result_etag(result_path), kind, limit, cursor)
+    not_modified = _not_modified(request, etag, "result")
+    if not_modified is not None:
+        return not_modified
+    try:
+        part = await _read_result_part(result_store.read_elements, result_path, kind, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(cache_headers(etag, "result"))
+    return part
+
+@app.get("/api/ocr/jobs/{task_id}/export")
+async def export_task_result(task_id: str, request: Request, format: str = "json"):
+    """Export a completed result as JSON, Markdown bundle, CSV per table or XLSX (cached by result hash)"""
+    job = await asyncio.to_thread(job_store.get_job, task_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if job["status"] != JOB_COMPLETED or not job.get("result_path"):
+        raise HTTPException(status_code=409, detail=f"Task is {job['status']}")
+    if not Path(job["result_path"]).exists():
+        raise HTTPException(status_code=410, detail="Result no longer available")
+
+    try:
+        export_path, media_type = await export_service.export(job["result_path"], format, job["filename"])
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    etag = await asyncio.to_thread(file_etag, export_path)
+    not_modified = _not_modified(request, etag, "result")
+    if not_modified is not None:
+        return not_modified
+    return FileResponse(
+        export_path, media_type=media_type, filename=export_path.name, headers=cache_headers(etag, "result")
+    )
+
+@app.get("/api/exports/stats")
+async def get_export_stats():
+    """Supported export formats and export cache counters"""
+    return export_service.stats()
+
+@app.get("/api/search")
+async def search_documents(q: str, limit: int = 20, offset: int = 0):
+    """Full-text search over processed documents (page-level hits with snippets)"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    limit = max(1, min(limit, 100))
+    return await asyncio.to_thread(search_index.search, q, limit, max(0, offset))
+
+@app.get("/api/search/stats")
+async def get_search_stats():
+    """Indexed documents, pages and index size"""
+    return await asyncio.to_thread(search_index.stats)
+
+@app.get("/api/keywords/stats")
+async def get_keyword_stats():
+    """Documents and terms in the corpus document-frequency table used for TF-IDF keywords"""
+    return await asyncio.to_thread(get_keyword_engine().stats)
+
+@app.get("/api/tables")
+async def query_tables(
+    doc_id: Optional[str] = None, task_id: Optional[str] = None, model: Optional[str] = None, limit: int = 1000
+):
+    """Cells of extracted tables from the columnar table dataset (one row per cell)"""
+    if not table_store.enabled:
+        raise HTTPException(status_code=503, detail="Table dataset is disabled (requires pyarrow)")
+    limit = max(1, min(limit, 10000))
+    cells = await asyncio.to_thread(table_store.query, doc_id, task_id, model, limit)
+    return {"cells": cells, "count": len(cells), "limit": limit}
+
+@app.get("/api/tables/stats")
+async def get_table_stats():
+    """Parquet files, size and buffered cells of the table dataset"""
+    return await asyncio.to_thread(table_store.stats)
 
 @app.get("/exports/{filename}")
-async def download_file(filename: str):
-    """Download exported file"""
-    file_path = Path("exports") / filename
-    if not file_path.exists():
+async def download_file(filename: str, request: Request):
+    """Download exported file (strong ETag, 304 on a matching If-None-Match)"""
+    file_path = export_service.export_dir / filename
+    if not file_path.is_file():
         raise HTTPException(
             status_code=404,
             detail="File not found"
         )
 
+    try:
+        etag = await asyncio.to_thread(file_etag, file_path)
+    except FileNotFoundError:
+        # 在检查之后被清理任务删除
+        raise HTTPException(status_code=404, detail="File not found")
+    not_modified = _not_modified(request, etag, "result")
+    if not_modified is not None:
+        return not_modified
     return FileResponse(
         file_path,
         media_type='application/octet-stream',
-        filename=filename
+        filename=filename,
+        headers=cache_headers(etag, "result")
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test API Endpoints
+Test HTTP behaviour of main.py routes against an in-process ASGI client (needs fastapi + httpx)
+"""
+
+import asyncio
+import contextlib
+import importlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+# main.py 的目录和数据库都是相对路径，测试时在临时工作目录中导入和运行
+_WORKDIR = tempfile.mkdtemp(prefix="ocr_api_test_")
+_main = None
+
+
+@contextlib.contextmanager
+def _server():
+    """在临时工作目录中导入 main.py，返回模块"""
+    global _main
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    cwd = os.getcwd()
+    # main.py 在导入时挂载 static/（StaticFiles 默认检查目录是否存在），不依赖 ensure_directories 先创建
+    (Path(_WORKDIR) / "static").mkdir(exist_ok=True)
+    os.chdir(_WORKDIR)
+    try:
+        if _main is None:
+            sys.path.insert(0, str(Path(__file__).parent))
+            _main = importlib.import_module("main")
+        yield _main
+    finally:
+        os.chdir(cwd)
+
+
+def _request(main, method: str, url: str, **kwargs):
+    import httpx
+
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(run())
+
+
+def test_export_download_etag():
+    with _server() as main:
+        path = main.export_service.export_dir / "report_0123456789abcdef.json"
+        path.write_text('{"fullMarkdown": "# 报告"}', encoding="utf-8")
+
+        response = _request(main, "GET", f"/exports/{path.name}")
+        assert response.status_code == 200
+        assert response.content == path.read_bytes()
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and len(etag) == 34
+        assert response.headers["cache-control"] == "private, max-age=3600"
+
+        cached = _request(main, "GET", f"/exports/{path.name}", headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+        assert cached.headers["etag"] == etag
+
+        stale = _request(main, "GET", f"/exports/{path.name}", headers={"If-None-Match": '"other"'})
+        assert stale.status_code == 200
+
+        assert _request(main, "GET", "/exports/missing.json").status_code == 404
+
+
+def test_static_mount():
+    with _server() as main:
+        (Path(_WORKDIR) / "static" / "ping.txt").write_text("pong", encoding="utf-8")
+        response = _request(main, "GET", "/static/ping.txt")
+        assert response.status_code == 200 and response.text == "pong"
+
+
+def test_cancel_queued_sync_request():
+    with _server() as main:
+        import httpx
+        from app.services.job_scheduler import JobScheduler
+
+        class SlowPipeline:
+            async def run(self, file_path, filename, model, options, progress=None):
+                await asyncio.sleep(3600)
+
+        main.job_runner.pipeline = SlowPipeline()
+        main.job_runner.scheduler = JobScheduler(max_concurrent=1, tenant_weights={})
+
+        async def scenario():
+            gate = asyncio.Event()
+
+            async def holder():
+                async with main.job_runner.scheduler.slot("normal", "other"):
+                    await gate.wait()
+
+            blocker = asyncio.create_task(holder())
+            async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+                analyze = asyncio.create_task(client.post(
+                    "/api/ocr/analyze",
+                    files={"file": ("queued.pdf", b"%PDF-1.4 queued", "application/pdf")},
+                    data={"model": "mineru"}
+                ))
+                while not main.job_runner._tasks:
+                    await asyncio.sleep(0.01)
+                task_id = next(iter(main.job_runner._tasks))
+
+                cancelled = await client.post(f"/api/ocr/jobs/{task_id}/cancel")
+                assert cancelled.status_code == 200 and cancelled.json()["status"] == "cancelled"
+                response = await analyze
+                assert response.status_code == 409, response.text
+                assert "cancelled" in response.json()["detail"]
+
+                # 重复取消没有副作用
+                again = await client.post(f"/api/ocr/jobs/{task_id}/cancel")
+                assert again.status_code == 200 and again.json()["waiters"] == 0
+            gate.set()
+            await blocker
+
+        asyncio.run(scenario())
+
+
+def main():
+    print("🧪 Testing API Endpoints")
+    print("=" * 40)
+
+    tests = [
+        test_static_mount,
+        test_export_download_etag,
+        test_cancel_queued_sync_request,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nAPI Endpoints: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
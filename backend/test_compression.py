@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test Response Compression
+Test Accept-Encoding negotiation, thresholds, streaming and skip rules of the compression middleware
+"""
+
+import asyncio
+import gzip
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.compression import (
+    CompressionMiddleware, CompressionStats, compression_level, load_brotli, negotiate
+)
+
+BODY = json.dumps({"fullMarkdown": "# 报告\n\n<table><tr><td>金额</td></tr></table>\n" * 500}).encode()
+
+
+def _app(body: bytes, content_type: bytes = b"application/json", chunks: int = 1, headers=None):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type), (b"content-length", str(len(body)).encode()), *(headers or [])
+        ]})
+        size = -(-len(body) // chunks)
+        for index in range(chunks):
+            await send({
+                "type": "http.response.body",
+                "body": body[index * size:(index + 1) * size],
+                "more_body": index < chunks - 1,
+            })
+    return app
+
+
+def _call(middleware, accept: str = "gzip"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(middleware(scope, receive, send))
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+def _middleware(app, **kwargs):
+    kwargs.setdefault("encodings", ("gzip",))
+    return CompressionMiddleware(app, min_size=1024, stats=CompressionStats(), **kwargs)
+
+
+def test_negotiate():
+    supported = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br", supported) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", supported) == "gzip"
+    assert negotiate("br;q=0, *;q=0.1", supported) == "zstd"
+    assert negotiate("identity", supported) is None
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+    assert compression_level("gzip", 10) > compression_level("gzip", 10 * 1024 * 1024)
+
+
+def test_gzip_single_body():
+    middleware = _middleware(_app(BODY, headers=[(b"etag", b'"abc"')]))
+    headers, body = _call(middleware, "gzip, deflate")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == '"abc-gzip"'
+    assert int(headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == BODY
+    stats = middleware.stats.snapshot()["encodings"]["gzip"]
+    assert stats["responses"] == 1 and stats["ratio"] > 3
+
+
+def test_streaming_and_threaded_chunks():
+    middleware = _middleware(_app(BODY, chunks=4), thread_threshold=1024)
+    headers, body = _call(middleware)
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == BODY
+    assert middleware.stats.snapshot()["encodings"]["gzip"]["threaded_chunks"] == 4
+
+
+def test_skip_rules():
+    cases = [
+        (_app(b"x" * 10), "too_small"),
+        (_app(BODY, content_type=b"image/png"), "content_type"),
+        (_app(BODY, content_type=b"text/event-stream"), "event_stream"),
+        (_app(BODY, headers=[(b"cache-control", b"no-transform")]), "no_transform"),
+    ]
+    for app, reason in cases:
+        middleware = _middleware(app)
+        headers, body = _call(middleware)
+        assert "content-encoding" not in headers, reason
+        assert middleware.stats.snapshot()["skipped"] == {reason: 1}
+
+    headers, body = _call(_middleware(_app(BODY)), "identity")
+    assert "content-encoding" not in headers and body == BODY
+
+
+def test_brotli():
+    brotli = load_brotli()
+    if brotli is None:
+        # brotli 或 brotlicffi 任一可用即可
+        pytest.skip("brotli not available")
+    headers, body = _call(_middleware(_app(BODY), encodings=("br", "gzip")), "gzip, br")
+    assert headers["content-encoding"] == "br" and brotli.decompress(body) == BODY
+
+
+def test_zstd():
+    zstd = pytest.importorskip("zstandard")
+    headers, body = _call(_middleware(_app(BODY, chunks=3), encodings=("zstd", "gzip")), "zstd, gzip")
+    assert headers["content-encoding"] == "zstd"
+    assert zstd.ZstdDecompressor().decompressobj().decompress(body) == BODY
+
+
+def main():
+    print("🧪 Testing Response Compression")
+    print("=" * 40)
+
+    tests = [
+        test_negotiate,
+        test_gzip_single_body,
+        test_streaming_and_threaded_chunks,
+        test_skip_rules,
+        test_brotli,
+        test_zstd,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nResponse Compression: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test Debug Capture
+Test sampling, size cap and rotation of debug dumps
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.debug_capture import DebugCapture
+
+
+async def _capture_all(capture: DebugCapture, count: int, artifacts: dict):
+    ids = [capture.capture(f"doc{i}.pdf", artifacts) for i in range(count)]
+    await asyncio.gather(*capture._pending)
+    return ids
+
+
+def test_disabled_by_default():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        capture = DebugCapture("deepseek", directory=tmp_dir)
+        assert not capture.enabled
+        ids = asyncio.run(_capture_all(capture, 3, {"md": "text"}))
+        assert ids == [None, None, None]
+        assert not (Path(tmp_dir) / "deepseek").exists()
+
+
+def test_per_request_files_with_size_cap():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        capture = DebugCapture("deepseek", enabled=True, sample_rate=1.0, directory=tmp_dir, max_bytes=100)
+        ids = asyncio.run(_capture_all(capture, 2, {"response.json": {"images": "x" * 1000}, "markdown.md": "# ok"}))
+
+        assert len(set(ids)) == 2
+        files = sorted((Path(tmp_dir) / "deepseek").iterdir())
+        assert len(files) == 4
+        json_file = next(path for path in files if path.name.startswith(ids[0]) and path.suffix == ".json")
+        assert json_file.stat().st_size < 200
+        assert json_file.read_bytes().endswith(b"[truncated]\n")
+
+
+def test_rotation_and_sampling():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        capture = DebugCapture("deepseek", enabled=True, sample_rate=1.0, directory=tmp_dir, max_files=3)
+        asyncio.run(_capture_all(capture, 6, {"md": "text"}))
+        assert len(list((Path(tmp_dir) / "deepseek").iterdir())) == 3
+
+        never = DebugCapture("deepseek", enabled=True, sample_rate=0.0, directory=tmp_dir)
+        assert not any(never.should_capture() for _ in range(100))
+
+
+def main():
+    print("🧪 Testing Debug Capture")
+    print("=" * 40)
+
+    tests = [
+        test_disabled_by_default,
+        test_per_request_files_with_size_cap,
+        test_rotation_and_sampling,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nDebug Capture: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
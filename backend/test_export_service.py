@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test Export Service
+Test JSON / Markdown / CSV / XLSX exports and export caching by result hash
+"""
+
+import asyncio
+import base64
+import csv
+import io
+import json
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.export_service import ExportService, ExportError
+
+RESULT = {
+    "success": True,
+    "model": "mineru",
+    "filename": "报告.pdf",
+    "fullMarkdown": "# 报告\n\n![](images/fig1.jpg)\n",
+    "results": {
+        "tables": [
+            {"id": "table_1", "title": "收入", "headers": ["年份", "金额"], "rows": [["2023", "100"], ["2024", "120"]]},
+            {"id": "table_2", "title": "Costs", "headers": ["item"], "rows": [["rent"]]},
+        ],
+        "images": [
+            {"id": "img_1", "path": "images/fig1.jpg",
+             "base64": "data:image/jpeg;base64," + base64.b64encode(b"jpeg-bytes").decode()},
+            {"id": "img_2", "path": "../../etc/passwd", "base64": base64.b64encode(b"x").decode()},
+        ],
+    },
+}
+
+
+def _setup(tmp: str):
+    result_path = Path(tmp) / "result.json"
+    result_path.write_text(json.dumps(RESULT, ensure_ascii=False), encoding="utf-8")
+    return ExportService(export_dir=str(Path(tmp) / "exports"), max_workers=2), str(result_path)
+
+
+def test_json_and_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        service, result_path = _setup(tmp)
+
+        async def run():
+            first = await service.export(result_path, "json", "报告.pdf")
+            second = await service.export(result_path, "json", "报告.pdf")
+            return first, second
+
+        (path, mime), (path2, _) = asyncio.run(run())
+        assert path == path2
+        assert mime == "application/json"
+        assert json.loads(path.read_text(encoding="utf-8")) == RESULT
+        assert service.stats()["generated"] == 1
+        assert service.stats()["cache_hits"] == 1
+        service.shutdown()
+
+
+def test_concurrent_requests_share_generation():
+    with tempfile.TemporaryDirectory() as tmp:
+        service, result_path = _setup(tmp)
+
+        async def run():
+            return await asyncio.gather(*(service.export(result_path, "csv", "a.pdf") for _ in range(5)))
+
+        paths = {path for path, _ in asyncio.run(run())}
+        assert len(paths) == 1
+        assert service.stats()["generated"] == 1
+        service.shutdown()
+
+
+def test_markdown_and_csv_bundles():
+    with tempfile.TemporaryDirectory() as tmp:
+        service, result_path = _setup(tmp)
+        md_path, _ = asyncio.run(service.export(result_path, "markdown", "报告.pdf"))
+        csv_path, _ = asyncio.run(service.export(result_path, "csv", "报告.pdf"))
+        assert md_path != csv_path
+
+        with zipfile.ZipFile(md_path) as bundle:
+            names = set(bundle.namelist())
+            assert names == {"document.md", "images/fig1.jpg", "etc/passwd"}
+            assert bundle.read("images/fig1.jpg") == b"jpeg-bytes"
+
+        with zipfile.ZipFile(csv_path) as bundle:
+            names = sorted(bundle.namelist())
+            assert names == ["001_table_1.csv", "002_table_2.csv"]
+            text = bundle.read(names[0]).decode("utf-8-sig")
+            assert list(csv.reader(io.StringIO(text))) == [["年份", "金额"], ["2023", "100"], ["2024", "120"]]
+        service.shutdown()
+
+
+def test_exports_stream_the_result():
+    pytest.importorskip("ijson")
+    with tempfile.TemporaryDirectory() as tmp:
+        service, result_path = _setup(tmp)
+        # ijson 可用时逐个读取图片和表格，不整份加载结果
+        def load_whole_result(path):
+            raise AssertionError("loaded the whole result")
+
+        original_load = ExportService._load
+        ExportService._load = staticmethod(load_whole_result)
+        try:
+            md_path, _ = asyncio.run(service.export(result_path, "markdown", "报告.pdf"))
+            csv_path, _ = asyncio.run(service.export(result_path, "csv", "报告.pdf"))
+        finally:
+            ExportService._load = original_load
+            service.shutdown()
+        with zipfile.ZipFile(md_path) as bundle:
+            assert bundle.read("document.md").decode("utf-8") == RESULT["fullMarkdown"]
+        with zipfile.ZipFile(csv_path) as bundle:
+            assert len(bundle.namelist()) == 2
+
+
+def test_unknown_format():
+    with tempfile.TemporaryDirectory() as tmp:
+        service, result_path = _setup(tmp)
+        try:
+            asyncio.run(service.export(result_path, "pdf", "a.pdf"))
+            raise AssertionError("expected ExportError")
+        except ExportError:
+            pass
+        finally:
+            service.shutdown()
+
+
+def test_xlsx():
+    openpyxl = pytest.importorskip("openpyxl")
+    with tempfile.TemporaryDirectory() as tmp:
+        service, result_path = _setup(tmp)
+        path, _ = asyncio.run(service.export(result_path, "xlsx", "a.pdf"))
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ["1_收入", "2_Costs"]
+        assert [list(row) for row in workbook["1_收入"].iter_rows(values_only=True)][1] == ["2023", "100"]
+        workbook.close()
+        service.shutdown()
+
+
+def main():
+    print("🧪 Testing Export Service")
+    print("=" * 40)
+
+    tests = [
+        test_json_and_cache,
+        test_concurrent_requests_share_generation,
+        test_markdown_and_csv_bundles,
+        test_exports_stream_the_result,
+        test_unknown_format,
+        test_xlsx,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nExport Service: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test HTTP Cache Helpers
+Test content-hash ETags, If-None-Match matching and 304 handling behind the compression middleware
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.compression import CompressionMiddleware, CompressionStats
+from app.utils.http_cache import cache_headers, derived_etag, etag_for_json, etag_matches, file_etag
+
+
+def test_etag_matches():
+    etag = etag_for_json({"b": 1, "a": [1, 2]})
+    assert etag == etag_for_json({"a": [1, 2], "b": 1})
+    assert etag.startswith('"') and len(etag) == 34
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches(etag[:-1] + '-gzip"', etag)
+    assert etag_matches(etag[:-1] + '-zstd"', etag[:-1] + '-br"')
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_file_etag_cache_and_invalidation():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "result.json"
+        path.write_text('{"a": 1}', encoding="utf-8")
+        first = file_etag(path, chunk_size=3)
+        assert file_etag(path) == first
+
+        path.write_text('{"a": 2}', encoding="utf-8")
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+        assert file_etag(path) != first
+
+        path.unlink()
+        try:
+            file_etag(path)
+            raise AssertionError("expected FileNotFoundError")
+        except FileNotFoundError:
+            pass
+
+
+def test_derived_etag_and_headers():
+    base = '"abc"'
+    assert derived_etag(base) == base
+    assert derived_etag(base, None) == base
+    assert derived_etag(base, "pages", 0, 10, None) != derived_etag(base, "pages", 10, 10, None)
+    assert derived_etag(base, "columnar") != base
+
+    assert cache_headers(base, "status") == {"ETag": base, "Cache-Control": "no-cache"}
+    os.environ["HTTP_CACHE_RESULT"] = "private, max-age=60"
+    try:
+        assert cache_headers(base, "result")["Cache-Control"] == "private, max-age=60"
+    finally:
+        del os.environ["HTTP_CACHE_RESULT"]
+
+
+def test_not_modified_behind_compression():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", b'"abc"')]})
+        await send({"type": "http.response.body", "body": b""})
+
+    def call(if_none_match: bytes):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def receive():
+            return {"type": "http.request"}
+
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": [
+            (b"accept-encoding", b"gzip"), (b"if-none-match", if_none_match)
+        ]}
+        middleware = CompressionMiddleware(app, min_size=1024, encodings=("gzip",), stats=CompressionStats())
+        asyncio.run(middleware(scope, receive, send))
+        return {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+
+    # 客户端缓存的是压缩后的 ETag，304 也要返回同一个值
+    headers = call(b'"abc-gzip"')
+    assert headers["etag"] == '"abc-gzip"' and headers["vary"] == "Accept-Encoding"
+    assert call(b'"abc"')["etag"] == '"abc"'
+
+
+def main():
+    print("🧪 Testing HTTP Cache Helpers")
+    print("=" * 40)
+
+    tests = [
+        test_etag_matches,
+        test_file_etag_cache_and_invalidation,
+        test_derived_etag_and_headers,
+        test_not_modified_behind_compression,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nHTTP Cache Helpers: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
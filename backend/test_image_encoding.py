@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test Image Encoding
+Test pass-through handling of backend images and per-request encoding statistics
+"""
+
+import sys
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.image_encoding import ImageEncoder, EncodingSummary
+
+
+def test_passthrough_keeps_payload():
+    encoder = ImageEncoder(image_format="png", reencode_passthrough=False)
+
+    encoded = encoder.encode_base64("aGVsbG8=", "image/jpeg")
+    assert encoded.data_uri == "data:image/jpeg;base64,aGVsbG8="
+    assert encoded.thumbnail_uri is None
+    assert encoded.as_value() == encoded.data_uri
+
+    encoded = encoder.encode_base64("data:image/webp;base64,aGVsbG8=", "image/png")
+    assert encoded.data_uri == "data:image/webp;base64,aGVsbG8="
+
+    stats = encoder.stats()
+    assert stats["passthrough"]["images"] == 2
+    assert stats["encoded"]["images"] == 0
+
+
+def test_summary_merge():
+    summary = EncodingSummary()
+    encoder = ImageEncoder(image_format="jpg")
+    assert encoder.format == "jpeg"
+    summary.add(encoder.encode_base64("aGVsbG8=", "image/png"))
+    summary.add(encoder.encode_base64("aGVsbG8=", "image/png"))
+
+    merged = EncodingSummary.merge([summary.to_dict(), None, summary.to_dict()])
+    assert merged["images"] == 4
+    assert merged["bytes"] == summary.bytes * 2
+    assert merged["avg_bytes"] == summary.bytes // 2
+
+
+def test_rejects_unknown_format():
+    try:
+        ImageEncoder(image_format="bmp")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError for unsupported format")
+
+
+def main():
+    print("🧪 Testing Image Encoding")
+    print("=" * 40)
+
+    tests = [
+        test_passthrough_keeps_payload,
+        test_summary_merge,
+        test_rejects_unknown_format,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nImage Encoding: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test Image Preprocessing
+Test EXIF orientation handling and downscaling of image inputs before upload
+"""
+
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.image_preprocess import prepare_image, is_image_file, _load_pil, _target_size
+
+
+def test_target_size():
+    assert _target_size((4000, 3000), 1920) == (1920, 1440)
+    assert _target_size((800, 600), 1920) == (800, 600)
+    assert _target_size((4000, 3000), 0) == (4000, 3000)
+    assert is_image_file(Path("photo.JPG"))
+    assert not is_image_file(Path("doc.pdf"))
+
+
+def test_non_image_passthrough():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.pdf"
+        path.write_bytes(b"%PDF-1.7 test")
+        prepared = prepare_image(path, 1024)
+        assert prepared.content == b"%PDF-1.7 test"
+        assert prepared.stats["preprocessed"] is False
+
+
+def test_downscale_and_orientation():
+    pytest.importorskip("PIL")
+    Image, _ = _load_pil()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 4000x3000 photo stored rotated (EXIF orientation 6 = rotate 90° CW)
+        image = Image.new("RGB", (4000, 3000), (200, 120, 40))
+        exif = image.getexif()
+        exif[0x0112] = 6
+        buffered = BytesIO()
+        image.save(buffered, format="JPEG", exif=exif, quality=95)
+        path = Path(tmp) / "photo.jpeg"
+        path.write_bytes(buffered.getvalue())
+
+        prepared = prepare_image(path, 1920)
+        assert prepared.stats["preprocessed"] is True
+        assert prepared.stats["orientation_fixed"] is True
+        assert prepared.stats["sent_size"] == [1440, 1920]
+        assert prepared.stats["sent_bytes"] < prepared.stats["original_bytes"]
+        assert prepared.mime == "image/jpeg"
+        with Image.open(BytesIO(prepared.content)) as sent:
+            assert sent.size == (1440, 1920)
+
+        # small image without orientation tag is sent unchanged
+        small = Path(tmp) / "small.png"
+        Image.new("RGB", (640, 480)).save(small)
+        prepared = prepare_image(small, 1920)
+        assert prepared.content == small.read_bytes()
+        assert prepared.filename == "small.png"
+
+
+def main():
+    print("🧪 Testing Image Preprocessing")
+    print("=" * 40)
+
+    tests = [
+        test_target_size,
+        test_non_image_passthrough,
+        test_downscale_and_orientation,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nImage Preprocessing: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
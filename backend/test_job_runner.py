@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Test Job Runner
+Test cancelling synchronous jobs while queued, before claim and while running, idempotent detach
+and periodic recovery of stale jobs
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.job_scheduler import JobScheduler
+from app.services.job_store import SQLiteJobStore, JOB_CANCELLED, JOB_FAILED, JOB_RUNNING
+from app.services.progress import ProgressBroker
+from app.services.result_store import ResultStore
+
+
+class _SlowPipeline:
+    """模拟一直处理中的 OCR 流水线"""
+
+    async def run(self, file_path, filename, model, options, progress=None):
+        await asyncio.sleep(3600)
+
+
+def _runner(tmp_dir: str, max_concurrent: int = 1):
+    # job_runner 经 ocr_pipeline 依赖 pydantic
+    pytest.importorskip("pydantic")
+    from app.services.job_runner import JobRunner
+
+    runner = JobRunner(
+        SQLiteJobStore(str(Path(tmp_dir) / "jobs.db")),
+        _SlowPipeline(),
+        ResultStore(base_dir=tmp_dir),
+        JobScheduler(max_concurrent=max_concurrent, tenant_weights={}),
+        ProgressBroker()
+    )
+    runner.cancel_poll_interval = 0.01
+    return runner
+
+
+def _sync_job(runner, task_id: str = "t1", upload_key: str = None):
+    return asyncio.run(runner.create_job(
+        Path("missing.pdf"), "a.pdf", "mineru", {}, mode="sync", task_id=task_id,
+        upload_key=upload_key, coalesce=upload_key is not None
+    ))
+
+
+class _ReleaseRecorder:
+    """记录释放的上传文件引用"""
+
+    def __init__(self):
+        self.released = []
+
+    def release(self, upload_key: str, task_id: str) -> None:
+        self.released.append((upload_key, task_id))
+
+
+async def _expect_cancelled(task: asyncio.Task) -> None:
+    from app.services.job_runner import JobCancelledError
+    try:
+        await task
+        raise AssertionError("expected JobCancelledError")
+    except JobCancelledError:
+        pass
+
+
+def test_cancel_while_queued():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp)
+        _sync_job(runner)
+
+        async def scenario():
+            gate = asyncio.Event()
+
+            async def holder():
+                async with runner.scheduler.slot("normal", "other"):
+                    await gate.wait()
+
+            blocker = asyncio.create_task(holder())
+            await asyncio.sleep(0)
+            task = asyncio.create_task(runner.run_inline("t1"))
+            await asyncio.sleep(0.01)
+            assert runner.scheduler.stats()["classes"]["normal"]["queued"] == 1
+
+            # 等待槽位时被取消：不能以 CancelledError 的形式泄漏给调用方
+            assert await runner.detach("t1")
+            await _expect_cancelled(task)
+            gate.set()
+            await blocker
+
+        asyncio.run(scenario())
+        assert runner.store.get_job("t1")["status"] == JOB_CANCELLED
+        assert runner.scheduler.stats()["running"] == 0
+
+
+def test_cancel_before_claim():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp)
+        _sync_job(runner)
+        assert asyncio.run(runner.cancel("t1")) == JOB_CANCELLED
+
+        async def scenario():
+            await _expect_cancelled(asyncio.create_task(runner.run_inline("t1")))
+
+        asyncio.run(scenario())
+        assert runner.scheduler.stats()["running"] == 0
+
+
+def test_cancel_while_running():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp)
+        _sync_job(runner)
+
+        async def scenario():
+            task = asyncio.create_task(runner.run_inline("t1"))
+            while runner.store.get_job("t1")["status"] != JOB_RUNNING:
+                await asyncio.sleep(0.01)
+            assert await runner.detach("t1")
+            await _expect_cancelled(task)
+
+        asyncio.run(scenario())
+        job = runner.store.get_job("t1")
+        assert job["status"] == JOB_CANCELLED and job["error"] == "Cancelled"
+
+
+def test_detach_is_idempotent():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp)
+        _sync_job(runner, "t1", upload_key="blob")
+        assert _sync_job(runner, "t2", upload_key="blob")["task_id"] == "t1"
+        assert runner.store.get_job("t1")["waiters"] == 2
+
+        async def scenario():
+            # 同一个等待者重复取消，不会把其他等待者也算作离开
+            assert not await runner.detach("t1", "t2")
+            assert not await runner.detach("t1", "t2")
+            assert runner.store.get_job("t1")["waiters"] == 1
+            assert runner.store.get_job("t1")["status"] != JOB_CANCELLED
+
+            assert await runner.detach("t1")
+            assert not await runner.detach("t1")
+            assert await runner.cancel("t1") == JOB_CANCELLED
+
+        asyncio.run(scenario())
+        assert runner.store.get_job("t1")["waiters"] == 0
+
+
+def test_periodic_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp, max_concurrent=2)
+        runner.recovery_interval = 0.02
+        upload = Path(tmp) / "a.pdf"
+        upload.write_bytes(b"%PDF")
+        store = runner.store
+        for task_id in ("dead-worker", "live-worker", "fresh"):
+            store.create_job(task_id, mode="async", file_path=str(upload), filename="a.pdf", model="mineru")
+        store.claim_job("dead-worker", "host:1")
+        store.claim_job("live-worker", runner.worker_id)
+        store.claim_job("fresh", "host:2")
+        old = time.time() - 600
+        store.update_job("dead-worker", heartbeat_at=old)
+        store.update_job("live-worker", heartbeat_at=old)
+
+        async def scenario():
+            runner.start_recovery()
+            # 其他 worker 在本 worker 启动之后才崩溃：由定期恢复接管
+            for _ in range(250):
+                job = store.get_job("dead-worker")
+                if job["status"] == JOB_RUNNING and job["worker_id"] == runner.worker_id:
+                    break
+                await asyncio.sleep(0.02)
+            await runner.stop_recovery()
+            for task in list(runner._tasks.values()):
+                task.cancel()
+            await asyncio.gather(*runner._tasks.values(), return_exceptions=True)
+
+        asyncio.run(scenario())
+        job = store.get_job("dead-worker")
+        assert job["worker_id"] == runner.worker_id and job["attempts"] == 2
+        # 本 worker 自己的任务和心跳新鲜的任务不受影响
+        assert store.get_job("live-worker")["attempts"] == 1
+        assert store.get_job("fresh")["worker_id"] == "host:2"
+
+
+def test_restart_with_same_worker_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp)
+        runner.store.create_job("orphan", mode="async", file_path=str(Path(tmp) / "gone.pdf"))
+        runner.store.claim_job("orphan", runner.worker_id)
+
+        # 心跳还很新鲜，但同一 worker ID 重启说明该任务已经中断
+        assert asyncio.run(runner.resume_pending()) == 0
+        job = runner.store.get_job("orphan")
+        assert job["status"] != JOB_RUNNING
+        assert job["error"] == "Uploaded file no longer exists"
+
+
+def test_restart_fails_queued_sync_job():
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = _runner(tmp)
+        zombie = _sync_job(runner, "zombie", upload_key="blob")
+        assert zombie["worker_id"] == runner.worker_id
+
+        # 进程在同步任务排队时退出，以相同 worker ID 重启
+        restarted = _runner(tmp)
+        restarted.upload_store = _ReleaseRecorder()
+        assert asyncio.run(restarted.resume_pending()) == 0
+        job = restarted.store.get_job("zombie")
+        assert job["status"] == JOB_FAILED and job["error"] == "Interrupted by worker restart"
+        # 被标记失败的任务同样释放上传文件引用
+        assert restarted.upload_store.released == [("blob", "zombie")]
+
+        # 相同内容的新请求创建新任务，而不是附加到已中断的任务上
+        assert _sync_job(restarted, "fresh", upload_key="blob")["task_id"] == "fresh"
+
+        # 其他 worker 退出后遗留的排队任务：心跳超时后同样不再被附加
+        other = _sync_job(runner, "other", upload_key="blob2")
+        restarted.store.update_job("other", worker_id="host:gone", heartbeat_at=time.time() - 600)
+        assert _sync_job(restarted, "next", upload_key="blob2")["task_id"] == "next"
+        assert other["task_id"] == "other"
+
+
+def main():
+    print("🧪 Testing Job Runner")
+    print("=" * 40)
+
+    tests = [
+        test_cancel_while_queued,
+        test_cancel_before_claim,
+        test_cancel_while_running,
+        test_detach_is_idempotent,
+        test_periodic_recovery,
+        test_restart_with_same_worker_id,
+        test_restart_fails_queued_sync_job,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nJob Runner: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
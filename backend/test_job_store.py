@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test Job Store
+Test the SQLite job store without any OCR backend
+"""
+
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.job_store import (
+    SQLiteJobStore, create_job_store, JOB_QUEUED, JOB_RUNNING, JOB_FAILED, JOB_CANCELLED
+)
+
+
+def _new_store(tmp_dir: str) -> SQLiteJobStore:
+    return SQLiteJobStore(str(Path(tmp_dir) / "jobs.db"))
+
+
+def test_create_and_update():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        job = store.create_job("t1", model="mineru", filename="a.pdf", options={"language": "ch"})
+        assert job["status"] == JOB_QUEUED
+        assert job["options"] == {"language": "ch"}
+
+        assert store.update_job("t1", progress={"pages_done": 3, "pages_total": 10})
+        assert store.get_job("t1")["progress"]["pages_done"] == 3
+        assert store.get_job("missing") is None
+
+        mode = store._connect().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal"
+        store.close()
+
+
+def test_claim_is_exclusive():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        other = _new_store(tmp_dir)  # 模拟另一个 worker
+        store.create_job("t1", model="mineru")
+
+        assert store.claim_job("t1", "worker-a")
+        assert not other.claim_job("t1", "worker-b")
+        assert other.get_job("t1")["status"] == JOB_RUNNING
+        assert other.get_job("t1")["attempts"] == 1
+        store.close()
+        other.close()
+
+
+def test_requeue_stale():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        store.create_job("async-job", mode="async")
+        store.create_job("sync-job", mode="sync")
+        store.claim_job("async-job", "worker-a")
+        store.claim_job("sync-job", "worker-a")
+
+        # 心跳仍然新鲜时不应重新排队
+        assert store.requeue_stale(stale_after=60, max_attempts=3) == ([], [])
+
+        old = time.time() - 120
+        store.update_job("async-job", heartbeat_at=old)
+        store.update_job("sync-job", heartbeat_at=old)
+
+        requeued, failed = store.requeue_stale(stale_after=60, max_attempts=3)
+        assert requeued == ["async-job"]
+        # 标记失败的任务记录返回给调用方，用于释放上传文件引用
+        assert [job["task_id"] for job in failed] == ["sync-job"]
+        assert store.get_job("async-job")["status"] == JOB_QUEUED
+        assert store.get_job("sync-job")["status"] == JOB_FAILED
+
+        # 以相同 ID 重启的 worker 名下的任务不论心跳都视为中断；仍在运行的 worker 的任务不算超时
+        store.create_job("orphan", mode="async")
+        store.create_job("live", mode="async")
+        store.claim_job("orphan", "host:1")
+        store.claim_job("live", "host:2")
+        store.update_job("live", heartbeat_at=old)
+        assert store.requeue_stale(60, 3, live_worker="host:2") == ([], [])
+        assert store.requeue_stale(60, 3, orphaned_worker="host:1", live_worker="host:2")[0] == ["orphan"]
+        assert store.requeue_stale(60, 3)[0] == ["live"]
+        store.close()
+
+
+def test_stale_queued_jobs():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        store.create_or_attach("zombie", "fp", mode="sync", worker_id="host:1")
+        store.create_job("queued-async", mode="async", worker_id="host:1")
+        store.create_job("waiting", mode="sync", worker_id="host:2")
+
+        # 所属 worker 仍在刷新心跳时可以附加
+        assert store.create_or_attach("t2", "fp", mode="sync")["task_id"] == "zombie"
+
+        old = time.time() - 120
+        store.update_job("zombie", heartbeat_at=old)
+        store.update_job("queued-async", heartbeat_at=old)
+        store.update_job("waiting", heartbeat_at=old)
+        assert store.touch_queued("host:2") == 1
+
+        # 所属 worker 已退出：不再附加到该任务
+        assert store.create_or_attach("t3", "fp", mode="sync")["task_id"] == "t3"
+
+        # 排队中的同步任务标记失败，异步任务重新排队并归接管的 worker 所有
+        requeued, failed = store.requeue_stale(60, 3, live_worker="host:3")
+        assert requeued == ["queued-async"] and [job["task_id"] for job in failed] == ["zombie"]
+        assert store.get_job("zombie")["status"] == JOB_FAILED
+        job = store.get_job("queued-async")
+        assert job["status"] == JOB_QUEUED and job["worker_id"] == "host:3"
+        assert store.get_job("waiting")["status"] == JOB_QUEUED
+        store.close()
+
+
+def test_close_all_thread_connections():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        store.create_job("t1")
+        threads = [threading.Thread(target=store.get_job, args=("t1",)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        connections = list(store._connections)
+        assert len(connections) == 4
+
+        store.close()
+        assert not store._connections
+        for conn in connections:
+            try:
+                conn.execute("SELECT 1")
+                raise AssertionError("connection still open")
+            except sqlite3.ProgrammingError:
+                pass
+        # 关闭后再次使用会重新打开连接
+        assert store.get_job("t1")["task_id"] == "t1"
+        store.close()
+
+
+def test_request_cancel():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        store.create_job("queued-job")
+        store.create_job("running-job")
+        store.claim_job("running-job", "worker-a")
+
+        # 排队中的任务立即取消，之后不能再被领取
+        assert store.request_cancel("queued-job") == JOB_CANCELLED
+        assert not store.claim_job("queued-job", "worker-a")
+
+        # 运行中的任务只设置标记，由执行它的 worker 负责中断
+        assert store.request_cancel("running-job") == JOB_RUNNING
+        assert store.is_cancel_requested("running-job")
+        assert store.request_cancel("missing") is None
+        store.close()
+
+
+def test_create_or_attach():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        leader = store.create_or_attach("t1", "fp-a", model="mineru")
+        follower = store.create_or_attach("t2", "fp-a", model="mineru")
+        other = store.create_or_attach("t3", "fp-b", model="mineru")
+
+        # 相同指纹的请求附加到已有任务，不会创建新任务
+        assert leader["task_id"] == follower["task_id"] == "t1"
+        assert store.get_job("t2") is None
+        assert other["task_id"] == "t3"
+        assert store.get_job("t1")["waiters"] == 2
+
+        # 按等待者脱离：重复脱离不会再减少计数
+        assert store.detach("t1", "t2") == 1
+        assert store.detach("t1", "t2") is None
+        assert store.get_job("t1")["waiters"] == 1
+        assert store.detach("t1") == 0
+        assert store.detach("t1") is None
+        assert store.detach("missing") is None
+
+        # 同一请求重复附加只算一个等待者
+        store.create_or_attach("t5", "fp-b", model="mineru")
+        store.create_or_attach("t5", "fp-b", model="mineru")
+        assert store.get_job("t3")["waiters"] == 2
+
+        # 已结束的任务不再被附加
+        store.update_job("t1", status=JOB_FAILED)
+        assert store.create_or_attach("t4", "fp-a", model="mineru")["task_id"] == "t4"
+        store.close()
+
+
+def test_store_url():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = create_job_store(f"sqlite:///{tmp_dir}/nested/jobs.db")
+        assert isinstance(store, SQLiteJobStore)
+        store.close()
+
+    try:
+        create_job_store("redis://localhost:6379/0")
+        assert False, "unsupported URL should raise"
+    except ValueError:
+        pass
+
+
+def main():
+    print("🧪 Testing Job Store")
+    print("=" * 40)
+
+    tests = [
+        test_create_and_update,
+        test_claim_is_exclusive,
+        test_requeue_stale,
+        test_stale_queued_jobs,
+        test_close_all_thread_connections,
+        test_request_cancel,
+        test_create_or_attach,
+        test_store_url,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nJob Store: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
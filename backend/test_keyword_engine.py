@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test Keyword Engine
+Test CJK n-gram / word tokenization, the persistent document-frequency table and TF-IDF top-k
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.keyword_engine import (
+    KeywordEngine, deferred_keywords, extract_keywords, merge_phrases, select_top_k, tokenize
+)
+
+
+def _engine(tmp: str, top_k: int = 5) -> KeywordEngine:
+    return KeywordEngine(db_path=str(Path(tmp) / "keywords.db"), top_k=top_k)
+
+
+def test_tokenize():
+    terms = tokenize('<td>合同金额</td> The Payment terms ![](images/a.jpg) see https://x.io/p', (2,))
+    assert terms == ["合同", "同金", "金额", "payment", "terms", "see"]
+    # 停用字开头/结尾的 n-gram 被跳过
+    assert tokenize("我的合同", (2,)) == ["合同"]
+    assert tokenize("2024 年 v2 data", (2,)) == ["data"]
+
+
+def test_select_top_k_suppresses_overlap():
+    scores = {"合同金额": 5.0, "合同": 4.0, "金额": 3.5, "发票": 3.0, "invoice": 2.0, "invoices": 1.0}
+    assert select_top_k(scores, 3) == ["合同金额", "发票", "invoice"]
+    assert select_top_k(scores, 0) == []
+    # 包含高分候选、且得分相近的更长短语优先
+    scores = {"发票号": 3.0, "票号码": 2.9, "发票号码": 2.9, "付款": 1.0}
+    assert select_top_k(scores, 2) == ["发票号码", "付款"]
+    assert select_top_k({"合同": 5.0, "合同金额": 3.0, "发票": 2.0}, 2) == ["合同", "发票"]
+
+
+def test_merge_phrases():
+    text = "合同金额：100 元。合同金额含税，付款条件见附件；付款条件如下"
+    pool = {"合同金", "同金额", "付款条", "款条件", "合同"}
+    idf = {term: 1.0 for term in pool}
+    idf["同金额"] = 2.0
+    phrases = merge_phrases(text, pool, idf)
+    assert set(phrases) == {"合同金额", "付款条件"}
+    assert phrases["合同金额"] > phrases["付款条件"] > 1.0
+    # 超过最大长度的连续段不合并
+    assert merge_phrases(text, pool, idf, max_length=3) == {}
+
+
+def test_invoice_keywords_are_whole_words():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(tmp, top_k=4)
+        for index in range(3):
+            engine.extract(f"会议纪要{index} 项目进度 报告", update=True)
+        text = (
+            "发票号码：INV-001\n合同金额：120000 元\n付款条件：验收后付款\n"
+            "发票号码与合同编号一致。合同金额含税。付款条件见附件。\n"
+            "| 项目 | 合同金额 | 付款条件 |\n| 服务器 | 80000 | 预付 |"
+        )
+        keywords = engine.extract(text, update=True)
+        assert keywords[:3] == ["合同金额", "付款条件", "发票号码"], keywords
+        engine.close()
+
+
+def test_idf_downweights_common_terms():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(tmp, top_k=1)
+        for index in range(5):
+            engine.extract(f"report report summary number{index}", update=True)
+        assert engine.stats()["documents"] == 5
+
+        # "report" 出现次数最多，但在每个文档中都出现，权重低于只在本文档出现的词
+        assert engine.extract("report report report quarterly", update=True) == ["quarterly"]
+        # 相同文本不会重复计入文档频率
+        engine.extract("report report report quarterly", update=True)
+        assert engine.stats()["documents"] == 6
+
+        read_only = engine.extract("brand new words here")
+        assert len(read_only) == 1
+        assert engine.stats()["documents"] == 6
+        engine.close()
+
+
+def test_lookup_filled_outside_write_transaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(tmp)
+        statements = []
+        engine._connect().set_trace_callback(statements.append)
+        engine.extract("合同金额 付款条件 invoice total", update=True)
+
+        # 查找表在写事务开始之前填充，写事务内只有文档频率的 upsert 和读取
+        write_begin = statements.index("BEGIN IMMEDIATE")
+        assert all("INSERT INTO lookup" not in sql for sql in statements[write_begin:])
+        assert any("INSERT INTO lookup" in sql for sql in statements[:write_begin])
+        assert statements[-1] == "DELETE FROM lookup"
+        assert engine._connect().execute("SELECT COUNT(*) FROM lookup").fetchone()[0] == 0
+        engine.close()
+
+
+def test_deferred_keywords():
+    with deferred_keywords():
+        assert extract_keywords("合同金额 合同金额", update=True) == []
+
+
+def test_large_document_is_linear():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(tmp, top_k=10)
+        text = "\n".join(f"第{i}页 发票号码 INV{i} 付款条件说明 amount due" for i in range(20000))
+        started = time.perf_counter()
+        keywords = engine.extract(text, update=True)
+        elapsed = time.perf_counter() - started
+        assert len(keywords) == 10
+        assert elapsed < 5, f"extraction took {elapsed:.2f}s"
+        engine.close()
+
+
+def main():
+    print("🧪 Testing Keyword Engine")
+    print("=" * 40)
+
+    tests = [
+        test_tokenize,
+        test_select_top_k_suppresses_overlap,
+        test_merge_phrases,
+        test_invoice_keywords_are_whole_words,
+        test_idf_downweights_common_terms,
+        test_lookup_filled_outside_write_transaction,
+        test_deferred_keywords,
+        test_large_document_is_linear,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nKeyword Engine: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
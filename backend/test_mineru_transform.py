@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test MinerU Bbox Transform
+Compare the per-page vectorised bbox transform with the original per-box arithmetic
+on scaled, offset and rotated (landscape) pages, including empty and degenerate bboxes
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+
+def _service():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("httpx")
+    from app.services.mineru_service import MinerUService
+    return np, MinerUService
+
+
+def _reference_params(page_idx: int, middle_json: dict, content_list: list) -> tuple:
+    """原逐图片实现：每次扫描整个 content_list 计算该页的转换参数"""
+    SCALE_X = SCALE_Y = 1.0
+    OFFSET_X = OFFSET_Y = 0.0
+    if not middle_json:
+        return (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+    pdf_info = middle_json.get("pdf_info", [])
+    if page_idx >= len(pdf_info):
+        return (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+
+    middle_blocks = pdf_info[page_idx].get("preproc_blocks", [])
+    content_items = [
+        item for item in content_list
+        if isinstance(item, dict) and item.get("page_idx") == page_idx
+    ]
+    if middle_blocks and content_items:
+        m_bbox = middle_blocks[0].get("bbox", [])
+        c_bbox = content_items[0].get("bbox", [])
+        if len(m_bbox) >= 4 and len(c_bbox) >= 4:
+            SCALE_X = (c_bbox[2] - c_bbox[0]) / (m_bbox[2] - m_bbox[0]) if (m_bbox[2] - m_bbox[0]) > 0 else 1.0
+            SCALE_Y = (c_bbox[3] - c_bbox[1]) / (m_bbox[3] - m_bbox[1]) if (m_bbox[3] - m_bbox[1]) > 0 else 1.0
+            OFFSET_X = c_bbox[0] - m_bbox[0] * SCALE_X
+            OFFSET_Y = c_bbox[1] - m_bbox[1] * SCALE_Y
+    return (SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y)
+
+
+def _reference_box(bbox: list, params: tuple, W_img: int, H_img: int, W_pdf: float, H_pdf: float) -> list:
+    """原逐图片实现：去偏移、反缩放、缩放到图片坐标，取整并限制在图片范围内"""
+    SCALE_X, SCALE_Y, OFFSET_X, OFFSET_Y = params
+    no_offset = [bbox[0] - OFFSET_X, bbox[1] - OFFSET_Y, bbox[2] - OFFSET_X, bbox[3] - OFFSET_Y]
+    in_pdf = [
+        no_offset[0] / SCALE_X if SCALE_X != 0 else no_offset[0],
+        no_offset[1] / SCALE_Y if SCALE_Y != 0 else no_offset[1],
+        no_offset[2] / SCALE_X if SCALE_X != 0 else no_offset[2],
+        no_offset[3] / SCALE_Y if SCALE_Y != 0 else no_offset[3],
+    ]
+    sx = W_img / W_pdf if W_pdf > 0 else 1.0
+    sy = H_img / H_pdf if H_pdf > 0 else 1.0
+    final = [in_pdf[0] * sx, in_pdf[1] * sy, in_pdf[2] * sx, in_pdf[3] * sy]
+    return [
+        max(0, int(round(final[0]))),
+        max(0, int(round(final[1]))),
+        min(W_img, int(round(final[2]))),
+        min(H_img, int(round(final[3]))),
+    ]
+
+
+def _document():
+    """三页：content_list 按 1000 归一化的竖版页、带偏移的横版（旋转）页、首个 bbox 退化的页"""
+    pdf_info = [
+        {"width": 595, "height": 842, "preproc_blocks": [{"bbox": [50, 60, 545, 200]}]},
+        {"width": 842, "height": 595, "preproc_blocks": [{"bbox": [40, 30, 800, 120]}]},
+        {"width": 612, "height": 792, "preproc_blocks": [{"bbox": [100, 100, 100, 100]}]},
+    ]
+    content_list = [
+        {"type": "text", "page_idx": 0, "bbox": [84, 71, 916, 238]},
+        {"type": "text", "page_idx": 1, "bbox": [60, 55, 970, 207]},
+        {"type": "text", "page_idx": 2, "bbox": [0, 0, 0, 0]},
+        "not-a-dict",
+    ]
+    return {"pdf_info": pdf_info}, content_list
+
+
+def test_page_transform_params():
+    np, MinerUService = _service()
+    middle_json, content_list = _document()
+    params = MinerUService._page_transform_params(middle_json, content_list)
+    assert set(params) == {0, 1, 2}
+    for page_idx, page_params in params.items():
+        assert page_params == pytest.approx(_reference_params(page_idx, middle_json, content_list))
+
+    # 没有对齐数据的页不在结果中，调用方回退到与原实现相同的恒等参数
+    assert MinerUService._page_transform_params({"pdf_info": []}, content_list) == {}
+    assert MinerUService._page_transform_params(None, content_list) == {}
+    assert _reference_params(5, middle_json, content_list) == (1.0, 1.0, 0.0, 0.0)
+
+
+def test_transform_matches_per_box_arithmetic():
+    np, MinerUService = _service()
+    middle_json, content_list = _document()
+    params = MinerUService._page_transform_params(middle_json, content_list)
+    rng = random.Random(42)
+
+    # (页, 渲染图片尺寸)：横版页的图片宽高与竖版相反
+    pages = [(0, (1190, 1684)), (1, (1684, 1190)), (2, (1224, 1584))]
+    for page_idx, (W_img, H_img) in pages:
+        page = middle_json["pdf_info"][page_idx]
+        bboxes = [
+            [rng.uniform(-50, 1100), rng.uniform(-50, 1100), rng.uniform(-50, 1100), rng.uniform(-50, 1100)]
+            for _ in range(200)
+        ]
+        # 退化的 bbox：零宽高、倒置、超出页面、半像素边界
+        bboxes += [[10, 10, 10, 10], [500, 400, 100, 50], [-300, -300, -10, -10], [2000, 2000, 5000, 5000],
+                   [0.25, 0.75, 100.5, 200.5]]
+        page_params = params.get(page_idx, (1.0, 1.0, 0.0, 0.0))
+
+        boxes = MinerUService._transform_bboxes(
+            np, bboxes, page_params, W_img, H_img, page["width"], page["height"]
+        )
+        expected = [_reference_box(b, page_params, W_img, H_img, page["width"], page["height"]) for b in bboxes]
+        assert boxes.tolist() == expected
+
+
+def test_transform_edge_cases():
+    np, MinerUService = _service()
+    # 空列表
+    assert MinerUService._transform_bboxes(np, [], (1.0, 1.0, 0.0, 0.0), 100, 100, 50, 50).shape == (0, 4)
+
+    # 缩放为 0（content_list 首个 bbox 宽高为 0）与 PDF 尺寸缺失时不做对应的缩放
+    bboxes = [[10, 20, 30, 40]]
+    for params, size in [((0.0, 0.0, 5.0, 5.0), (612, 792)), ((2.0, 0.5, 0.0, 0.0), (0, 0))]:
+        boxes = MinerUService._transform_bboxes(np, bboxes, params, 1224, 1584, *size)
+        assert boxes.tolist() == [_reference_box(bboxes[0], params, 1224, 1584, *size)]
+
+
+def main():
+    print("🧪 Testing MinerU Bbox Transform")
+    print("=" * 40)
+
+    tests = [
+        test_page_transform_params,
+        test_transform_matches_per_box_arithmetic,
+        test_transform_edge_cases,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nMinerU Bbox Transform: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
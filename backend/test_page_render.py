@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test Page Render Cache
+Test pixel-budget scaling, bounded caching and peak memory accounting
+"""
+
+import sys
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.page_render import PageRenderCache
+
+
+class _Image:
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self.closed = False
+
+    def getbands(self):
+        return ("R", "G", "B")
+
+    def close(self):
+        self.closed = True
+
+
+class _Bitmap:
+    def __init__(self, image):
+        self.image = image
+
+    def to_pil(self):
+        return self.image
+
+
+class _Page:
+    def __init__(self, width_pt, height_pt):
+        self.size = (width_pt, height_pt)
+
+    def get_size(self):
+        return self.size
+
+    def render(self, scale):
+        return _Bitmap(_Image(int(self.size[0] * scale), int(self.size[1] * scale)))
+
+    def close(self):
+        pass
+
+
+class _Doc:
+    def __init__(self, sizes):
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def get_page(self, index):
+        return _Page(*self.sizes[index])
+
+
+def test_pixel_budget_limits_scale():
+    cache = PageRenderCache(_Doc([(600, 800), (6000, 8000)]), scale=2.0, max_pixels=2_000_000, max_pages=2)
+
+    small = cache.get(0)
+    assert small.size == (1200, 1600)
+
+    large = cache.get(1)
+    assert large.size[0] * large.size[1] <= 2_000_000
+    assert cache.stats()["pages_downscaled"] == 1
+
+
+def test_release_and_peak():
+    cache = PageRenderCache(_Doc([(100, 100)] * 3), scale=1.0, max_pixels=0, max_pages=2)
+
+    first = cache.get(0)
+    assert cache.get(0) is first
+    cache.release(0)
+    assert first.closed
+
+    cache.get(1)
+    cache.get(2)
+    assert cache.peak_bytes == 2 * 100 * 100 * 3
+
+    cache.get(0)  # exceeds max_pages -> evicts page 1
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["pages_rendered"] == 4
+    assert stats["peak_bytes"] == 2 * 100 * 100 * 3
+
+    cache.close()
+
+
+def main():
+    print("🧪 Testing Page Render Cache")
+    print("=" * 40)
+
+    tests = [
+        test_pixel_budget_limits_scale,
+        test_release_and_peak,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nPage Render Cache: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
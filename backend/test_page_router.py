@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test Page Router
+Test per-page engine selection from local text layer signals
+"""
+
+import sys
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.page_router import PageRouter, ROUTE_TEXT
+from app.utils.pdf_utils import page_runs
+from app.utils.text_layer import PageTextLayer, TextLayerPolicy
+
+
+def _page(page_idx, **signals):
+    fields = {"chars": 800, "valid_ratio": 1.0}
+    fields.update(signals)
+    return PageTextLayer(page_idx=page_idx, width=595, height=842, **fields)
+
+
+def _router(models=("mineru", "deepseek", "paddleocr")):
+    policy = TextLayerPolicy(min_chars=100, min_valid_ratio=0.9, max_image_coverage=0.3)
+    return PageRouter(list(models), complex_model="mineru", table_model="paddleocr",
+                      table_min_paths=40, max_math_ratio=0.05, policy=policy)
+
+
+def test_routes_by_signals():
+    router = _router()
+    assert router.route(_page(0)) == ROUTE_TEXT
+    assert router.route(_page(1, path_count=120)) == "paddleocr"
+    assert router.route(_page(2, chars=0)) == "mineru"
+    assert router.route(_page(3, image_coverage=0.9)) == "mineru"
+    assert router.route(_page(4, math_ratio=0.2)) == "mineru"
+    assert router.route(_page(5, valid_ratio=0.4)) == "mineru"
+    assert router.route(_page(6, image_count=1, image_coverage=0.05)) == "mineru"
+
+
+def test_plan_groups_into_runs():
+    router = _router()
+    pages = [_page(0), _page(1), _page(2, chars=0), _page(3, path_count=80), _page(4, path_count=80), _page(5)]
+    routes = router.plan(pages)
+    assert page_runs(routes) == [
+        (0, 2, ROUTE_TEXT), (2, 3, "mineru"), (3, 5, "paddleocr"), (5, 6, ROUTE_TEXT)
+    ]
+
+
+def test_disabled_table_model_falls_back():
+    router = _router(models=("mineru",))
+    assert router.table_model == "mineru"
+    assert router.route(_page(0, path_count=120)) == "mineru"
+
+    router = _router(models=("deepseek",))
+    assert router.complex_model == "deepseek"
+
+
+def main():
+    print("🧪 Testing Page Router")
+    print("=" * 40)
+
+    tests = [
+        test_routes_by_signals,
+        test_plan_groups_into_runs,
+        test_disabled_table_model_falls_back,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nPage Router: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test Progress Reporting
+Test page windows, progress snapshots, the progress broker and pipeline progress without any OCR backend
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.progress import ProgressBroker, ProgressTracker
+from app.utils.pdf_utils import page_windows
+
+
+def test_page_windows():
+    assert page_windows(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert page_windows(10, 0) == [(0, 10)]
+    assert page_windows(3, 8) == [(0, 3)]
+
+
+def test_tracker_eta():
+    events = []
+    tracker = ProgressTracker("t1", events.append)
+    tracker.set_total(400)
+    tracker.started_at = time.monotonic() - 10  # 模拟已运行 10 秒
+    tracker.advance(100)
+
+    snapshot = events[-1]
+    assert snapshot["pages_done"] == 100
+    assert snapshot["pages_total"] == 400
+    assert abs(snapshot["pages_per_second"] - 10.0) < 0.5
+    assert 25 <= snapshot["eta_seconds"] <= 35
+
+    tracker.advance(1000)
+    assert events[-1]["pages_done"] == 400
+
+    tracker.complete()
+    assert events[-1]["stage"] == "completed"
+
+
+def test_broker_keeps_latest():
+    async def scenario():
+        broker = ProgressBroker(queue_size=2)
+        queue = broker.subscribe("t1")
+        for i in range(5):
+            broker.publish("t1", {"pages_done": i})
+        broker.publish("other", {"pages_done": 99})
+        received = [queue.get_nowait() for _ in range(queue.qsize())]
+        broker.unsubscribe("t1", queue)
+        broker.publish("t1", {"pages_done": 100})
+        return received, queue.qsize()
+
+    received, remaining = asyncio.run(scenario())
+    assert [event["pages_done"] for event in received] == [3, 4]
+    assert remaining == 0
+
+
+def test_default_path_progress():
+    # OCRPipeline 依赖 pydantic 模型
+    pytest.importorskip("pydantic")
+    from app.services import ocr_pipeline
+    from app.services.service_registry import ServiceRegistry
+
+    events = []
+
+    class FakeDeepSeek:
+        async def analyze_document(self, file_path, opts):
+            # 后端处理期间：已知总页数，但没有逐页进度
+            assert events and events[-1]["pages_total"] == 12
+            assert events[-1]["pages_done"] == 0 and events[-1]["page_level"] is False
+            assert events[-1]["stage"] == "processing"
+            return {
+                "success": True, "model": "deepseek", "filename": "a.pdf", "fullMarkdown": "",
+                "results": {
+                    "text": {"fullText": "", "confidence": 1.0},
+                    "handwritten": {"detected": False, "text": "", "confidence": 0.0},
+                    "performance": {"accuracy": 0.0, "speed": 0.0, "memory": 0},
+                    "metadata": {"totalElements": 0, "contentTypes": []},
+                },
+            }
+
+    registry = ServiceRegistry(models=["deepseek"])
+    registry._instances["deepseek"] = FakeDeepSeek()
+    pipeline = ocr_pipeline.OCRPipeline(registry)
+    pipeline.page_window = 0
+    pipeline.text_fast_path = False
+
+    original_count_pages = ocr_pipeline.count_pages
+    original_extract_keywords = ocr_pipeline.extract_keywords
+    ocr_pipeline.count_pages = lambda file_path: 12
+    # 共享的关键词引擎会写入相对路径 data/keywords.db（按各线程连接时的工作目录解析）
+    ocr_pipeline.extract_keywords = lambda text, update=False: []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "a.pdf"
+            path.write_bytes(b"%PDF-1.4")
+            tracker = ProgressTracker("t1", events.append)
+            asyncio.run(pipeline.run(path, "a.pdf", "deepseek", {}, progress=tracker))
+    finally:
+        ocr_pipeline.count_pages = original_count_pages
+        ocr_pipeline.extract_keywords = original_extract_keywords
+
+    assert events[-1]["stage"] == "completed"
+    assert events[-1]["pages_done"] == events[-1]["pages_total"] == 12
+    assert events[-1]["page_level"] is False
+
+
+def main():
+    print("🧪 Testing Progress Reporting")
+    print("=" * 40)
+
+    tests = [test_page_windows, test_tracker_eta, test_broker_keeps_latest, test_default_path_progress]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nProgress Reporting: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test Result Store
+Test per-page / per-element result parts and cursor-based paging
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.result_store import CursorError, ResultStore, encode_cursor
+
+
+def _result(pages: int = 5):
+    return {
+        "success": True,
+        "model": "mineru",
+        "filename": "big.pdf",
+        "fullMarkdown": "ignored",
+        "results": {
+            "text": {
+                "fullText": "ignored",
+                "keywords": ["发票"],
+                "textBlocks": [{"id": f"b{p}", "content": f"第{p}页\n内容", "page": p} for p in range(pages)],
+            },
+            "tables": [{"id": "t0", "rows": [["a"]], "page": 1}, {"id": "t1", "rows": [["b"]]}],
+            "formulas": [],
+            "images": [{"id": f"img{p}", "page": p} for p in range(0, pages, 2)],
+        },
+        "metadata": {"total_pages": pages + 2, "images": {"x.jpg": "data:..."}},
+    }
+
+
+def test_save_writes_parts():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(base_dir=tmp)
+        path = store.save("task", _result())
+        manifest = store.manifest(path)
+        assert manifest["page_count"] == 7
+        assert manifest["counts"] == {"tables": 2, "formulas": 0, "images": 3}
+        assert manifest["unpaged"]["tables"] == 1
+        assert "images" not in manifest["metadata"]
+        assert manifest["keywords"] == ["发票"]
+
+
+def test_page_cursor_walk():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(base_dir=tmp)
+        path = store.save("task", _result())
+
+        first = store.read_pages(path, limit=2)
+        assert [page["page"] for page in first["pages"]] == [0, 1]
+        assert first["pages"][1]["markdown"] == "第1页\n内容"
+        assert [table["id"] for table in first["pages"][1]["tables"]] == ["t0"]
+
+        seen = [page["page"] for page in first["pages"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            part = store.read_pages(path, limit=2, cursor=cursor)
+            seen.extend(page["page"] for page in part["pages"])
+            cursor = part["next_cursor"]
+        assert seen == list(range(7))
+
+        assert [page["page"] for page in store.read_pages(path, start=5, limit=10)["pages"]] == [5, 6]
+        assert store.read_pages(path, start=99)["pages"] == []
+
+
+def test_element_cursor_and_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(base_dir=tmp)
+        path = store.save("task", _result())
+
+        part = store.read_elements(path, "images", limit=2)
+        assert [item["id"] for item in part["items"]] == ["img0", "img2"]
+        rest = store.read_elements(path, "images", limit=2, cursor=part["next_cursor"])
+        assert [item["id"] for item in rest["items"]] == ["img4"] and rest["next_cursor"] is None
+        assert store.read_elements(path, "formulas")["items"] == []
+
+        # 格式错误、属于其他类型、不在行首、超出文件末尾
+        for cursor in ("!!!", encode_cursor("pages", 0), encode_cursor("images", 3), encode_cursor("images", 10 ** 9)):
+            try:
+                store.read_elements(path, "images", cursor=cursor)
+                raise AssertionError(f"expected CursorError for {cursor}")
+            except CursorError:
+                pass
+        try:
+            store.read_elements(path, "audio")
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+
+
+def test_parts_rebuilt_for_old_results():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(base_dir=tmp)
+        path = Path(tmp) / "old.json"
+        path.write_text(json.dumps(_result(3), ensure_ascii=False), encoding="utf-8")
+        assert not store.parts_dir(str(path)).exists()
+        assert store.read_pages(str(path), limit=1)["page_count"] == 5
+        assert (store.parts_dir(str(path)) / "manifest.json").exists()
+
+        shutil.rmtree(store.parts_dir(str(path)))
+        path.unlink()
+        assert store.read_pages(str(path)) is None
+
+
+def main():
+    print("🧪 Testing Result Store")
+    print("=" * 40)
+
+    tests = [
+        test_save_writes_parts,
+        test_page_cursor_walk,
+        test_element_cursor_and_errors,
+        test_parts_rebuilt_for_old_results,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nResult Store: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test Search Index
+Test page-level FTS5 indexing, CJK bigram matching and snippets
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.search_index import SearchIndex, build_match_query, pages_from_result, make_snippet
+
+
+def _index(tmp: str) -> SearchIndex:
+    return SearchIndex(db_path=str(Path(tmp) / "search.db"))
+
+
+def test_match_query_escapes_syntax():
+    assert build_match_query('合同金额 Total') == '"合同 同金 金额" AND "Total"'
+    assert build_match_query('a" OR b') == '"a" AND "OR" AND "b"'
+    assert build_match_query('年') == '"年"*'
+    assert build_match_query('  ') is None
+
+
+def test_search_cjk_and_latin():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _index(tmp)
+        index.index_document("doc-a", [
+            (0, "本合同由甲乙双方签订，合同金额为人民币一百万元。"),
+            (1, "Payment terms: the total amount is due within 30 days."),
+        ], task_id="task-a", filename="a.pdf", model="mineru")
+        index.index_document("doc-b", [(0, "年度报告：营业收入同比增长。")], task_id="task-b", filename="b.pdf")
+
+        hits = index.search("合同金额")["hits"]
+        assert [(hit["doc_id"], hit["page"]) for hit in hits] == [("doc-a", 0)]
+        snippet = hits[0]["snippet"]
+        start, end = hits[0]["highlights"][0]
+        assert snippet[start:end] == "合同金额"
+
+        assert [hit["page"] for hit in index.search("TOTAL amount")["hits"]] == [1]
+        assert index.search("营业收入")["hits"][0]["filename"] == "b.pdf"
+        assert index.search("金额 营业")["hits"] == []
+        assert index.search("收入增长")["hits"] == []  # not contiguous
+
+        index.close()
+
+
+def test_reindex_replaces_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _index(tmp)
+        index.index_document("doc", [(0, "old content here")], task_id="t1")
+        index.index_document("doc", [(0, "new content"), (1, "second page")], task_id="t2")
+
+        assert index.search("old")["hits"] == []
+        assert index.search("content")["hits"][0]["task_id"] == "t2"
+        assert index.stats()["pages"] == 2
+
+        # 结果被清理：只删除该任务写入的文档
+        index.index_document("other", [(0, "other content")], task_id="t3")
+        assert index.delete_task("t1") == 0
+        assert index.delete_task("t3") == 1
+        assert [hit["doc_id"] for hit in index.search("content")["hits"]] == ["doc"]
+
+        assert index.delete_document("doc") is True
+        assert index.search("content")["hits"] == []
+        assert index.stats()["documents"] == 0
+        index.close()
+
+
+def test_pages_from_result():
+    by_blocks = {"results": {"text": {"textBlocks": [
+        {"content": "p1 a", "page": 1}, {"content": "p0", "page": 0}, {"content": "p1 b", "page": 1}
+    ]}}, "fullMarkdown": "ignored"}
+    assert pages_from_result(by_blocks) == [(0, "p0"), (1, "p1 a\np1 b")]
+
+    by_markers = {"results": {"text": {"textBlocks": []}},
+                  "fullMarkdown": "\n\n# Page 1\n\nfirst\n\n# Page 2\n\nsecond"}
+    assert pages_from_result(by_markers) == [(0, "first"), (1, "second")]
+
+    # DeepSeek-OCR：每页之后一个分页标记，没有 textBlocks 页码和 "# Page N"
+    by_splits = {"results": {"text": {"fullText": "ignored"}},
+                 "fullMarkdown": "first\n<--- Page Split --->\n\n<--- Page Split --->\nthird\n<--- Page Split --->\n"}
+    assert pages_from_result(by_splits) == [(0, "first"), (2, "third")]
+    assert pages_from_result({"fullMarkdown": "a\n<--- Page Split --->\nb"}) == [(0, "a"), (1, "b")]
+
+    assert pages_from_result({"fullMarkdown": "whole"}) == [(0, "whole")]
+    assert make_snippet("abc", ["zzz"]) == ("abc", [])
+
+
+def test_search_latency():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = _index(tmp)
+        text = "这是第{}页的测试文本，包含发票号码 INV-{} 以及若干说明文字。"
+        for doc in range(50):
+            index.index_document(f"doc-{doc}", [(page, text.format(page, doc * 100 + page)) for page in range(100)])
+
+        started = time.perf_counter()
+        result = index.search("发票号码", limit=20)
+        elapsed = time.perf_counter() - started
+        assert len(result["hits"]) == 20
+        assert elapsed < 0.5, f"search took {elapsed:.3f}s"
+        index.close()
+
+
+def main():
+    print("🧪 Testing Search Index")
+    print("=" * 40)
+
+    tests = [
+        test_match_query_escapes_syntax,
+        test_search_cjk_and_latin,
+        test_reindex_replaces_pages,
+        test_pages_from_result,
+        test_search_latency,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nSearch Index: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
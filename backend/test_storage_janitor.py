@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test Storage Janitor
+Test TTL and quota eviction on temporary directories, upload reference counts,
+temp directories of running jobs and results with their parts directories (and their search index pages)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.search_index import SearchIndex
+from app.services.storage_janitor import StorageJanitor, StoragePolicy, default_policies
+from app.services.upload_store import UploadStore
+
+
+def _write(path: Path, size: int, age: float) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_ttl_eviction():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        old = _write(root / "nested" / "old.pdf", 100, age=7200)
+        fresh = _write(root / "fresh.pdf", 100, age=600)
+
+        janitor = StorageJanitor([StoragePolicy("uploads", root, ttl_seconds=3600)],
+                                 lambda: set(), interval=0, min_age_seconds=60)
+        assert janitor.sweep() == {"uploads": 100}
+        assert not old.exists() and fresh.exists()
+        # 清空后的子目录也会被删除
+        assert not (root / "nested").exists()
+
+
+def test_quota_evicts_oldest_first():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        oldest = _write(root / "a.bin", 400, age=3000)
+        middle = _write(root / "b.bin", 400, age=2000)
+        newest = _write(root / "c.bin", 400, age=1000)
+
+        janitor = StorageJanitor([StoragePolicy("temp", root, quota_bytes=900)],
+                                 lambda: set(), interval=0, eviction_policy="oldest", min_age_seconds=0)
+        janitor.sweep()
+        assert not oldest.exists()
+        assert middle.exists() and newest.exists()
+
+        stats = janitor.stats()["directories"]["temp"]
+        assert stats["files_removed"] == 1
+        assert stats["bytes_in_use"] == 800
+
+
+def test_protected_and_recent_files_are_kept():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        active = _write(root / "active.pdf", 100, age=7200)
+        recent = _write(root / "recent.pdf", 100, age=10)
+
+        janitor = StorageJanitor([StoragePolicy("uploads", root, ttl_seconds=1, quota_bytes=1)],
+                                 lambda: {str(active)}, interval=0, min_age_seconds=60)
+        janitor.sweep()
+        assert active.exists() and recent.exists()
+
+
+def test_uploads_are_released_through_refcounts():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        store = UploadStore(base_dir=str(root / "uploads"), db_path=str(root / "uploads.db"))
+        stale_key, stale = store.put(b"stale", "a.pdf", "finished-task")
+        kept_key, kept = store.put(b"kept", "b.pdf", "old-task")
+        for path in (stale, kept):
+            os.utime(path, (time.time() - 7200,) * 2)
+        # 清理期间有新请求上传了相同内容：其引用晚于截止时间，文件必须保留
+        store.put(b"kept", "b.pdf", "new-task")
+        leftover = _write(root / "uploads" / "ab" / ".partial.tmp", 10, age=7200)
+
+        janitor = StorageJanitor([StoragePolicy("uploads", root / "uploads", ttl_seconds=3600,
+                                                evict=store.evict)],
+                                 lambda: set(), interval=0, min_age_seconds=60)
+        store._connect().execute("UPDATE refs SET created_at = ? WHERE holder != 'new-task'", (time.time() - 7200,))
+        janitor.sweep()
+
+        assert not stale.exists() and store.refcount(stale_key) == 0
+        assert store._connect().execute("SELECT COUNT(*) FROM blobs WHERE key = ?", (stale_key,)).fetchone()[0] == 0
+        assert kept.exists() and store.refcount(kept_key) == 1
+        assert not leftover.exists()
+        assert janitor.stats()["directories"]["uploads"]["files_in_use"] == 1
+        store.close()
+
+
+def test_temp_dirs_of_running_jobs_are_kept():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        running = _write(root / "running-task" / "shards_1" / "pages_1_4.pdf", 400, age=3600)
+        finished = _write(root / "finished-task" / "shards_2" / "pages_1_4.pdf", 400, age=3600)
+
+        janitor = StorageJanitor([StoragePolicy("temp", root, quota_bytes=100)],
+                                 lambda: {str(root / "running-task")}, interval=0, min_age_seconds=300)
+        janitor.sweep()
+        assert running.exists()
+        assert not finished.exists() and not (root / "finished-task").exists()
+
+
+def test_results_are_evicted_with_parts():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        old = _write(root / "old.json", 100, age=3000)
+        _write(root / "old.parts" / "pages.jsonl", 300, age=3000)
+        _write(root / "old.parts" / "manifest.json", 50, age=3000)
+        new = _write(root / "new.json", 100, age=1000)
+        # 分片目录最近被读取过：整个结果按最近使用时间计算
+        _write(root / "new.parts" / "pages.jsonl", 300, age=10)
+        orphan = _write(root / "orphan.parts" / "pages.jsonl", 100, age=4000)
+
+        janitor = StorageJanitor([StoragePolicy("results", root, quota_bytes=450, companion_suffix=".parts")],
+                                 lambda: set(), interval=0, eviction_policy="oldest", min_age_seconds=0)
+        janitor.sweep()
+        assert not old.exists() and not (root / "old.parts").exists()
+        assert not orphan.exists() and not (root / "orphan.parts").exists()
+        assert new.exists() and (root / "new.parts" / "pages.jsonl").exists()
+
+        stats = janitor.stats()["directories"]["results"]
+        assert stats["files_removed"] == 2
+        assert stats["bytes_in_use"] == 400 and stats["files_in_use"] == 1
+
+
+def test_evicted_results_leave_the_search_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir) / "results"
+        index = SearchIndex(db_path=str(Path(tmp_dir) / "search.db"))
+        index.index_document("doc-old", [(0, "expired invoice")], task_id="old")
+        index.index_document("doc-new", [(0, "current invoice")], task_id="new")
+        # doc-again 最初由 gone 写入，之后被 again 重新索引：gone 的结果淘汰时保留
+        index.index_document("doc-again", [(0, "first invoice")], task_id="gone")
+        index.index_document("doc-again", [(0, "reprocessed invoice")], task_id="again")
+        _write(root / "old.json", 100, age=3000)
+        _write(root / "gone.parts" / "pages.jsonl", 100, age=3000)
+        _write(root / "new.json", 100, age=10)
+
+        os.environ["RESULTS_DIR"] = str(root)
+        try:
+            policies = [policy for policy in default_policies(result_removed=index.delete_task)
+                        if policy.name == "results"]
+        finally:
+            del os.environ["RESULTS_DIR"]
+        policies[0].ttl_seconds = 1000
+        janitor = StorageJanitor(policies, lambda: set(), interval=0, min_age_seconds=0)
+        janitor.sweep()
+
+        assert sorted(hit["doc_id"] for hit in index.search("invoice")["hits"]) == ["doc-again", "doc-new"]
+        assert index.stats()["documents"] == 2
+        index.close()
+
+
+def main():
+    print("🧪 Testing Storage Janitor")
+    print("=" * 40)
+
+    tests = [
+        test_ttl_eviction,
+        test_quota_evicts_oldest_first,
+        test_protected_and_recent_files_are_kept,
+        test_uploads_are_released_through_refcounts,
+        test_temp_dirs_of_running_jobs_are_kept,
+        test_results_are_evicted_with_parts,
+        test_evicted_results_leave_the_search_index,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nStorage Janitor: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
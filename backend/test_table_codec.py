@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test Table Codec
+Test the compact column-major table encoding (shared string table, typed numeric columns)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.utils.table_codec import (
+    apply_table_encoding, decode_table, encode_table, resolve_table_encoding, table_rows
+)
+
+
+def test_roundtrip_and_types():
+    rows = [
+        ["营业收入", "100", "1.5", "1,234.00", "-0"],
+        ["营业成本", "-20", "", "(56)", "x"],
+        ["营业收入", "0", "0.25", "1,234.00", "0"],
+    ]
+    compact = encode_table(rows)
+    assert [column["type"] for column in compact["columns"]] == ["string", "int", "float", "string", "string"]
+    assert compact["columns"][1]["values"] == [100, -20, 0]
+    assert compact["columns"][2]["values"] == [1.5, None, 0.25]
+    # 重复值只在字符串表中出现一次
+    assert compact["strings"].count("营业收入") == 1
+    assert compact["strings"].count("1,234.00") == 1
+    assert "rowLengths" not in compact
+    assert decode_table(json.loads(json.dumps(compact))) == rows
+
+
+def test_lossy_numbers_stay_strings():
+    for cells in (["1.50"], ["007"], ["1e5"], ["1234567890123456"], ["+1"]):
+        assert encode_table([cells])["columns"][0]["type"] == "string", cells
+
+
+def test_ragged_and_empty_tables():
+    rows = [["a", "1"], ["b"], [], ["c", "2", "extra"]]
+    compact = encode_table(rows)
+    assert compact["rowLengths"] == [2, 1, 0, 3]
+    assert decode_table(compact) == rows
+
+    assert decode_table(encode_table([])) == []
+    assert decode_table(encode_table([[], []])) == [[], []]
+
+
+def test_apply_table_encoding():
+    result = {"results": {"tables": [{"id": "t1", "headers": ["k", "v"], "rows": [["a", "1"], ["b", "2"]]}]}}
+    apply_table_encoding(result, "columnar")
+    table = result["results"]["tables"][0]
+    assert table["rows"] == [] and table["compact"]["rowCount"] == 2
+    assert table_rows(table) == [["a", "1"], ["b", "2"]]
+
+    apply_table_encoding(result, "rows")
+    assert table["rows"] == [["a", "1"], ["b", "2"]] and table["compact"] is None
+
+    assert resolve_table_encoding(None) == "rows"
+    assert resolve_table_encoding(" Columnar ") == "columnar"
+    try:
+        resolve_table_encoding("csv")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+def test_compact_is_smaller():
+    rows = [[f"科目{i % 20}", str(i * 10), f"{i}.5", "是" if i % 2 else "否"] for i in range(5000)]
+    compact = encode_table(rows)
+    assert len(json.dumps(compact, ensure_ascii=False)) < len(json.dumps(rows, ensure_ascii=False)) * 0.75
+    assert decode_table(compact) == rows
+
+
+def main():
+    print("🧪 Testing Table Codec")
+    print("=" * 40)
+
+    tests = [
+        test_roundtrip_and_types,
+        test_lossy_numbers_stay_strings,
+        test_ragged_and_empty_tables,
+        test_apply_table_encoding,
+        test_compact_is_smaller,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nTable Codec: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
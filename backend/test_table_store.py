@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test Table Store
+Test flattening tables into cells and the partitioned Parquet table dataset
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.table_store import TableStore, load_pyarrow, table_cells
+from app.utils.table_codec import encode_table
+
+
+def _result(model: str, tables):
+    return {"success": True, "model": model, "filename": f"{model}.pdf", "results": {"tables": tables}}
+
+
+TABLES = [
+    {"id": "table_1", "title": "收入", "headers": ["年份", "金额"], "rows": [["2023", "100"], ["2024", None]], "page": 2},
+    {"id": "table_2", "title": "Costs", "headers": [], "rows": [["rent", "5"]]},
+]
+
+
+def test_table_cells():
+    cells = [(t, row, col, header, value) for t, _, row, col, header, value in table_cells(TABLES)]
+    assert cells[:2] == [(0, 0, 0, True, "年份"), (0, 0, 1, True, "金额")]
+    assert cells[5] == (0, 2, 1, False, "")
+    assert cells[6:] == [(1, 0, 0, False, "rent"), (1, 0, 1, False, "5")]
+
+    compact = [dict(TABLES[1], rows=[], compact=encode_table(TABLES[1]["rows"]))]
+    assert [value for *_, value in table_cells(compact)] == ["rent", "5"]
+
+
+def _require_pyarrow():
+    pytest.importorskip("pyarrow")
+    assert load_pyarrow() is not None
+
+
+def test_lazy_start():
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = Path(tmp) / "tables"
+        store = TableStore(base_dir=str(base_dir), flush_seconds=30)
+        # 构造时不导入 pyarrow、不启动刷新线程、不创建目录
+        assert store._flusher is None and not base_dir.exists()
+        assert store.append_result("doc", _result("mineru", [])) == 0
+        assert store._flusher is None
+        assert store.stats()["files"] == 0
+        store.close()
+
+
+def test_append_flush_and_query():
+    _require_pyarrow()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(base_dir=tmp, flush_rows=1000, flush_seconds=0)
+        assert store.append_result("doc-a", _result("mineru", TABLES), task_id="task-a") == 8
+        assert store.append_result("doc-b", _result("paddleocr", TABLES[:1]), task_id="task-b") == 6
+        assert store.append_result("doc-c", _result("deepseek", [])) == 0
+        assert store.query(doc_id="doc-a") == []  # not flushed yet
+        assert store.stats()["buffered_rows"] == 14
+
+        assert store.flush() == 14
+        files = sorted(Path(tmp).rglob("*.parquet"))
+        assert len(files) == 2
+        assert {path.parent.name for path in files} == {"model=mineru", "model=paddleocr"}
+
+        cells = store.query(doc_id="doc-a")
+        assert len(cells) == 8
+        first = cells[0]
+        assert (first["page"], first["table_id"], first["row"], first["col"], first["value"]) == (2, "table_1", 0, 0, "年份")
+        assert first["model"] == "mineru" and first["task_id"] == "task-a"
+        assert cells[-1]["page"] is None
+
+        assert len(store.query(model="paddleocr")) == 6
+        assert store.query(doc_id="doc-a", model="paddleocr") == []
+        assert len(store.query(limit=3)) == 3
+
+        # 追加写入：再次刷新产生新文件，旧文件保持不变
+        store.append_result("doc-a", _result("mineru", TABLES[1:]), task_id="task-a2")
+        store.close()
+        assert len(list(Path(tmp).rglob("*.parquet"))) == 3
+        assert len(store.query(doc_id="doc-a")) == 10
+        assert store.stats()["rows_written"] == 16
+
+
+def test_flusher_and_flush_on_complete():
+    _require_pyarrow()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(base_dir=tmp, flush_seconds=30)
+        store.append_result("doc-a", _result("mineru", TABLES))
+        assert store._flusher is not None and store._flusher.is_alive()
+        store.close()
+        assert not store._flusher.is_alive()
+        assert len(store.query(doc_id="doc-a")) == 8
+
+    os.environ["TABLE_STORE_FLUSH_ON_COMPLETE"] = "true"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TableStore(base_dir=tmp, flush_seconds=0)
+            store.append_result("doc-a", _result("mineru", TABLES))
+            # 不等待定时刷新，任务完成即可查询
+            assert store.stats()["buffered_rows"] == 0
+            assert len(store.query(doc_id="doc-a")) == 8
+    finally:
+        del os.environ["TABLE_STORE_FLUSH_ON_COMPLETE"]
+
+
+def test_failed_flush_keeps_rows():
+    _require_pyarrow()
+    pa = load_pyarrow()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(base_dir=tmp, flush_rows=1000, flush_seconds=0)
+        store.append_result("doc-a", _result("mineru", TABLES), task_id="task-a")
+        store.append_result("doc-b", _result("paddleocr", TABLES[:1]), task_id="task-b")
+
+        # 第二个分区写出失败：第一个分区已写出，不再放回缓冲
+        original_write = pa.parquet.write_table
+        calls = []
+
+        def failing_write(table, path, **kwargs):
+            calls.append(path)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return original_write(table, path, **kwargs)
+
+        pa.parquet.write_table = failing_write
+        try:
+            store.flush()
+            raise AssertionError("expected OSError")
+        except OSError:
+            pass
+        finally:
+            pa.parquet.write_table = original_write
+        assert store.stats()["buffered_rows"] == 6
+        assert len(store.query(doc_id="doc-a")) == 8
+
+        # 失败期间新追加的单元格排在放回的单元格之后，重试时一起写出
+        store.append_result("doc-c", _result("paddleocr", TABLES[1:]), task_id="task-c")
+        assert store.flush() == 8
+        assert len(store.query(doc_id="doc-b")) == 6
+        assert len(store.query(doc_id="doc-c")) == 2
+        assert store.stats()["rows_written"] == 16
+        store.close()
+
+
+def test_disabled_store_is_noop():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TableStore(base_dir=tmp, flush_seconds=0)
+        store.enabled = False
+        assert store.append_result("doc", _result("mineru", TABLES)) == 0
+        assert store.query() == []
+        assert store.stats()["files"] == 0
+
+
+def main():
+    print("🧪 Testing Table Store")
+    print("=" * 40)
+
+    tests = [
+        test_table_cells,
+        test_lazy_start,
+        test_append_flush_and_query,
+        test_flusher_and_flush_on_complete,
+        test_failed_flush_keeps_rows,
+        test_disabled_store_is_noop,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except pytest.skip.Exception as e:
+            print(f"   ⚠️  {test.__name__} skipped: {e.msg}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nTable Store: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test Upload Store
+Test content-addressed upload storage and reference counting
+"""
+
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add app directory to path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from app.services.upload_store import UploadStore
+
+
+def _new_store(tmp_dir: str) -> UploadStore:
+    return UploadStore(str(Path(tmp_dir) / "uploads"), str(Path(tmp_dir) / "uploads.db"))
+
+
+def test_identical_uploads_share_one_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        key_a, path_a = store.put(b"%PDF-1.4 same", "report.pdf", "task-a")
+        key_b, path_b = store.put(b"%PDF-1.4 same", "Other.PDF", "task-b")
+        key_c, path_c = store.put(b"%PDF-1.4 different", "report.pdf", "task-c")
+
+        assert key_a == key_b and path_a == path_b
+        assert key_a.endswith(".pdf")
+        assert path_c != path_a
+        assert store.refcount(key_a) == 2
+        assert path_a.read_bytes() == b"%PDF-1.4 same"
+        store.close()
+
+
+def test_release_removes_file_after_last_reference():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        key, path = store.put(b"content", "a.png", "task-a")
+        store.put(b"content", "a.png", "task-b")
+
+        assert not store.release(key, "task-a")
+        # 重复释放不会影响其他持有者
+        assert not store.release(key, "task-a")
+        assert path.exists()
+
+        assert store.release(key, "task-b")
+        assert not path.exists()
+
+        # 删除后再次上传会重新写入
+        _, path = store.put(b"content", "a.png", "task-c")
+        assert path.read_bytes() == b"content"
+        store.close()
+
+
+def test_concurrent_identical_uploads():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = _new_store(tmp_dir)
+        content = b"x" * 100000
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: store.put(content, "big.pdf", f"task-{i}"), range(16)))
+
+        assert len({key for key, _ in results}) == 1
+        key, path = results[0]
+        assert store.refcount(key) == 16
+        assert path.read_bytes() == content
+        # 没有残留的临时文件
+        assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+def main():
+    print("🧪 Testing Upload Store")
+    print("=" * 40)
+
+    tests = [
+        test_identical_uploads_share_one_file,
+        test_release_removes_file_after_last_reference,
+        test_concurrent_identical_uploads,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {str(e)}")
+
+    print(f"\nUpload Store: {'✅ PASS' if not failed else '❌ FAIL'}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)